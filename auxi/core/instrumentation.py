@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+"""
+This module provides opt-in instrumentation that counts the calls to
+functions and methods and accumulates the time spent in them.
+
+Instrumented functions are replaced with counting wrappers only while an
+instrumentation context is active, and the originals are restored when it
+exits, so there is no overhead when instrumentation is not in use.
+"""
+
+import functools
+import time
+import types
+from contextlib import contextmanager
+
+from auxi.core.objects import Object
+
+
+__version__ = '0.3.6'
+__license__ = 'LGPL v3'
+__copyright__ = 'Copyright 2016, Ex Mente Technologies (Pty) Ltd'
+__author__ = 'Christoff Kok, Johan Zietsman'
+__credits__ = ['Christoff Kok', 'Johan Zietsman']
+__maintainer__ = 'Christoff Kok'
+__email__ = 'christoff.kok@ex-mente.co.za'
+__status__ = 'Planning'
+
+
+class Counter(Object):
+    """
+    The calls to and time spent in an instrumented function.
+
+    :param name: The name of the function.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        """The name of the function."""
+        self.calls = 0
+        """The number of calls."""
+        self.time = 0.0
+        """[s] The time spent in the function, including nested calls."""
+        self.nested_calls = {}
+        """
+        Dictionary of the names of instrumented functions and the number of
+        times that they were called while this function was running.
+        """
+
+    @property
+    def time_per_call(self):
+        """
+        Get the average time per call.
+
+        :returns: [s] Time per call.
+        """
+
+        return self.time / self.calls if self.calls > 0 else 0.0
+
+
+class Report(Object):
+    """
+    The counters of an instrumentation context.
+    """
+
+    def __init__(self):
+        self.counters = {}
+        """Dictionary of function names and counters."""
+
+    def __str__(self):
+        b1 = '=' * 79 + '\n'
+        b2 = '-' * 79 + '\n'
+        result = b1
+        result += 'Instrumentation Report\n'
+        result += b1
+        result += 'Function'.ljust(40) + 'Calls'.rjust(12) + \
+            'Time [s]'.rjust(13) + 'Per call [s]'.rjust(14) + '\n'
+        result += b2
+        for counter in self.get_counters():
+            result += counter.name[:39].ljust(40)
+            result += str(counter.calls).rjust(12)
+            result += '{:.6f}'.format(counter.time).rjust(13)
+            result += '{:.3e}'.format(counter.time_per_call).rjust(14) + '\n'
+            for name in sorted(counter.nested_calls):
+                result += ('  ' + name)[:39].ljust(40)
+                result += str(counter.nested_calls[name]).rjust(12) + '\n'
+        result += b1
+        return result
+
+    def __getitem__(self, name):
+        return self.counters[name]
+
+    def __contains__(self, name):
+        return name in self.counters
+
+    def get_counters(self):
+        """
+        Get the counters of the functions that were called, the most time
+        consuming first.
+
+        :returns: List of Counter objects.
+        """
+
+        return sorted([c for c in self.counters.values() if c.calls > 0],
+                      key=lambda c: c.time, reverse=True)
+
+    def get_nested_calls_per_call(self, name, nested_name):
+        """
+        Determine how many times a function was called on average during a
+        call to another function.
+
+        :param name: The name of the calling function.
+        :param nested_name: The name of the called function.
+
+        :returns: Calls per call.
+        """
+
+        counter = self.counters[name]
+        if counter.calls == 0:
+            return 0.0
+        return counter.nested_calls.get(nested_name, 0) / counter.calls
+
+
+def get_name(owner, attribute):
+    """
+    Create the report name of a function or method.
+
+    :param owner: The class or module that the function belongs to.
+    :param attribute: The name of the function, method or property.
+
+    :returns: Name, e.g. 'MaterialPackage.extract' or 'thermochemistry.H'.
+    """
+
+    if isinstance(owner, types.ModuleType):
+        return owner.__name__.split('.')[-1] + '.' + attribute
+    return owner.__name__ + '.' + attribute
+
+
+def _wrap(function, counter, active):
+    """
+    Create a wrapper that counts the calls to a function.
+
+    :param function: The function to wrap.
+    :param counter: The function's Counter.
+    :param active: Dictionary of the names of the instrumented functions
+      that are running, and their counters and how deeply each is nested in
+      itself.
+
+    :returns: Wrapper function.
+    """
+
+    name = counter.name
+
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        counter.calls += 1
+        for parent_name, (parent, _) in active.items():
+            if parent_name != name:
+                nested = parent.nested_calls
+                nested[name] = nested.get(name, 0) + 1
+
+        # Only the outermost call of a recursion is timed.
+        depth = active[name][1] if name in active else 0
+        active[name] = (counter, depth + 1)
+        start = time.perf_counter()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            if depth == 0:
+                counter.time += time.perf_counter() - start
+                del active[name]
+            else:
+                active[name] = (counter, depth)
+
+    return wrapper
+
+
+@contextmanager
+def instrument(targets):
+    """
+    Count the calls to and time spent in functions while the context is
+    active.
+
+    :param targets: List of (owner, attribute) tuples, where owner is a class
+      or module and attribute the name of a function, method or property in
+      it. The setter of a property is instrumented.
+
+    :returns: Context manager that yields a Report. The report is filled in
+      while the context is active.
+
+    Only calls that look the function up on its owner are counted. A
+    function imported by name into another module before the context is
+    entered is not instrumented there.
+    """
+
+    report = Report()
+    active = {}
+    originals = []
+    try:
+        for owner, attribute in targets:
+            original = owner.__dict__[attribute]
+            if isinstance(original, property):
+                name = get_name(owner, attribute) + '.setter'
+                counter = report.counters.setdefault(name, Counter(name))
+                replacement = property(
+                    original.fget, _wrap(original.fset, counter, active),
+                    original.fdel, original.__doc__)
+            else:
+                name = get_name(owner, attribute)
+                counter = report.counters.setdefault(name, Counter(name))
+                replacement = _wrap(original, counter, active)
+            originals.append((owner, attribute, original))
+            setattr(owner, attribute, replacement)
+        yield report
+    finally:
+        for owner, attribute, original in reversed(originals):
+            setattr(owner, attribute, original)
+
+
+if __name__ == '__main__':
+    import unittest
+    from auxi.core.instrumentation_test import InstrumentationUnitTester
+    unittest.main()
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+This module contains code used to test the instrumentation module.
+"""
+
+import unittest
+
+from auxi.core import instrumentation
+from auxi.core.instrumentation import instrument
+
+
+__version__ = '0.3.6'
+__license__ = 'LGPL v3'
+__copyright__ = 'Copyright 2016, Ex Mente Technologies (Pty) Ltd'
+__author__ = 'Christoff Kok, Johan Zietsman'
+__credits__ = ['Christoff Kok', 'Johan Zietsman']
+__maintainer__ = 'Christoff Kok'
+__email__ = 'christoff.kok@ex-mente.co.za'
+__status__ = 'Planning'
+
+
+class Tank(object):
+    def __init__(self):
+        self._level = 0.0
+
+    def fill(self, amount):
+        for i in range(int(amount)):
+            self.add(1.0)
+
+    def add(self, amount):
+        self._level += amount
+
+    def drain(self, count):
+        if count > 0:
+            self.drain(count - 1)
+
+    @property
+    def level(self):
+        return self._level
+
+    @level.setter
+    def level(self, level):
+        self._level = 0.0
+        self.fill(level)
+
+
+class InstrumentationUnitTester(unittest.TestCase):
+    """
+    Tester for the auxi.core.instrumentation module.
+    """
+
+    def setUp(self):
+        self.targets = [(Tank, 'fill'), (Tank, 'add'), (Tank, 'drain'),
+                        (Tank, 'level')]
+
+    def test_instrument(self):
+        original = Tank.__dict__['fill']
+        tank = Tank()
+        with instrument(self.targets) as report:
+            tank.fill(3)
+            tank.level = 2
+            self.assertIsNot(Tank.__dict__['fill'], original)
+        self.assertIs(Tank.__dict__['fill'], original)
+        self.assertEqual(tank.level, 2.0)
+
+        self.assertEqual(report['Tank.fill'].calls, 2)
+        self.assertEqual(report['Tank.add'].calls, 5)
+        self.assertEqual(report['Tank.level.setter'].calls, 1)
+        self.assertEqual(report['Tank.fill'].nested_calls, {'Tank.add': 5})
+        self.assertEqual(report['Tank.level.setter'].nested_calls,
+                         {'Tank.fill': 1, 'Tank.add': 2})
+        self.assertEqual(report.get_nested_calls_per_call(
+            'Tank.fill', 'Tank.add'), 2.5)
+        self.assertNotIn('Tank.drain', [c.name
+                                        for c in report.get_counters()])
+        self.assertIn('Tank.add', str(report))
+
+    def test_recursion(self):
+        with instrument(self.targets) as report:
+            Tank().drain(3)
+        counter = report['Tank.drain']
+        self.assertEqual(counter.calls, 4)
+        self.assertEqual(counter.nested_calls, {})
+        self.assertGreater(counter.time, 0.0)
+
+    def test_exception(self):
+        original = Tank.__dict__['add']
+        with self.assertRaises(TypeError):
+            with instrument(self.targets) as report:
+                Tank().add('a')
+        self.assertIs(Tank.__dict__['add'], original)
+        self.assertEqual(report['Tank.add'].calls, 1)
+
+    def test_get_name(self):
+        self.assertEqual(instrumentation.get_name(Tank, 'add'), 'Tank.add')
+        self.assertEqual(instrumentation.get_name(instrumentation,
+                                                  'instrument'),
+                         'instrumentation.instrument')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -14,11 +14,15 @@ __email__ = 'christoff.kok@ex-mente.co.za'
 __status__ = 'Planning'
 
 
-class Object(object):
+class SlottedObject(object):
     """
-    Base class for all auxi classes.
+    Base class for auxi classes that keep their attributes in __slots__
+    instead of an instance dictionary. Subclasses must list all their
+    attributes in __slots__.
     """
 
+    __slots__ = ()
+
     def __str__(self):
         o = json.loads(jsonpickle.encode(self))
         result = json.dumps(o, sort_keys=True, indent=4,
@@ -47,6 +51,31 @@ class Object(object):
         return result
 
 
+class Object(SlottedObject):
+    """
+    Base class for all auxi classes.
+    """
+
+
+class SlottedNamedObject(SlottedObject):
+    """
+    Base class for auxi classes that require a name and description and keep
+    their attributes in __slots__.
+
+    :param name: the object's name
+    :param description: the object's description
+    """
+
+    __slots__ = ('name', 'description')
+
+    def __init__(self, name, description=None):
+        self.name = name
+        self.description = description
+
+    def _validate_params_(self, name, description):
+        pass
+
+
 class NamedObject(Object):
     """
     Base class for all auxi classes requiring a name and description.
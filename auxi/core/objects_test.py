@@ -7,7 +7,7 @@ import unittest
 
 import jsonpickle
 
-from auxi.core.objects import Object, NamedObject
+from auxi.core.objects import Object, NamedObject, SlottedNamedObject
 
 
 __version__ = '0.3.6'
@@ -81,5 +81,49 @@ class NamedObjectUnitTester(unittest.TestCase):
         self.assertEqual(new_o.description, 'DescriptionA')
 
 
+class SlottedNamedObjectA(SlottedNamedObject):
+    __slots__ = ('value',)
+
+    def __init__(self, name, description=None, value=0.0):
+        super().__init__(name, description)
+        self.value = value
+
+
+class SlottedNamedObjectUnitTester(unittest.TestCase):
+    """
+    The unit tester for the class being tested.
+    """
+
+    def setUp(self):
+        self.o = SlottedNamedObjectA('NameA', 'DescriptionA', 1.5)
+
+    def tearDown(self):
+        del self.o
+
+    def test_constructor(self):
+        """
+        Test whether the constructor successfully initialises the object
+        without an instance dictionary.
+        """
+
+        self.assertEqual(self.o.name, 'NameA')
+        self.assertEqual(self.o.description, 'DescriptionA')
+        self.assertFalse(hasattr(self.o, '__dict__'))
+        with self.assertRaises(AttributeError):
+            self.o.other = 1.0
+
+    def test__str__(self):
+        """
+        Test whether the __str__ method successfully generates a json string
+        representation of the object.
+        """
+
+        str_o = str(self.o)
+        new_o = jsonpickle.decode(str_o)
+        self.assertEqual(str_o, str(new_o))
+        self.assertEqual(new_o.name, 'NameA')
+        self.assertEqual(new_o.value, 1.5)
+
+
 if __name__ == '__main__':
     unittest.main()
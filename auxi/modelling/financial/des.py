@@ -7,7 +7,7 @@ from datetime import datetime
 
 from enum import Enum
 
-from auxi.core.objects import NamedObject
+from auxi.core.objects import NamedObject, SlottedNamedObject
 from auxi.core.reporting import ReportFormat
 
 
@@ -35,7 +35,7 @@ class AccountType(Enum):
 AT = AccountType
 
 
-class GeneralLedgerAccount(NamedObject):
+class GeneralLedgerAccount(SlottedNamedObject):
     """
     Represents an account of a general ledger.
 
@@ -45,6 +45,9 @@ class GeneralLedgerAccount(NamedObject):
     :param account_type: The type of account.
     """
 
+    __slots__ = ('_name', '_parent_path', 'path', 'number', 'account_type',
+                 'accounts')
+
     def __init__(self, name, description=None,
                  number=None,
                  account_type=AccountType.revenue):
@@ -142,7 +145,7 @@ class GeneralLedgerAccount(NamedObject):
             return self[account_name]
 
 
-class Transaction(NamedObject):
+class Transaction(SlottedNamedObject):
     """
     Represents a financial transaction between two general ledger accounts.
 
@@ -159,6 +162,9 @@ class Transaction(NamedObject):
       account.
     """
 
+    __slots__ = ('tx_date', 'dt_account', 'cr_account', 'source', 'amount',
+                 'is_closing_dt_account', 'is_closing_cr_account')
+
     def __init__(self, name, description=None,
                  tx_date=datetime.min.date(),
                  dt_account=None, cr_account=None,
@@ -3,6 +3,9 @@
 This module provides testing code for the auxi.modelling.financial.des module.
 """
 
+import os
+import shutil
+import tempfile
 import unittest
 from datetime import datetime
 
@@ -107,6 +110,16 @@ class TransactionUnitTester(unittest.TestCase):
         self.assertEqual(self.object.is_closing_cr_account, False)
         self.assertEqual(self.object.is_closing_dt_account, False)
         self.assertEqual(self.object.amount, 100.0)
+        self.assertFalse(hasattr(self.object, '__dict__'))
+
+    def test_write_read(self):
+        path = os.path.join(tempfile.mkdtemp(), 'transaction.json')
+        self.object.write(path)
+        new_object = Transaction.read(path)
+        self.assertEqual(new_object.name, "NameA")
+        self.assertEqual(new_object.tx_date, datetime(2016, 2, 1).date())
+        self.assertEqual(new_object.amount, 100.0)
+        shutil.rmtree(os.path.dirname(path))
 
 
 class TransactionTemplateUnitTester(unittest.TestCase):
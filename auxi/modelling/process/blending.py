@@ -0,0 +1,310 @@
+#!/usr/bin/env python3
+"""
+This module provides a linear programming optimiser that finds the minimum
+cost blend of the assays of a thermo material.
+"""
+
+import numpy
+
+from auxi.core.objects import Object
+from auxi.modelling.process.materials import thermo
+
+
+__version__ = '0.3.6'
+__license__ = 'LGPL v3'
+__copyright__ = 'Copyright 2016, Ex Mente Technologies (Pty) Ltd'
+__author__ = 'Christoff Kok, Johan Zietsman'
+__credits__ = ['Christoff Kok', 'Johan Zietsman']
+__maintainer__ = 'Christoff Kok'
+__email__ = 'christoff.kok@ex-mente.co.za'
+__status__ = 'Planning'
+
+
+def _pivot(tableau, problems, rows, columns):
+    """
+    Perform a simplex pivot in each of a number of tableaus.
+
+    :param tableau: [problems x rows x columns] array of tableaus.
+    :param problems: Integer array of the tableaus to pivot.
+    :param rows: Integer array of the pivot row of each tableau.
+    :param columns: Integer array of the pivot column of each tableau.
+    """
+
+    row = tableau[problems, rows] / \
+        tableau[problems, rows, columns][:, None]
+    tableau[problems] -= tableau[problems, :, columns][:, :, None] * \
+        row[:, None, :]
+    tableau[problems, rows] = row
+
+
+def _iterate(tableau, basis, columns, tolerance):
+    """
+    Perform simplex iterations on a number of tableaus until they are
+    optimal. Bland's rule is used to avoid cycling.
+
+    :param tableau: [problems x rows x columns] array of tableaus. The last
+      row contains the reduced costs and the last column the right hand
+      sides.
+    :param basis: [problems x constraints] integer array of the basic
+      variable of each constraint row.
+    :param columns: The number of columns that may enter the basis.
+    :param tolerance: The tolerance of the reduced costs and pivots.
+
+    :returns: Boolean array that indicates the unbounded problems.
+    """
+
+    m = basis.shape[1]
+    unbounded = numpy.zeros(len(tableau), dtype=bool)
+    for _ in range(50 * (m + columns)):
+        candidates = tableau[:, m, :columns] < -tolerance
+        active = numpy.nonzero(candidates.any(axis=1) & ~unbounded)[0]
+        if len(active) == 0:
+            break
+
+        entering = numpy.argmax(candidates[active], axis=1)
+        pivots = tableau[active, :m, entering]
+        positive = pivots > tolerance
+        ratios = numpy.where(
+            positive,
+            tableau[active, :m, -1] / numpy.where(positive, pivots, 1.0),
+            numpy.inf)
+        best = ratios.min(axis=1)
+        bounded = numpy.isfinite(best)
+        unbounded[active[~bounded]] = True
+        ties = ratios[bounded] <= best[bounded, None] + tolerance
+        leaving = numpy.argmin(
+            numpy.where(ties, basis[active[bounded]], basis.max() + columns),
+            axis=1)
+
+        active = active[bounded]
+        entering = entering[bounded]
+        _pivot(tableau, active, leaving, entering)
+        basis[active, leaving] = entering
+    return unbounded
+
+
+def _solve_lp(c, A, b, equalities, tolerance=1.0E-9):
+    """
+    Solve a number of linear programs with the same costs and constraint
+    matrix with the two phase simplex method:
+
+    minimise c x subject to A x = b for the first equalities rows,
+    A x <= b for the remaining rows, and x >= 0.
+
+    :param c: Array of costs.
+    :param A: [constraints x variables] constraint matrix.
+    :param b: [problems x constraints] array of right hand sides.
+    :param equalities: The number of leading equality constraints.
+    :param tolerance: The tolerance of the reduced costs and pivots.
+
+    :returns: [problems x variables] array of optimal solutions. The rows of
+      infeasible and unbounded problems are nan.
+    """
+
+    P, m = b.shape
+    n = A.shape[1]
+    slacks = m - equalities
+    columns = n + slacks
+
+    # Build the tableaus with slack variables for the inequalities and an
+    # artificial variable for every row.
+    sign = numpy.where(b < 0.0, -1.0, 1.0)
+    tableau = numpy.zeros((P, m + 1, columns + m + 1))
+    tableau[:, :m, :n] = A * sign[:, :, None]
+    tableau[:, equalities + numpy.arange(slacks),
+            n + numpy.arange(slacks)] = sign[:, equalities:]
+    tableau[:, numpy.arange(m), columns + numpy.arange(m)] = 1.0
+    tableau[:, :m, -1] = numpy.abs(b)
+    basis = numpy.repeat(columns + numpy.arange(m)[None], P, axis=0)
+
+    # Phase I minimises the sum of the artificial variables.
+    tableau[:, m, :columns] = -tableau[:, :m, :columns].sum(axis=1)
+    tableau[:, m, -1] = -tableau[:, :m, -1].sum(axis=1)
+    _iterate(tableau, basis, columns, tolerance)
+    infeasible = -tableau[:, m, -1] > tolerance * \
+        numpy.maximum(1.0, numpy.abs(b).max(axis=1))
+
+    # Remove artificial variables that remain in the basis at zero. Rows
+    # without another nonzero coefficient are redundant.
+    for row in range(m):
+        pivots = numpy.abs(tableau[:, row, :columns])
+        problems = numpy.nonzero((basis[:, row] >= columns) &
+                                 (pivots.max(axis=1) > tolerance) &
+                                 ~infeasible)[0]
+        if len(problems) > 0:
+            entering = numpy.argmax(pivots[problems], axis=1)
+            _pivot(tableau, problems, numpy.full(len(problems), row),
+                   entering)
+            basis[problems, row] = entering
+
+    # Phase II minimises the cost without the artificial variables.
+    costs = numpy.zeros(columns + m + 1)
+    costs[:n] = c
+    tableau[:, m] = costs - numpy.einsum('pr,prj->pj', costs[basis],
+                                         tableau[:, :m])
+    tableau[infeasible, m] = 0.0
+    unbounded = _iterate(tableau, basis, columns, tolerance)
+
+    result = numpy.zeros((P, columns + m))
+    numpy.put_along_axis(result, basis, tableau[:, :m, -1], axis=1)
+    result = result[:, :n]
+    result[infeasible | unbounded] = numpy.nan
+    return result
+
+
+class BlendOptimiser(Object):
+    """
+    Finds the minimum cost blend of a material's assays that meets
+    specifications of compound and element mass fractions.
+
+    The blend fractions x of the assays are the variables of a linear
+    program that minimises the price of the blend, sum(x p), subject to
+    sum(x) = 1, the specifications and bounds on the fraction of each
+    assay. Many targets are solved together with the same tableau
+    operations.
+
+    :param material: thermo.Material object.
+    :param assays: The names of the assays that may be blended. All the
+      material's assays are used if this is None.
+    :param price: The name of the assay custom property that contains the
+      price of each assay.
+    """
+
+    def __init__(self, material, assays=None, price='Price[USD/kg]'):
+        if not type(material) is thermo.Material:
+            raise TypeError("Invalid material type. Must be "
+                            "thermo.Material")
+
+        self.material = material
+        """The material whose assays are blended."""
+        self.assays = sorted(material.converted_assays.keys()) \
+            if assays is None else list(assays)
+        """The names of the assays that may be blended."""
+
+        prices = []
+        for assay in self.assays:
+            properties = material.assay_custom_properties.get(assay, {})
+            if price not in properties:
+                raise ValueError("Assay '{}' does not have a '{}' property."
+                                 .format(assay, price))
+            prices.append(properties[price])
+        self.prices = numpy.array(prices)
+        """[currency/kg] Array of the price of each assay."""
+
+        compositions = numpy.array(
+            [material.converted_assays[assay] for assay in self.assays],
+            dtype=float)
+        self.compositions = compositions / \
+            compositions.sum(axis=1)[:, None]
+        """
+        [assays x compounds] Array of the normalised compound mass
+        fractions of each assay.
+        """
+
+    def _get_fractions(self, name):
+        """
+        Get the mass fraction of a compound or element in each assay.
+
+        :param name: The formula and phase of a compound, e.g.
+          'TiO2[Srutile]', or an element symbol, e.g. 'Ti'.
+
+        :returns: Array of mass fractions.
+        """
+
+        if name in self.material.compounds:
+            return self.compositions[:, self.material.get_compound_index(
+                name)]
+        if name in self.material.elements:
+            return self.compositions.dot(
+                self.material.element_mass_fractions[
+                    :, self.material.elements.index(name)])
+        raise ValueError("'{}' is not a compound or element of the "
+                         "material.".format(name))
+
+    def solve(self, specifications, bounds=None):
+        """
+        Find the minimum cost blends of one or more targets.
+
+        :param specifications: Dictionary of compound formulas or element
+          symbols and tuples of the minimum and maximum mass fractions in
+          the blend, e.g. {'Ti': (0.28, None)}. None means that the
+          fraction is not limited. A limit may also be an array with a
+          value for each target.
+        :param bounds: Dictionary of assay names and tuples of the minimum
+          and maximum fractions of the assays in the blend, e.g.
+          {'IlmeniteA': (None, 0.4)}, to account for availability. A limit
+          may be an array with a value for each target.
+
+        :returns: Array of the fraction of each assay in the blend, in the
+          sequence of the assays attribute, or a [targets x assays] array
+          if any limit is an array. The fractions of targets that cannot be
+          met are nan. The cost of the blends is the dot product with the
+          prices attribute.
+        """
+
+        N = len(self.assays)
+        bounds = {} if bounds is None else bounds
+        for assay in bounds:
+            if assay not in self.assays:
+                raise ValueError("'{}' is not one of the blended assays."
+                                 .format(assay))
+
+        # Open limits are replaced with redundant ones, because the blend
+        # cannot lie outside the range of its assays.
+        fractions = numpy.array([self._get_fractions(name)
+                                 for name in specifications]).reshape(-1, N)
+        limits = []
+        for name, f in zip(specifications, fractions):
+            minimum, maximum = specifications[name]
+            limits.append(f.min() if minimum is None else minimum)
+            limits.append(f.max() if maximum is None else maximum)
+        for assay in self.assays:
+            minimum, maximum = bounds.get(assay, (None, None))
+            limits.append(0.0 if minimum is None else minimum)
+            limits.append(1.0 if maximum is None else maximum)
+        single = all(numpy.ndim(limit) == 0 for limit in limits)
+        limits = numpy.broadcast_arrays(
+            *[numpy.asarray(limit, dtype=float) for limit in limits])
+        limits = numpy.array([numpy.atleast_1d(limit) for limit in limits]).T
+        lower = limits[:, 2 * len(fractions)::2]
+        upper = limits[:, 2 * len(fractions) + 1::2]
+        if numpy.any(lower < 0.0):
+            raise ValueError("The minimum fraction of an assay cannot be "
+                             "negative.")
+
+        # Shift the variables by the assay minimums so that they are
+        # non-negative. The constraints are sum(x) = 1, the specification
+        # maximums and minimums, and the assay maximums.
+        A = numpy.vstack([numpy.ones((1, N)), fractions, -fractions,
+                          numpy.identity(N)])
+        b = numpy.hstack([numpy.ones((len(limits), 1)),
+                          limits[:, 1:2 * len(fractions):2],
+                          -limits[:, 0:2 * len(fractions):2],
+                          upper]) - lower.dot(A.T)
+        result = _solve_lp(self.prices, A, b, 1) + lower
+        return result[0] if single else result
+
+    def create_package(self, fractions, mass, P=1.0, T=25.0):
+        """
+        Create a package of a blend.
+
+        :param fractions: Array of the fraction of each assay in the blend.
+          See solve.
+        :param mass: [kg] The mass of the package.
+        :param P: [atm] The package pressure.
+        :param T: [°C] The package temperature.
+
+        :returns: thermo.MaterialPackage object.
+        """
+
+        fractions = numpy.asarray(fractions, dtype=float)
+        if numpy.any(numpy.isnan(fractions)):
+            raise Exception("The specifications of the blend cannot be met.")
+        return thermo.MaterialPackage(
+            self.material, mass * fractions.dot(self.compositions), P, T)
+
+
+if __name__ == '__main__':
+    import unittest
+    from auxi.modelling.process.blending_test import BlendOptimiserTester
+    unittest.main()
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+This module provides testing code for the blending module.
+"""
+
+import os
+import unittest
+
+import numpy
+
+from auxi.modelling.process.materials import chem
+from auxi.modelling.process.materials import thermo
+from auxi.modelling.process.blending import BlendOptimiser
+
+
+__version__ = '0.3.6'
+__license__ = 'LGPL v3'
+__copyright__ = 'Copyright 2016, Ex Mente Technologies (Pty) Ltd'
+__author__ = 'Christoff Kok, Johan Zietsman'
+__credits__ = ['Christoff Kok', 'Johan Zietsman']
+__maintainer__ = 'Christoff Kok'
+__email__ = 'christoff.kok@ex-mente.co.za'
+__status__ = 'Planning'
+
+
+class BlendOptimiserTester(unittest.TestCase):
+    """
+    Tester for the auxi.modelling.process.blending.BlendOptimiser class.
+    """
+
+    def setUp(self):
+        self.material = thermo.Material(
+            'ilmenite', os.path.join(os.path.dirname(thermo.__file__),
+                                     'data/thermomaterial.test.ilmenite.txt'))
+        self.optimiser = BlendOptimiser(self.material)
+
+    def check_optimal(self, result, specifications, bounds={}, samples=2000):
+        """
+        Confirm that random feasible blends are not cheaper than the result.
+        """
+
+        random = numpy.random.RandomState(0)
+        blends = random.dirichlet(numpy.ones(3) * 0.5, samples)
+        feasible = numpy.ones(samples, dtype=bool)
+        for name, (minimum, maximum) in specifications.items():
+            f = blends.dot(self.optimiser._get_fractions(name))
+            feasible &= (minimum is None or f >= minimum) & \
+                (maximum is None or f <= maximum)
+        for assay, (minimum, maximum) in bounds.items():
+            f = blends[:, self.optimiser.assays.index(assay)]
+            feasible &= (minimum is None or f >= minimum) & \
+                (maximum is None or f <= maximum)
+        self.assertGreater(feasible.sum(), 0)
+        cost = result.dot(self.optimiser.prices)
+        self.assertLessEqual(cost, blends[feasible].dot(
+            self.optimiser.prices).min() + 1.0E-12)
+
+    def test_constructor(self):
+        self.assertEqual(self.optimiser.assays,
+                         ['IlmeniteA', 'IlmeniteB', 'IlmeniteC'])
+        numpy.testing.assert_allclose(self.optimiser.prices, [1.2, 1.3, 1.1])
+        numpy.testing.assert_allclose(
+            self.optimiser.compositions.sum(axis=1), 1.0)
+
+        self.assertRaises(ValueError, BlendOptimiser, self.material,
+                          None, 'Cost[USD/kg]')
+        self.assertRaises(TypeError, BlendOptimiser, chem.Material(
+            'ilmenite', os.path.join(os.path.dirname(chem.__file__),
+                                     'data/chemmaterial.test.ilmenite.txt')))
+
+    def test_solve(self):
+        # The cheapest assay is used without specifications.
+        numpy.testing.assert_allclose(self.optimiser.solve({}),
+                                      [0.0, 0.0, 1.0], atol=1.0E-12)
+
+        # IlmeniteA is added to IlmeniteC to raise the TiO2 content.
+        specifications = {'TiO2[Srutile]': (0.47, None)}
+        result = self.optimiser.solve(specifications)
+        TiO2 = self.optimiser._get_fractions('TiO2[Srutile]')
+        x = (0.47 - TiO2[2]) / (TiO2[0] - TiO2[2])
+        numpy.testing.assert_allclose(result, [x, 0.0, 1.0 - x], atol=1.0E-9)
+        self.check_optimal(result, specifications)
+
+        # Element specifications and assay bounds.
+        specifications = {'Fe': (0.40, None), 'Ti': (0.22, 0.27)}
+        bounds = {'IlmeniteB': (None, 0.5)}
+        result = self.optimiser.solve(specifications, bounds)
+        self.assertAlmostEqual(result.sum(), 1.0)
+        self.assertLessEqual(result[1], 0.5 + 1.0E-9)
+        self.assertGreaterEqual(result.dot(self.optimiser._get_fractions(
+            'Fe')), 0.40 - 1.0E-9)
+        self.check_optimal(result, specifications, bounds)
+
+        result = self.optimiser.solve({}, {'IlmeniteA': (0.2, None)})
+        numpy.testing.assert_allclose(result, [0.2, 0.0, 0.8], atol=1.0E-12)
+
+    def test_solve_batch(self):
+        minimums = numpy.linspace(0.44, 0.49, 21)
+        result = self.optimiser.solve({'TiO2[Srutile]': (minimums, None),
+                                       'SiO2[S]': (None, 0.02)})
+        self.assertEqual(result.shape, (21, 3))
+        for minimum, fractions in zip(minimums, result):
+            expected = self.optimiser.solve({'TiO2[Srutile]': (minimum, None),
+                                             'SiO2[S]': (None, 0.02)})
+            numpy.testing.assert_allclose(fractions, expected, atol=1.0E-12)
+
+        # The TiO2 content of IlmeniteA is the highest, so more cannot be
+        # achieved.
+        infeasible = minimums > self.optimiser._get_fractions(
+            'TiO2[Srutile]').max()
+        self.assertTrue(numpy.all(numpy.isnan(result[infeasible])))
+        self.assertFalse(numpy.any(numpy.isnan(result[~infeasible])))
+        costs = result[~infeasible].dot(self.optimiser.prices)
+        self.assertTrue(numpy.all(numpy.diff(costs) >= -1.0E-12))
+
+    def test_solve_invalid(self):
+        self.assertRaises(ValueError, self.optimiser.solve,
+                          {'V2O5[S]': (0.01, None)})
+        self.assertRaises(ValueError, self.optimiser.solve, {},
+                          {'IlmeniteD': (0.1, None)})
+        self.assertRaises(ValueError, self.optimiser.solve, {},
+                          {'IlmeniteA': (-0.1, None)})
+
+    def test_create_package(self):
+        result = self.optimiser.solve({'TiO2[Srutile]': (0.47, None)})
+        package = self.optimiser.create_package(result, 1000.0, T=100.0)
+        self.assertAlmostEqual(package.mass, 1000.0)
+        self.assertAlmostEqual(package.T, 100.0)
+        self.assertAlmostEqual(
+            package.get_compound_mass('TiO2[Srutile]'), 470.0)
+
+        self.assertRaises(Exception, self.optimiser.create_package,
+                          self.optimiser.solve({'TiO2[Srutile]':
+                                                (0.5, None)}), 1000.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
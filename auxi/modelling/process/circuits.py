@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""
+This module provides closed grinding circuits that combine a mill and a
+classifier, and solve the recycle directly as a linear system.
+"""
+
+import time
+
+import numpy
+
+from auxi.modelling.process.core import SteadyStateModel
+from auxi.modelling.process.materials import psd
+from auxi.modelling.process.materials import slurry
+
+
+__version__ = '0.3.6'
+__license__ = 'LGPL v3'
+__copyright__ = 'Copyright 2016, Ex Mente Technologies (Pty) Ltd'
+__author__ = 'Christoff Kok, Johan Zietsman'
+__credits__ = ['Christoff Kok', 'Johan Zietsman']
+__maintainer__ = 'Christoff Kok'
+__email__ = 'christoff.kok@ex-mente.co.za'
+__status__ = 'Planning'
+
+
+configurations = ['forward', 'reverse']
+"""The available closed circuit configurations."""
+
+
+class ClosedCircuit(SteadyStateModel):
+    """
+    A closed grinding circuit of a mill and a classifier, such as a ball
+    mill and hydrocyclone, in which the coarse product of the classifier is
+    recycled to the mill.
+
+    In a forward circuit, the fresh feed enters the mill. In a reverse
+    circuit, the fresh feed enters the classifier. The mill and classifier
+    are linear in the size class masses, so the steady state is calculated
+    with one linear solve instead of iterating around the recycle.
+
+    :param name: A name for the unit.
+    :param inlet: The name of the fresh feed package.
+    :param mill: comminution.BallMill object. Its inlet and outlet names
+      are used for the mill feed and product packages.
+    :param classifier: classification.Classifier object. Its inlet and
+      outlet names are used for the classifier feed, recycle and circuit
+      product packages.
+    :param configuration: 'forward' or 'reverse'.
+    :param description: The unit's description.
+    """
+
+    def __init__(self, name, inlet, mill, classifier, configuration='forward',
+                 description=None):
+        super().__init__(name, description)
+        self.inlet = inlet
+        """The name of the fresh feed package."""
+        self.mill = mill
+        """The mill."""
+        self.classifier = classifier
+        """The classifier."""
+        self.parameters.configuration = configuration
+
+        if configuration not in configurations:
+            raise ValueError("Invalid configuration '" + configuration +
+                             "'. Must be one of " + str(configurations) + ".")
+
+    def solve(self, material, size_class_masses):
+        """
+        Calculate the size class masses of the packages in the circuit.
+
+        :param material: psd.Material or slurry.Material object.
+        :param size_class_masses: [kg] Array of fresh feed size class masses,
+          or a [packages x classes] array to solve many feeds at once.
+
+        :returns: Dictionary of the names of the mill feed, mill product,
+          classifier feed, recycle and product packages and their size class
+          masses [kg].
+        """
+
+        mill_matrix = self.mill.get_product_matrix(material)
+        partition = self.classifier.get_partition(material)
+        feed = numpy.asarray(size_class_masses)
+        identity = numpy.identity(len(partition))
+
+        try:
+            if self.parameters.configuration == 'forward':
+                mill_feed = numpy.linalg.solve(
+                    identity - partition[:, numpy.newaxis] * mill_matrix,
+                    feed.T).T
+                mill_product = mill_feed.dot(mill_matrix.T)
+                classifier_feed = mill_product.copy()
+            else:
+                classifier_feed = numpy.linalg.solve(
+                    identity - mill_matrix * partition, feed.T).T
+                mill_feed = classifier_feed * partition
+                mill_product = mill_feed.dot(mill_matrix.T)
+        except numpy.linalg.LinAlgError:
+            raise Exception("The circuit has no steady state. Material that "
+                            "is not broken is recycled completely.")
+
+        # At steady state the product contains all of the fresh feed. This
+        # fails when the system is singular within rounding errors.
+        coarse = classifier_feed * partition
+        product = classifier_feed - coarse
+        if numpy.any(numpy.abs(product.sum(axis=-1) - feed.sum(axis=-1)) >
+                     1.0E-6 * numpy.abs(feed).sum(axis=-1) + 1.0E-300):
+            raise Exception("The circuit has no steady state. Material that "
+                            "is not broken is recycled completely.")
+
+        return {self.mill.inlet: mill_feed,
+                self.mill.outlet: mill_product,
+                self.classifier.inlet: classifier_feed,
+                self.classifier.outlets[0]: coarse,
+                self.classifier.outlets[1]: product}
+
+    def get_circulating_load(self, material, size_class_masses):
+        """
+        Calculate the circulating load of the circuit.
+
+        :param material: psd.Material or slurry.Material object.
+        :param size_class_masses: [kg] Array of fresh feed size class masses,
+          or a [packages x classes] array of many feeds.
+
+        :returns: The ratio of the recycle solid mass to the fresh feed solid
+          mass, or an array of ratios.
+        """
+
+        recycle = self.solve(
+            material, size_class_masses)[self.classifier.outlets[0]]
+        return recycle.sum(axis=-1) / \
+            numpy.asarray(size_class_masses).sum(axis=-1)
+
+    def run(self, streams):
+        """
+        Run the unit.
+
+        :param streams: A dictionary of packages containing the fresh feed
+          package.
+
+        :returns: The streams dictionary with the mill feed, mill product,
+          classifier feed, recycle and product packages.
+
+        The circulating load and solve time are stored in the output
+        variables.
+        """
+
+        start = time.perf_counter()
+        feed = streams[self.inlet]
+        if not (type(feed) is psd.MaterialPackage or
+                type(feed) is slurry.MaterialPackage):
+            raise TypeError("Invalid package type. Must be "
+                            "psd.MaterialPackage or slurry.MaterialPackage")
+
+        masses = self.solve(feed.material, feed.size_class_masses)
+        for name, size_class_masses in masses.items():
+            package = feed.clone()
+            package.size_class_masses = size_class_masses
+            streams[name] = package
+
+        # Water passes through the mill, and a fraction of it is recycled
+        # by the classifier.
+        if type(feed) is slurry.MaterialPackage:
+            recovery = self.classifier.get_water_recovery()
+            if recovery >= 1.0:
+                raise Exception("The circuit has no steady state. All the "
+                                "water is recycled.")
+            water = feed.H2O_mass / (1.0 - recovery)
+            streams[self.mill.inlet].H2O_mass = \
+                water if self.parameters.configuration == 'forward' else \
+                water * recovery
+            streams[self.mill.outlet].H2O_mass = \
+                streams[self.mill.inlet].H2O_mass
+            streams[self.classifier.inlet].H2O_mass = water
+            streams[self.classifier.outlets[0]].H2O_mass = water * recovery
+            streams[self.classifier.outlets[1]].H2O_mass = feed.H2O_mass
+
+        feed_mass = feed.size_class_masses.sum()
+        self.output_variables.circulating_load = \
+            streams[self.classifier.outlets[0]].size_class_masses.sum() / \
+            feed_mass if feed_mass > 0.0 else 0.0
+        self.output_variables.solve_time = time.perf_counter() - start
+        return streams
+
+    class Parameters(object):
+        def __init__(self):
+            self.configuration = 'forward'
+            """
+            'forward' if the fresh feed enters the mill, and 'reverse' if it
+            enters the classifier.
+            """
+
+    class OutputVariables(object):
+        def __init__(self):
+            self.circulating_load = None
+            """
+            The ratio of the recycle solid mass to the fresh feed solid mass.
+            """
+            self.solve_time = None
+            """[s] The time taken to calculate the circuit."""
+
+
+if __name__ == '__main__':
+    import unittest
+    from auxi.modelling.process.circuits_test import ClosedCircuitUnitTester
+    unittest.main()
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+This module provides testing code for classes in the circuits module.
+"""
+
+import os
+import unittest
+
+import numpy
+
+from auxi.modelling.process.materials import psd
+from auxi.modelling.process.materials import slurry
+from auxi.modelling.process.comminution import create_selection_function
+from auxi.modelling.process.comminution import create_breakage_function
+from auxi.modelling.process.comminution import BallMill
+from auxi.modelling.process.classification import \
+    create_plitt_partition_function
+from auxi.modelling.process.classification import Classifier
+from auxi.modelling.process.circuits import ClosedCircuit
+
+
+__version__ = '0.3.6'
+__license__ = 'LGPL v3'
+__copyright__ = 'Copyright 2016, Ex Mente Technologies (Pty) Ltd'
+__author__ = 'Christoff Kok, Johan Zietsman'
+__credits__ = ['Christoff Kok', 'Johan Zietsman']
+__maintainer__ = 'Christoff Kok'
+__email__ = 'christoff.kok@ex-mente.co.za'
+__status__ = 'Planning'
+
+
+def create_circuit(configuration='forward', bypass=0.3, water_recovery=None):
+    mill = BallMill('mill', 'mill feed', 'mill product',
+                    create_selection_function(30.0, 1.0, mu=5.0E-3),
+                    create_breakage_function(0.3, 0.8, 3.0), 0.1, mixers=3)
+    classifier = Classifier(
+        'cyclone', 'cyclone feed', ['underflow', 'overflow'],
+        create_plitt_partition_function(1.0E-3, 2.0), bypass, water_recovery)
+    return ClosedCircuit('circuit', 'feed', mill, classifier, configuration)
+
+
+def iterate(circuit, package, iterations=500):
+    """
+    Converge the circuit by successive substitution of the recycle.
+    """
+
+    streams = {'feed': package, 'underflow': package * 0.0}
+    for _ in range(iterations):
+        if circuit.parameters.configuration == 'forward':
+            streams['mill feed'] = streams['feed'] + streams['underflow']
+            circuit.mill.run(streams)
+            streams['cyclone feed'] = streams['mill product']
+            circuit.classifier.run(streams)
+        else:
+            streams['mill feed'] = streams['underflow']
+            circuit.mill.run(streams)
+            streams['cyclone feed'] = streams['feed'] + \
+                streams['mill product']
+            circuit.classifier.run(streams)
+    return streams
+
+
+class ClosedCircuitUnitTester(unittest.TestCase):
+    """
+    Tester for the auxi.modelling.process.circuits.ClosedCircuit class.
+    """
+
+    def setUp(self):
+        self.material = psd.Material(
+            'materiala', os.path.join(psd.DEFAULT_DATA_PATH,
+                                      'psdmaterial.test.materiala.txt'))
+        self.package = self.material.create_package('FeedA', 100.0)
+
+    def test_constructor(self):
+        self.assertRaises(ValueError, create_circuit, 'backward')
+
+    def test_run_forward(self):
+        circuit = create_circuit()
+        streams = circuit.run({'feed': self.package})
+        expected = iterate(circuit, self.package)
+        for name in ['mill feed', 'mill product', 'cyclone feed',
+                     'underflow', 'overflow']:
+            numpy.testing.assert_allclose(
+                streams[name].size_class_masses,
+                expected[name].size_class_masses, atol=1.0E-6)
+        self.assertAlmostEqual(streams['overflow'].get_mass(), 100.0)
+        self.assertAlmostEqual(circuit.output_variables.circulating_load,
+                               streams['underflow'].get_mass() / 100.0)
+        self.assertGreater(circuit.output_variables.circulating_load, 0.0)
+        self.assertGreater(circuit.output_variables.solve_time, 0.0)
+        self.assertIsNot(streams['mill product'].size_class_masses,
+                         streams['cyclone feed'].size_class_masses)
+
+    def test_run_reverse(self):
+        circuit = create_circuit('reverse')
+        streams = circuit.run({'feed': self.package})
+        expected = iterate(circuit, self.package)
+        for name in ['mill feed', 'mill product', 'cyclone feed',
+                     'underflow', 'overflow']:
+            numpy.testing.assert_allclose(
+                streams[name].size_class_masses,
+                expected[name].size_class_masses, atol=1.0E-6)
+        self.assertAlmostEqual(streams['overflow'].get_mass(), 100.0)
+
+    def test_run_slurry(self):
+        material = slurry.Material(
+            'materiala', os.path.join(slurry.DEFAULT_DATA_PATH,
+                                      'psdslurrymaterial.test.materiala.txt'))
+        package = material.create_package('WetFeedA', 100.0)
+        for configuration in ['forward', 'reverse']:
+            circuit = create_circuit(configuration, water_recovery=0.4)
+            streams = circuit.run({'feed': package})
+            expected = iterate(circuit, package)
+            for name in ['mill feed', 'mill product', 'cyclone feed',
+                         'underflow', 'overflow']:
+                self.assertAlmostEqual(streams[name].H2O_mass,
+                                       expected[name].H2O_mass)
+                numpy.testing.assert_allclose(
+                    streams[name].size_class_masses,
+                    expected[name].size_class_masses, atol=1.0E-6)
+            self.assertAlmostEqual(streams['overflow'].get_mass(), 100.0)
+
+        circuit = create_circuit(water_recovery=1.0)
+        self.assertRaises(Exception, circuit.run, {'feed': package})
+
+    def test_solve_batch(self):
+        circuit = create_circuit()
+        feeds = numpy.array([self.package.size_class_masses,
+                             self.material.create_package(
+                                 'MillCharge', 50.0).size_class_masses])
+        result = circuit.solve(self.material, feeds)
+        for i, feed in enumerate(feeds):
+            single = circuit.solve(self.material, feed)
+            for name in single:
+                numpy.testing.assert_allclose(result[name][i], single[name])
+        numpy.testing.assert_allclose(
+            circuit.get_circulating_load(self.material, feeds),
+            result['underflow'].sum(axis=1) / feeds.sum(axis=1))
+
+    def test_no_steady_state(self):
+        circuit = create_circuit(bypass=1.0)
+        self.assertRaises(Exception, circuit.run, {'feed': self.package})
+
+    def test_run_invalid(self):
+        self.assertRaises(TypeError, create_circuit().run, {'feed': 'a'})
+
+
+if __name__ == '__main__':
+    unittest.main()
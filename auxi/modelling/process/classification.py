@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+"""
+This module provides partition curve classifiers, such as screens and
+hydrocyclones, that separate psd and slurry material packages by size.
+"""
+
+import math
+
+import numpy
+
+from auxi.modelling.process.core import SteadyStateModel
+from auxi.modelling.process.materials import psd
+from auxi.modelling.process.materials import slurry
+
+
+__version__ = '0.3.6'
+__license__ = 'LGPL v3'
+__copyright__ = 'Copyright 2016, Ex Mente Technologies (Pty) Ltd'
+__author__ = 'Christoff Kok, Johan Zietsman'
+__credits__ = ['Christoff Kok', 'Johan Zietsman']
+__maintainer__ = 'Christoff Kok'
+__email__ = 'christoff.kok@ex-mente.co.za'
+__status__ = 'Planning'
+
+
+def create_whiten_partition_function(d50c, alpha, beta=0.0):
+    """
+    Create a Whiten partition function, which calculates the corrected
+    fraction of each size class that reports to the coarse product from its
+    mean particle size d:
+
+    E = 1 - (1 + beta beta* x) (e^alpha - 1) /
+        (e^(alpha beta* x) + e^alpha - 2)
+
+    where x = d / d50c, and beta* is chosen so that E = 0.5 at d50c. A
+    positive beta makes E negative at fine sizes, so that the actual
+    partition dips below the bypass fraction.
+
+    :param d50c: [m] The corrected cut size.
+    :param alpha: The sharpness of the separation.
+    :param beta: The size of the fish-hook at fine sizes. Zero gives the
+      Lynch and Rao curve.
+
+    :returns: Function that takes an array of mean sizes [m] and returns an
+      array of corrected partition fractions.
+    """
+
+    ea = math.exp(alpha)
+
+    def residual(beta_star):
+        return 2.0 * (1.0 + beta * beta_star) * (ea - 1.0) - \
+            (math.exp(alpha * beta_star) + ea - 2.0)
+
+    low, high = 1.0, 1.0
+    if beta > 0.0:
+        while residual(high) > 0.0:
+            low, high = high, high * 2.0
+        for _ in range(100):
+            middle = 0.5 * (low + high)
+            if residual(middle) > 0.0:
+                low = middle
+            else:
+                high = middle
+    beta_star = 0.5 * (low + high)
+
+    def partition(sizes):
+        x = numpy.asarray(sizes, dtype=float) / d50c
+        with numpy.errstate(over='ignore'):
+            fine = (1.0 + beta * beta_star * x) * (ea - 1.0) / \
+                (numpy.exp(alpha * beta_star * x) + ea - 2.0)
+        return 1.0 - fine
+
+    return partition
+
+
+def create_plitt_partition_function(d50c, m):
+    """
+    Create a Plitt (Rosin-Rammler) partition function, which calculates the
+    corrected fraction of each size class that reports to the coarse product
+    from its mean particle size d:
+
+    E = 1 - exp(-ln(2) (d / d50c)^m)
+
+    :param d50c: [m] The corrected cut size.
+    :param m: The sharpness of the separation.
+
+    :returns: Function that takes an array of mean sizes [m] and returns an
+      array of corrected partition fractions.
+    """
+
+    def partition(sizes):
+        x = numpy.asarray(sizes, dtype=float) / d50c
+        return 1.0 - numpy.exp(-math.log(2.0) * x ** m)
+
+    return partition
+
+
+class Classifier(SteadyStateModel):
+    """
+    Separates a psd or slurry material package into a coarse product, such
+    as a screen oversize or hydrocyclone underflow, and a fine product, such
+    as a screen undersize or hydrocyclone overflow.
+
+    The fraction of size class i that reports to the coarse product is
+
+    E_i = bypass + (1 - bypass) Ec(d_i)
+
+    where Ec is the corrected partition function, d_i the mean size of the
+    class and bypass the fraction of the feed that short-circuits to the
+    coarse product with the water.
+
+    :param name: A name for the unit.
+    :param inlet: The name of the inlet package.
+    :param outlets: The names of the coarse and fine outlet packages.
+    :param partition: Function that takes an array of mean sizes [m] and
+      returns the corrected partition fractions. See
+      create_whiten_partition_function and create_plitt_partition_function.
+    :param bypass: The fraction of the feed solids that bypasses
+      classification to the coarse product.
+    :param water_recovery: The fraction of the feed water that reports to
+      the coarse product. This is equal to bypass if it is None.
+    :param description: The unit's description.
+    """
+
+    def __init__(self, name, inlet, outlets, partition, bypass=0.0,
+                 water_recovery=None, description=None):
+        super().__init__(name, description)
+        self.inlet = inlet
+        """The name of the inlet package."""
+        self.outlets = list(outlets)
+        """The names of the coarse and fine outlet packages."""
+        self.parameters.partition = partition
+        self.parameters.bypass = bypass
+        self.parameters.water_recovery = water_recovery
+
+        if len(self.outlets) != 2:
+            raise Exception("A classifier requires a coarse and a fine "
+                            "outlet.")
+        if not 0.0 <= bypass <= 1.0:
+            raise ValueError("The bypass fraction must be between 0 and 1.")
+
+        self._partitions = {}
+
+    def get_partition(self, material):
+        """
+        Calculate the fraction of each size class that reports to the
+        coarse product.
+
+        :param material: psd.Material or slurry.Material object.
+
+        :returns: Array of fractions.
+        """
+
+        key = tuple(material.size_classes)
+        partition = self._partitions.get(key, None)
+        if partition is None or \
+           partition[0] is not self.parameters.partition or \
+           partition[1] != self.parameters.bypass:
+            bypass = self.parameters.bypass
+            corrected = self.parameters.partition(
+                psd.get_mean_sizes(material.size_classes))
+            partition = (self.parameters.partition, bypass, numpy.clip(
+                bypass + (1.0 - bypass) * corrected, 0.0, 1.0))
+            self._partitions[key] = partition
+        return partition[2]
+
+    def get_water_recovery(self):
+        """
+        Get the fraction of the feed water that reports to the coarse
+        product.
+
+        :returns: Fraction.
+        """
+
+        if self.parameters.water_recovery is None:
+            return self.parameters.bypass
+        return self.parameters.water_recovery
+
+    def split_masses(self, material, size_class_masses):
+        """
+        Split size class masses into the coarse and fine products.
+
+        :param material: psd.Material or slurry.Material object.
+        :param size_class_masses: [kg] Array of feed size class masses, or a
+          [packages x classes] array to classify many feeds at once.
+
+        :returns: Tuple of the coarse and fine size class masses [kg].
+        """
+
+        size_class_masses = numpy.asarray(size_class_masses)
+        coarse = size_class_masses * self.get_partition(material)
+        return coarse, size_class_masses - coarse
+
+    def split_H2O_masses(self, H2O_masses):
+        """
+        Split feed water masses into the coarse and fine products.
+
+        :param H2O_masses: [kg] Feed water mass, or an array of masses.
+
+        :returns: Tuple of the coarse and fine water masses [kg].
+        """
+
+        coarse = H2O_masses * self.get_water_recovery()
+        return coarse, H2O_masses - coarse
+
+    def classify(self, package):
+        """
+        Separate a package into a coarse and a fine product.
+
+        :param package: psd.MaterialPackage or slurry.MaterialPackage object.
+
+        :returns: Tuple of the coarse and fine packages.
+        """
+
+        if not (type(package) is psd.MaterialPackage or
+                type(package) is slurry.MaterialPackage):
+            raise TypeError("Invalid package type. Must be "
+                            "psd.MaterialPackage or slurry.MaterialPackage")
+
+        coarse = package.clone()
+        fine = package.clone()
+        coarse.size_class_masses, fine.size_class_masses = self.split_masses(
+            package.material, package.size_class_masses)
+        if type(package) is slurry.MaterialPackage:
+            coarse.H2O_mass, fine.H2O_mass = self.split_H2O_masses(
+                package.H2O_mass)
+        return coarse, fine
+
+    def run(self, streams):
+        """
+        Run the unit.
+
+        :param streams: A dictionary of packages containing the inlet
+          package.
+
+        :returns: The streams dictionary with the outlet packages.
+        """
+
+        streams.update(zip(self.outlets, self.classify(streams[self.inlet])))
+        return streams
+
+    class Parameters(object):
+        def __init__(self):
+            self.partition = None
+            """
+            Function that calculates the corrected partition fractions from
+            the mean sizes [m] of the size classes.
+            """
+            self.bypass = 0.0
+            """
+            The fraction of the feed solids that bypasses classification to
+            the coarse product.
+            """
+            self.water_recovery = None
+            """
+            The fraction of the feed water that reports to the coarse
+            product. None indicates that it equals the bypass fraction.
+            """
+
+
+if __name__ == '__main__':
+    import unittest
+    from auxi.modelling.process.classification_test import \
+        PartitionFunctionTester
+    from auxi.modelling.process.classification_test import \
+        ClassifierUnitTester
+    unittest.main()
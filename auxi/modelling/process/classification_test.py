@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+This module provides testing code for classes in the classification module.
+"""
+
+import os
+import unittest
+
+import numpy
+
+from auxi.modelling.process.materials import psd
+from auxi.modelling.process.materials import slurry
+from auxi.modelling.process.classification import \
+    create_whiten_partition_function
+from auxi.modelling.process.classification import \
+    create_plitt_partition_function
+from auxi.modelling.process.classification import Classifier
+
+
+__version__ = '0.3.6'
+__license__ = 'LGPL v3'
+__copyright__ = 'Copyright 2016, Ex Mente Technologies (Pty) Ltd'
+__author__ = 'Christoff Kok, Johan Zietsman'
+__credits__ = ['Christoff Kok', 'Johan Zietsman']
+__maintainer__ = 'Christoff Kok'
+__email__ = 'christoff.kok@ex-mente.co.za'
+__status__ = 'Planning'
+
+
+class PartitionFunctionTester(unittest.TestCase):
+    """
+    Tester for the partition functions in the
+    auxi.modelling.process.classification module.
+    """
+
+    def test_whiten(self):
+        sizes = numpy.logspace(-6, -2, 50)
+        partition = create_whiten_partition_function(1.0E-4, 3.0)
+        self.assertAlmostEqual(float(partition(1.0E-4)), 0.5)
+        result = partition(sizes)
+        self.assertTrue(numpy.all(numpy.diff(result) >= 0.0))
+        self.assertAlmostEqual(result[0], 0.0, places=2)
+        self.assertAlmostEqual(result[-1], 1.0)
+
+    def test_whiten_fish_hook(self):
+        sizes = numpy.logspace(-6, -2, 50)
+        partition = create_whiten_partition_function(1.0E-4, 3.0, 0.5)
+        self.assertAlmostEqual(float(partition(1.0E-4)), 0.5)
+        result = partition(sizes)
+        self.assertLess(result.min(), 0.0)
+        self.assertAlmostEqual(result[-1], 1.0)
+
+    def test_plitt(self):
+        sizes = numpy.logspace(-6, -2, 50)
+        partition = create_plitt_partition_function(1.0E-4, 2.0)
+        self.assertAlmostEqual(float(partition(1.0E-4)), 0.5)
+        self.assertTrue(numpy.all(numpy.diff(partition(sizes)) >= 0.0))
+
+
+class ClassifierUnitTester(unittest.TestCase):
+    """
+    Tester for the auxi.modelling.process.classification.Classifier class.
+    """
+
+    def setUp(self):
+        self.material = psd.Material(
+            'materiala', os.path.join(psd.DEFAULT_DATA_PATH,
+                                      'psdmaterial.test.materiala.txt'))
+        self.package = self.material.create_package('FeedA', 100.0)
+        self.slurry_material = slurry.Material(
+            'materiala', os.path.join(slurry.DEFAULT_DATA_PATH,
+                                      'psdslurrymaterial.test.materiala.txt'))
+        self.slurry_package = self.slurry_material.create_package(
+            'WetFeedA', 100.0)
+
+    def create_classifier(self, bypass=0.0, water_recovery=None):
+        return Classifier(
+            'cyclone', 'feed', ['underflow', 'overflow'],
+            create_plitt_partition_function(5.0E-3, 2.0), bypass,
+            water_recovery)
+
+    def test_constructor(self):
+        partition = create_plitt_partition_function(5.0E-3, 2.0)
+        self.assertRaises(Exception, Classifier, 'c', 'a', ['b'], partition)
+        self.assertRaises(ValueError, Classifier, 'c', 'a', ['b', 'c'],
+                          partition, 1.5)
+
+    def test_get_partition(self):
+        classifier = self.create_classifier(0.2)
+        partition = classifier.get_partition(self.material)
+        self.assertAlmostEqual(partition[0], 1.0)
+        self.assertAlmostEqual(partition[-1], 0.2, places=3)
+        self.assertIs(classifier.get_partition(self.material), partition)
+
+        classifier.parameters.bypass = 0.0
+        self.assertAlmostEqual(
+            classifier.get_partition(self.material)[-1], 0.0, places=3)
+
+    def test_classify(self):
+        coarse, fine = self.create_classifier().classify(self.package)
+        numpy.testing.assert_allclose(
+            coarse.size_class_masses + fine.size_class_masses,
+            self.package.size_class_masses)
+        self.assertGreater(coarse.size_class_masses[0],
+                           fine.size_class_masses[0])
+        self.assertLess(coarse.size_class_masses[-2],
+                        fine.size_class_masses[-2])
+        self.assertLess(fine.get_mean_size(), coarse.get_mean_size())
+
+    def test_classify_slurry(self):
+        package = self.slurry_package
+        coarse, fine = self.create_classifier(0.3).classify(package)
+        self.assertAlmostEqual(coarse.H2O_mass, package.H2O_mass * 0.3)
+        self.assertAlmostEqual(coarse.H2O_mass + fine.H2O_mass,
+                               package.H2O_mass)
+        self.assertAlmostEqual(coarse.get_mass() + fine.get_mass(),
+                               package.get_mass())
+        self.assertEqual(coarse.solid_density, package.solid_density)
+
+        coarse, fine = self.create_classifier(0.3, 0.5).classify(package)
+        self.assertAlmostEqual(fine.H2O_mass, package.H2O_mass * 0.5)
+
+    def test_classify_invalid(self):
+        self.assertRaises(TypeError, self.create_classifier().classify,
+                          'feed')
+
+    def test_split_masses(self):
+        classifier = self.create_classifier(0.1)
+        feeds = numpy.array([self.package.size_class_masses,
+                             self.material.create_package(
+                                 'MillCharge', 50.0).size_class_masses])
+        coarse, fine = classifier.split_masses(self.material, feeds)
+        self.assertEqual(coarse.shape, feeds.shape)
+        numpy.testing.assert_allclose(coarse + fine, feeds)
+        for feed, result in zip(feeds, coarse):
+            numpy.testing.assert_allclose(
+                result, classifier.split_masses(self.material, feed)[0])
+
+        coarse, fine = classifier.split_H2O_masses(numpy.array([10.0, 20.0]))
+        numpy.testing.assert_allclose(coarse, [1.0, 2.0])
+        numpy.testing.assert_allclose(fine, [9.0, 18.0])
+
+    def test_run(self):
+        streams = self.create_classifier().run({'feed': self.package})
+        self.assertAlmostEqual(streams['underflow'].get_mass() +
+                               streams['overflow'].get_mass(), 100.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
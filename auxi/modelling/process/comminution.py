@@ -0,0 +1,294 @@
+#!/usr/bin/env python3
+"""
+This module provides population balance comminution models that grind psd
+and slurry material packages.
+"""
+
+import numpy
+
+from auxi.modelling.process.core import SteadyStateModel
+from auxi.modelling.process.materials import psd
+from auxi.modelling.process.materials import slurry
+
+
+__version__ = '0.3.6'
+__license__ = 'LGPL v3'
+__copyright__ = 'Copyright 2016, Ex Mente Technologies (Pty) Ltd'
+__author__ = 'Christoff Kok, Johan Zietsman'
+__credits__ = ['Christoff Kok', 'Johan Zietsman']
+__maintainer__ = 'Christoff Kok'
+__email__ = 'christoff.kok@ex-mente.co.za'
+__status__ = 'Planning'
+
+
+def create_selection_function(a, alpha, mu=None, Lambda=2.0, x1=1.0E-3):
+    """
+    Create an Austin selection function, which calculates the specific
+    breakage rate of each size class from its mean particle size x:
+
+    S = a (x / x1)^alpha / (1 + (x / mu)^Lambda)
+
+    :param a: [1/h] The specific breakage rate of particles of size x1.
+    :param alpha: The exponent of the particle size.
+    :param mu: [m] The particle size at which the breakage rate is reduced to
+      half of the power law value by inefficient nipping of large particles.
+      The power law is used on its own if this is None.
+    :param Lambda: The exponent that sets how quickly the breakage rate
+      decreases above mu.
+    :param x1: [m] The reference particle size.
+
+    :returns: Function that takes an array of mean sizes [m] and returns an
+      array of specific breakage rates [1/h].
+    """
+
+    def selection(sizes):
+        sizes = numpy.asarray(sizes, dtype=float)
+        result = a * (sizes / x1) ** alpha
+        if mu is not None:
+            result = result / (1.0 + (sizes / mu) ** Lambda)
+        return result
+
+    return selection
+
+
+def create_breakage_function(phi, gamma, beta):
+    """
+    Create a normalised Austin breakage function. The cumulative mass
+    fraction of the broken product of size class j that passes the upper
+    size x of size class i is
+
+    B = phi (x / y)^gamma + (1 - phi) (x / y)^beta
+
+    where y is the lower size of size class j.
+
+    :param phi: The fraction of the fines produced by the gamma term.
+    :param gamma: The exponent of the fines.
+    :param beta: The exponent of the coarse fragments.
+
+    :returns: Function that takes a list of size classes [m] and returns a
+      [classes x classes] matrix of the mass fractions of the broken product
+      of each size class (column) that report to each size class (row).
+    """
+
+    def breakage(size_classes):
+        sizes = numpy.asarray(size_classes, dtype=float)
+        n = len(sizes)
+        cumulative = numpy.zeros((n + 1, n))
+        for j in range(n - 1):
+            ratio = sizes[j:n - 1] / sizes[j]
+            cumulative[j + 1:n, j] = phi * ratio ** gamma + \
+                (1.0 - phi) * ratio ** beta
+        return numpy.tril(cumulative[:-1] - cumulative[1:], -1)
+
+    return breakage
+
+
+class BallMill(SteadyStateModel):
+    """
+    A population balance ball mill model that grinds a psd or slurry
+    material package.
+
+    The mass of size class i changes at the rate
+
+    dm_i/dt = -S_i m_i + sum_j b_ij S_j m_j
+
+    where S is the selection function and b the breakage function. The
+    equations are solved with the eigen-decomposition of the breakage rate
+    matrix, which is calculated only once for each material's size classes.
+    Grinding then requires only a matrix-vector product.
+
+    :param name: A name for the unit.
+    :param inlet: The name of the inlet package.
+    :param outlet: The name of the outlet package.
+    :param selection: Function that takes an array of mean sizes [m] and
+      returns the specific breakage rates [1/h]. See
+      create_selection_function.
+    :param breakage: Function that takes a list of size classes [m] and
+      returns the breakage function matrix. See create_breakage_function.
+    :param residence_time: [h] The mean residence time of the material in
+      the mill.
+    :param mixers: The number of equal perfectly mixed tanks in series that
+      describes the residence time distribution of the mill. The mill is a
+      plug flow mill if this is None.
+    :param description: The unit's description.
+
+    The selection rates of two size classes must differ, unless no broken
+    material reaches the finer of them. The finest size class does not
+    break.
+    """
+
+    def __init__(self, name, inlet, outlet, selection, breakage,
+                 residence_time, mixers=None, description=None):
+        super().__init__(name, description)
+        self.inlet = inlet
+        """The name of the inlet package."""
+        self.outlet = outlet
+        """The name of the outlet package."""
+        self.parameters.selection = selection
+        self.parameters.breakage = breakage
+        self.parameters.residence_time = residence_time
+        self.parameters.mixers = mixers
+
+        if mixers is not None and mixers < 1:
+            raise ValueError("The number of mixers must be at least one.")
+
+        self._decompositions = {}
+
+    def _get_decomposition(self, material):
+        """
+        Get the eigen-decomposition of the breakage rate matrix of a
+        material.
+
+        :param material: psd.Material or slurry.Material object.
+
+        :returns: Tuple of the specific breakage rates [1/h], the
+          eigenvector matrix and its inverse.
+        """
+
+        key = tuple(material.size_classes)
+        decomposition = self._decompositions.get(key, None)
+        if decomposition is not None and \
+           decomposition[0] is self.parameters.selection and \
+           decomposition[1] is self.parameters.breakage:
+            return decomposition[2:]
+
+        S = numpy.array(self.parameters.selection(
+            psd.get_mean_sizes(material.size_classes)), dtype=float)
+        S[-1] = 0.0
+        b = numpy.array(self.parameters.breakage(material.size_classes),
+                        dtype=float)
+        n = len(S)
+        if b.shape != (n, n):
+            raise Exception("The breakage function does not match the number "
+                            "of size classes.")
+
+        A = numpy.tril(b, -1) * S - numpy.diag(S)
+        tolerance = 1.0E-12 * max(numpy.abs(A).max(), 1.0E-300)
+        V = numpy.identity(n)
+        for j in range(n):
+            for i in range(j + 1, n):
+                total = A[i, j:i].dot(V[j:i, j])
+                difference = S[i] - S[j]
+                if abs(difference) > tolerance:
+                    V[i, j] = total / difference
+                elif abs(total) > tolerance:
+                    raise Exception(
+                        "Size classes " + str(j) + " and " + str(i) +
+                        " have the same selection rate.")
+        V_inverse = numpy.linalg.inv(V)
+
+        self._decompositions[key] = (self.parameters.selection,
+                                     self.parameters.breakage,
+                                     S, V, V_inverse)
+        return S, V, V_inverse
+
+    def _get_response(self, S, time):
+        """
+        Calculate the factor by which each mode of the population balance is
+        reduced in the mill.
+
+        :param S: [1/h] The specific breakage rates.
+        :param time: [h] The batch grinding time. The mill's residence time
+          distribution is used if this is None.
+
+        :returns: Array of factors.
+        """
+
+        if time is not None:
+            return numpy.exp(-S * time)
+
+        tau = self.parameters.residence_time
+        mixers = self.parameters.mixers
+        if mixers is None:
+            return numpy.exp(-S * tau)
+        return (1.0 + S * tau / mixers) ** -mixers
+
+    def get_product_matrix(self, material, time=None):
+        """
+        Calculate the matrix that transforms feed size class masses into
+        product size class masses.
+
+        :param material: psd.Material or slurry.Material object.
+        :param time: [h] The batch grinding time. The mill's residence time
+          distribution is used if this is None.
+
+        :returns: [classes x classes] matrix.
+        """
+
+        S, V, V_inverse = self._get_decomposition(material)
+        return (V * self._get_response(S, time)).dot(V_inverse)
+
+    def get_product_masses(self, material, size_class_masses, time=None):
+        """
+        Calculate the product size class masses of the mill.
+
+        :param material: psd.Material or slurry.Material object.
+        :param size_class_masses: [kg] Array of feed size class masses, or a
+          [packages x classes] array to grind many feeds at once.
+        :param time: [h] The batch grinding time. The mill's residence time
+          distribution is used if this is None.
+
+        :returns: [kg] Array of product size class masses with the same shape
+          as size_class_masses.
+        """
+
+        S, V, V_inverse = self._get_decomposition(material)
+        modes = numpy.asarray(size_class_masses).dot(V_inverse.T)
+        return (modes * self._get_response(S, time)).dot(V.T)
+
+    def grind(self, package, time=None):
+        """
+        Grind a package.
+
+        :param package: psd.MaterialPackage or slurry.MaterialPackage object.
+        :param time: [h] The batch grinding time. The mill's residence time
+          distribution is used if this is None.
+
+        :returns: A new package with the ground size class masses.
+        """
+
+        if not (type(package) is psd.MaterialPackage or
+                type(package) is slurry.MaterialPackage):
+            raise TypeError("Invalid package type. Must be "
+                            "psd.MaterialPackage or slurry.MaterialPackage")
+
+        result = package.clone()
+        result.size_class_masses = self.get_product_masses(
+            package.material, package.size_class_masses, time)
+        return result
+
+    def run(self, streams):
+        """
+        Run the unit.
+
+        :param streams: A dictionary of packages containing the inlet
+          package.
+
+        :returns: The streams dictionary with the outlet package.
+        """
+
+        streams[self.outlet] = self.grind(streams[self.inlet])
+        return streams
+
+    class Parameters(object):
+        def __init__(self):
+            self.selection = None
+            """
+            Function that calculates the specific breakage rates [1/h] from
+            the mean sizes [m] of the size classes.
+            """
+            self.breakage = None
+            """Function that calculates the breakage function matrix."""
+            self.residence_time = None
+            """[h] The mean residence time of the material in the mill."""
+            self.mixers = None
+            """
+            The number of perfectly mixed tanks in series. None indicates
+            plug flow.
+            """
+
+
+if __name__ == '__main__':
+    import unittest
+    from auxi.modelling.process.comminution_test import BallMillUnitTester
+    unittest.main()
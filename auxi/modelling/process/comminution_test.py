@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+This module provides testing code for classes in the comminution module.
+"""
+
+import os
+import unittest
+
+import numpy
+
+from auxi.modelling.process.materials import psd
+from auxi.modelling.process.materials import slurry
+from auxi.modelling.process.comminution import create_selection_function
+from auxi.modelling.process.comminution import create_breakage_function
+from auxi.modelling.process.comminution import BallMill
+
+
+__version__ = '0.3.6'
+__license__ = 'LGPL v3'
+__copyright__ = 'Copyright 2016, Ex Mente Technologies (Pty) Ltd'
+__author__ = 'Christoff Kok, Johan Zietsman'
+__credits__ = ['Christoff Kok', 'Johan Zietsman']
+__maintainer__ = 'Christoff Kok'
+__email__ = 'christoff.kok@ex-mente.co.za'
+__status__ = 'Planning'
+
+
+def create_mill(residence_time=0.2, mixers=None):
+    return BallMill('mill', 'feed', 'product',
+                    create_selection_function(30.0, 1.0, mu=5.0E-3),
+                    create_breakage_function(0.3, 0.8, 3.0),
+                    residence_time, mixers)
+
+
+def integrate(mill, material, masses, time, steps=2000):
+    """
+    Integrate the population balance with fourth order Runge-Kutta steps.
+    """
+
+    S = mill.parameters.selection(psd.get_mean_sizes(material.size_classes))
+    S[-1] = 0.0
+    A = mill.parameters.breakage(material.size_classes) * S - numpy.diag(S)
+    dt = time / steps
+    for _ in range(steps):
+        k1 = A.dot(masses)
+        k2 = A.dot(masses + 0.5 * dt * k1)
+        k3 = A.dot(masses + 0.5 * dt * k2)
+        k4 = A.dot(masses + dt * k3)
+        masses = masses + dt * (k1 + 2.0 * k2 + 2.0 * k3 + k4) / 6.0
+    return masses
+
+
+class BallMillUnitTester(unittest.TestCase):
+    """
+    Tester for the auxi.modelling.process.comminution.BallMill class.
+    """
+
+    def setUp(self):
+        self.material = psd.Material(
+            'materiala', os.path.join(psd.DEFAULT_DATA_PATH,
+                                      'psdmaterial.test.materiala.txt'))
+        self.package = self.material.create_package('FeedA', 100.0)
+
+    def test_breakage_function(self):
+        b = create_breakage_function(0.3, 0.8, 3.0)(
+            self.material.size_classes)
+        numpy.testing.assert_allclose(b.sum(axis=0)[:-1], 1.0)
+        self.assertEqual(b[:, -1].sum(), 0.0)
+        self.assertTrue(numpy.all(numpy.triu(b) == 0.0))
+        self.assertTrue(numpy.all(b >= 0.0))
+
+    def test_constructor(self):
+        self.assertRaises(ValueError, create_mill, 0.2, 0)
+
+    def test_grind_batch(self):
+        mill = create_mill()
+        result = mill.grind(self.package, 0.1)
+        self.assertAlmostEqual(result.get_mass(), self.package.get_mass())
+        numpy.testing.assert_allclose(
+            result.size_class_masses,
+            integrate(mill, self.material, self.package.size_class_masses,
+                      0.1), atol=1.0E-8)
+        self.assertLess(result.get_passing_size(80.0),
+                        self.package.get_passing_size(80.0))
+
+        # Grinding longer gives a finer product.
+        longer = mill.grind(self.package, 0.2)
+        self.assertLess(longer.get_passing_size(80.0),
+                        result.get_passing_size(80.0))
+
+        # A batch grind is the same as two consecutive half grinds.
+        numpy.testing.assert_allclose(
+            longer.size_class_masses,
+            mill.grind(result, 0.1).size_class_masses, atol=1.0E-10)
+
+    def test_grind_continuous(self):
+        material = self.material
+        feed = self.package.size_class_masses
+        plug = create_mill()
+        numpy.testing.assert_allclose(
+            plug.grind(self.package).size_class_masses,
+            plug.grind(self.package, 0.2).size_class_masses)
+
+        # A perfectly mixed mill satisfies feed + A product tau = product.
+        mixed = create_mill(mixers=1)
+        S = mixed.parameters.selection(
+            psd.get_mean_sizes(material.size_classes))
+        S[-1] = 0.0
+        A = mixed.parameters.breakage(material.size_classes) * S - \
+            numpy.diag(S)
+        expected = numpy.linalg.solve(
+            numpy.identity(len(S)) - A * 0.2, feed)
+        result = mixed.grind(self.package)
+        numpy.testing.assert_allclose(result.size_class_masses, expected,
+                                      atol=1.0E-10)
+        self.assertAlmostEqual(result.get_mass(), 100.0)
+
+        # Mixing broadens the residence time distribution, which leaves more
+        # coarse material unbroken, and many mixers approach plug flow.
+        self.assertGreater(result.size_class_masses[0],
+                           plug.grind(self.package).size_class_masses[0])
+        numpy.testing.assert_allclose(
+            create_mill(mixers=10000).grind(self.package).size_class_masses,
+            plug.grind(self.package).size_class_masses, atol=1.0E-2)
+
+    def test_get_product_matrix(self):
+        mill = create_mill(mixers=3)
+        matrix = mill.get_product_matrix(self.material)
+        numpy.testing.assert_allclose(
+            matrix.dot(self.package.size_class_masses),
+            mill.grind(self.package).size_class_masses)
+        numpy.testing.assert_allclose(matrix.sum(axis=0), 1.0)
+
+    def test_get_product_masses(self):
+        mill = create_mill(mixers=3)
+        feeds = numpy.array([self.package.size_class_masses,
+                             self.material.create_package(
+                                 'MillCharge', 50.0).size_class_masses])
+        result = mill.get_product_masses(self.material, feeds)
+        self.assertEqual(result.shape, feeds.shape)
+        for feed, product in zip(feeds, result):
+            numpy.testing.assert_allclose(
+                product, mill.get_product_masses(self.material, feed))
+
+    def test_decomposition_cache(self):
+        mill = create_mill()
+        mill.grind(self.package)
+        mill.grind(self.package, 0.5)
+        self.assertEqual(len(mill._decompositions), 1)
+        decomposition = mill._get_decomposition(self.material)
+
+        mill.parameters.selection = create_selection_function(60.0, 1.0)
+        self.assertIsNot(mill._get_decomposition(self.material)[1],
+                         decomposition[1])
+
+    def test_equal_selection_rates(self):
+        mill = create_mill()
+        mill.parameters.selection = lambda sizes: numpy.ones(len(sizes))
+        self.assertRaises(Exception, mill.grind, self.package)
+
+    def test_grind_slurry(self):
+        material = slurry.Material(
+            'materiala', os.path.join(slurry.DEFAULT_DATA_PATH,
+                                      'psdslurrymaterial.test.materiala.txt'))
+        package = material.create_package('WetFeedA', 100.0)
+        mill = create_mill(mixers=3)
+        result = mill.grind(package)
+        self.assertEqual(result.H2O_mass, package.H2O_mass)
+        self.assertEqual(result.solid_density, package.solid_density)
+        self.assertAlmostEqual(result.get_mass(), package.get_mass())
+        numpy.testing.assert_allclose(
+            result.size_class_masses,
+            mill.grind(psd.MaterialPackage(
+                self.material, package.size_class_masses)).size_class_masses)
+
+    def test_grind_invalid(self):
+        self.assertRaises(TypeError, create_mill().grind, 'feed')
+
+    def test_run(self):
+        feed = self.package.size_class_masses.copy()
+        streams = create_mill().run({'feed': self.package})
+        self.assertAlmostEqual(streams['product'].get_mass(), 100.0)
+        numpy.testing.assert_array_equal(self.package.size_class_masses, feed)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,575 @@
+#!/usr/bin/env python3
+"""
+This module provides a sequential-modular flowsheet that connects process
+models with named material streams and converges recycle loops.
+"""
+
+import time
+import warnings
+
+import numpy
+
+from auxi.core.objects import Object
+from auxi.modelling.process.core import SteadyStateModel
+from auxi.modelling.process.materials.thermo import MaterialStream
+
+
+__version__ = '0.3.6'
+__license__ = 'LGPL v3'
+__copyright__ = 'Copyright 2016, Ex Mente Technologies (Pty) Ltd'
+__author__ = 'Christoff Kok, Johan Zietsman'
+__credits__ = ['Christoff Kok', 'Johan Zietsman']
+__maintainer__ = 'Christoff Kok'
+__email__ = 'christoff.kok@ex-mente.co.za'
+__status__ = 'Planning'
+
+
+epsilon = 1.0e-3
+"""
+[kg/h, kWh/h] Default convergence criterion for the mass and enthalpy flow
+rates of tear streams.
+"""
+
+methods = ['direct', 'wegstein', 'broyden']
+"""The available recycle convergence methods."""
+
+
+def stream_to_vector(stream):
+    """
+    Create the convergence vector of a stream.
+
+    :param stream: MaterialStream object.
+
+    :returns: Array containing the compound mass flow rates [kg/h] followed
+      by the enthalpy flow rate [kWh/h].
+    """
+
+    return numpy.append(stream._compound_mfrs, stream.Hfr)
+
+
+def vector_to_stream(template, vector):
+    """
+    Create a stream from a convergence vector.
+
+    :param template: MaterialStream from which the material, pressure,
+      temperature guess and coal properties are taken.
+    :param vector: Array containing the compound mass flow rates [kg/h]
+      followed by the enthalpy flow rate [kWh/h].
+
+    :returns: New MaterialStream object.
+    """
+
+    mfrs = numpy.maximum(vector[:-1], 0.0)
+    result = MaterialStream(template.material, mfrs, template.P, template.T,
+                            template.isCoal, template.HHV)
+    if result.mfr > 0.0:
+        result.Hfr = vector[-1]
+    return result
+
+
+class Unit(Object):
+    """
+    A process model placed on a flowsheet.
+
+    :param model: The process model. Its run method receives the flowsheet's
+      stream dictionary.
+    :param inlets: The names of the streams that the model consumes.
+    :param outlets: The names of the streams that the model produces.
+    """
+
+    def __init__(self, model, inlets, outlets):
+        self.model = model
+        """The process model."""
+        self.inlets = list(inlets)
+        """The names of the streams consumed by the model."""
+        self.outlets = list(outlets)
+        """The names of the streams produced by the model."""
+
+    @property
+    def name(self):
+        """
+        Get the name of the unit's model.
+        """
+
+        return self.model.name
+
+
+class Block(Object):
+    """
+    A group of units that is calculated together. A block with tear streams
+    is a recycle loop that must be converged.
+
+    :param units: The units in calculation order.
+    :param tear_streams: The names of the streams torn to break the recycle
+      loops in the block.
+    """
+
+    def __init__(self, units, tear_streams):
+        self.units = units
+        """The units in calculation order."""
+        self.tear_streams = tear_streams
+        """The names of the tear streams."""
+
+    @property
+    def is_recycle(self):
+        """
+        Determine whether the block contains a recycle loop.
+        """
+
+        return len(self.tear_streams) > 0
+
+
+class BlockStatistics(Object):
+    """
+    Convergence statistics of a flowsheet block.
+
+    :param units: The names of the units in the block.
+    :param tear_streams: The names of the block's tear streams.
+    """
+
+    def __init__(self, units, tear_streams):
+        self.units = units
+        """The names of the units in the block."""
+        self.tear_streams = tear_streams
+        """The names of the block's tear streams."""
+        self.iterations = 0
+        """The number of block iterations performed."""
+        self.residuals = []
+        """The maximum absolute tear stream residual of each iteration."""
+        self.converged = len(tear_streams) == 0
+        """Indicates whether the block converged."""
+        self.time = 0.0
+        """[s] The time spent calculating the block."""
+
+
+class Statistics(Object):
+    """
+    Calculation statistics of a flowsheet run.
+    """
+
+    def __init__(self):
+        self.blocks = []
+        """BlockStatistics objects in calculation order."""
+        self.unit_times = {}
+        """[s] Dictionary of the time spent in each unit."""
+        self.unit_calls = {}
+        """Dictionary of the number of times that each unit was run."""
+        self.time = 0.0
+        """[s] Total time of the flowsheet run."""
+
+    def __str__(self):
+        b1 = '=' * 67 + '\n'
+        b2 = '-' * 67 + '\n'
+        result = b1
+        result += 'Flowsheet Statistics\n'
+        result += b1
+        result += 'Total time'.ljust(30) + '{:.6f} s\n'.format(self.time)
+        result += b2
+        result += 'Block'.ljust(30) + 'Iterations'.rjust(12) + \
+            'Residual'.rjust(15) + 'Converged'.rjust(10) + '\n'
+        result += b2
+        for block in self.blocks:
+            residual = block.residuals[-1] if len(block.residuals) > 0 \
+                else 0.0
+            result += ', '.join(block.units)[:29].ljust(30)
+            result += str(block.iterations).rjust(12)
+            result += '{:.6e}'.format(residual).rjust(15)
+            result += str(block.converged).rjust(10) + '\n'
+        result += b2
+        result += 'Unit'.ljust(30) + 'Calls'.rjust(12) + 'Time'.rjust(15) + \
+            '\n'
+        result += b2
+        for name in sorted(self.unit_times, key=self.unit_times.get,
+                           reverse=True):
+            result += name[:29].ljust(30)
+            result += str(self.unit_calls[name]).rjust(12)
+            result += '{:.6f} s'.format(self.unit_times[name]).rjust(15)
+            result += '\n'
+        result += b1
+        return result
+
+
+class Flowsheet(SteadyStateModel):
+    """
+    A steady state flowsheet that connects process models with named material
+    streams, determines their calculation order and converges recycle loops
+    by tearing streams.
+
+    :param name: A name for the flowsheet.
+    :param description: The flowsheet's description.
+    :param method: The recycle convergence method, one of 'direct',
+      'wegstein' or 'broyden'.
+    :param tolerance: [kg/h, kWh/h] Convergence criterion for the tear
+      stream mass and enthalpy flow rates.
+    :param max_iterations: The maximum number of iterations per recycle
+      block.
+    """
+
+    def __init__(self, name, description=None, method='wegstein',
+                 tolerance=epsilon, max_iterations=100):
+        super().__init__(name, description)
+
+        if method not in methods:
+            raise ValueError("Invalid convergence method '{}'. Must be one "
+                             "of {}.".format(method, methods))
+
+        self.units = []
+        """The units on the flowsheet, in the sequence they were added."""
+        self.method = method
+        """The recycle convergence method."""
+        self.tolerance = tolerance
+        """[kg/h, kWh/h] Tear stream convergence criterion."""
+        self.max_iterations = max_iterations
+        """The maximum number of iterations per recycle block."""
+        self.wegstein_bounds = (-5.0, 0.0)
+        """The lower and upper bounds of the Wegstein acceleration factor."""
+        self.tear_streams = None
+        """
+        The names of the streams to tear. They are selected automatically if
+        this is None.
+        """
+        self.statistics = None
+        """The Statistics object of the most recent run."""
+        self._unit_names = set()
+        self._producers = {}
+
+    def add_model(self, model, inlets, outlets):
+        """
+        Add a process model to the flowsheet.
+
+        :param model: The process model.
+        :param inlets: The names of the streams that the model consumes.
+        :param outlets: The names of the streams that the model produces.
+
+        :returns: The Unit object that places the model on the flowsheet.
+        """
+
+        if model.name in self._unit_names:
+            raise ValueError("A model named '{}' is already on the "
+                             "flowsheet.".format(model.name))
+        for outlet in outlets:
+            if outlet in self._producers:
+                raise ValueError("Stream '{}' is already produced by "
+                                 "'{}'.".format(outlet,
+                                                self._producers[outlet]))
+
+        result = Unit(model, inlets, outlets)
+        self.units.append(result)
+        self._unit_names.add(model.name)
+        for outlet in result.outlets:
+            self._producers[outlet] = model.name
+        return result
+
+    def get_feed_streams(self):
+        """
+        Determine the streams that are consumed but not produced by the
+        flowsheet's units.
+
+        :returns: List of stream names.
+        """
+
+        produced = {s for u in self.units for s in u.outlets}
+        result = []
+        for unit in self.units:
+            for s in unit.inlets:
+                if s not in produced and s not in result:
+                    result.append(s)
+        return result
+
+    def _get_graph(self):
+        """
+        Create the unit graph of the flowsheet.
+
+        :returns: Dictionary of unit indices and lists of (successor index,
+          stream name) tuples.
+        """
+
+        producers = {s: i for i, u in enumerate(self.units) for s in u.outlets}
+        graph = {i: [] for i in range(len(self.units))}
+        for i, unit in enumerate(self.units):
+            for s in unit.inlets:
+                if s in producers:
+                    graph[producers[s]].append((i, s))
+        return graph
+
+    def _get_components(self, graph):
+        """
+        Determine the strongly connected components of the unit graph with
+        Tarjan's algorithm. The depth-first search uses an explicit stack,
+        so that long chains of units do not exceed the recursion limit.
+
+        :param graph: The unit graph.
+
+        :returns: List of components, each a list of unit indices, in
+          topological order.
+        """
+
+        index = {}
+        lowlink = {}
+        stack = []
+        on_stack = set()
+        result = []
+
+        def start(v):
+            index[v] = lowlink[v] = len(index)
+            stack.append(v)
+            on_stack.add(v)
+            return v, iter(graph[v])
+
+        for root in graph:
+            if root in index:
+                continue
+            work = [start(root)]
+            while len(work) > 0:
+                v, successors = work[-1]
+                for w, _ in successors:
+                    if w not in index:
+                        work.append(start(w))
+                        break
+                    elif w in on_stack:
+                        lowlink[v] = min(lowlink[v], index[w])
+                else:
+                    # All the successors of v have been visited.
+                    work.pop()
+                    if len(work) > 0:
+                        u = work[-1][0]
+                        lowlink[u] = min(lowlink[u], lowlink[v])
+                    if lowlink[v] == index[v]:
+                        component = []
+                        while True:
+                            w = stack.pop()
+                            on_stack.remove(w)
+                            component.append(w)
+                            if w == v:
+                                break
+                        result.append(sorted(component))
+
+        result.reverse()
+        return result
+
+    def _order_component(self, graph, component):
+        """
+        Determine the calculation order and tear streams of a strongly
+        connected component.
+
+        :param graph: The unit graph.
+        :param component: List of unit indices in the component.
+
+        :returns: List of unit indices in calculation order.
+        :returns: List of tear stream names.
+        """
+
+        members = set(component)
+        edges = [(u, v, s) for u in component for v, s in graph[u]
+                 if v in members]
+        if len(edges) == 0:
+            return component, []
+
+        if self.tear_streams is None:
+            # Order the units by reverse depth-first post-order, starting at
+            # the first unit added to the flowsheet. The edges pointing back
+            # in this order are torn.
+            visited = set()
+            post = []
+            for root in component:
+                if root in visited:
+                    continue
+                visited.add(root)
+                work = [(root, iter(graph[root]))]
+                while len(work) > 0:
+                    v, successors = work[-1]
+                    for w, _ in successors:
+                        if w in members and w not in visited:
+                            visited.add(w)
+                            work.append((w, iter(graph[w])))
+                            break
+                    else:
+                        work.pop()
+                        post.append(v)
+            order = list(reversed(post))
+            position = {v: i for i, v in enumerate(order)}
+            tears = []
+            for u, v, s in edges:
+                if position[v] <= position[u] and s not in tears:
+                    tears.append(s)
+            return order, tears
+
+        # Tear the specified streams and sort the remaining edges
+        # topologically.
+        tears = []
+        for u, v, s in edges:
+            if s in self.tear_streams and s not in tears:
+                tears.append(s)
+        remaining = [(u, v) for u, v, s in edges if s not in tears]
+        order = []
+        incoming = {v: 0 for v in component}
+        for u, v in remaining:
+            incoming[v] += 1
+        ready = [v for v in component if incoming[v] == 0]
+        while len(ready) > 0:
+            u = ready.pop(0)
+            order.append(u)
+            for x, v in remaining:
+                if x == u:
+                    incoming[v] -= 1
+                    if incoming[v] == 0:
+                        ready.append(v)
+        if len(order) < len(component):
+            names = [self.units[i].name for i in component]
+            raise Exception("The specified tear streams do not break all "
+                            "the recycle loops between {}.".format(names))
+        return order, tears
+
+    def get_calculation_order(self):
+        """
+        Determine the calculation order of the flowsheet.
+
+        :returns: List of Block objects in calculation order.
+        """
+
+        graph = self._get_graph()
+        result = []
+        for component in self._get_components(graph):
+            order, tears = self._order_component(graph, component)
+            result.append(Block([self.units[i] for i in order], tears))
+        return result
+
+    def _run_unit(self, unit, streams, statistics):
+        start = time.perf_counter()
+        result = unit.model.run(streams)
+        duration = time.perf_counter() - start
+        statistics.unit_times[unit.name] += duration
+        statistics.unit_calls[unit.name] += 1
+        if result is not None and result is not streams:
+            streams.update(result)
+
+    def _accelerate(self, state, x, fx):
+        """
+        Calculate the next tear stream vector.
+
+        :param state: Dictionary holding the convergence history.
+        :param x: The tear vector used in the current iteration.
+        :param fx: The tear vector calculated in the current iteration.
+
+        :returns: The tear vector for the next iteration.
+        """
+
+        if self.method == 'direct' or 'x' not in state:
+            result = fx
+            if self.method == 'broyden':
+                state['Hinv'] = -numpy.eye(len(x))
+
+        elif self.method == 'wegstein':
+            dx = x - state['x']
+            dfx = fx - state['fx']
+            with numpy.errstate(divide='ignore', invalid='ignore'):
+                slope = numpy.where(dx != 0.0, dfx / dx, 0.0)
+                q = numpy.where(slope != 1.0, slope / (slope - 1.0), 0.0)
+            q = numpy.clip(q, *self.wegstein_bounds)
+            result = q * x + (1.0 - q) * fx
+
+        else:  # broyden
+            g = fx - x
+            dx = x - state['x']
+            dg = g - (state['fx'] - state['x'])
+            Hinv = state['Hinv']
+            Hdg = Hinv.dot(dg)
+            denominator = dx.dot(Hdg)
+            if denominator != 0.0:
+                Hinv = Hinv + numpy.outer(dx - Hdg, dx.dot(Hinv)) / \
+                    denominator
+                state['Hinv'] = Hinv
+            result = x - Hinv.dot(g)
+
+        state['x'] = x
+        state['fx'] = fx
+        return result
+
+    def _run_block(self, block, streams, statistics):
+        block_statistics = BlockStatistics([u.name for u in block.units],
+                                           list(block.tear_streams))
+        statistics.blocks.append(block_statistics)
+        start = time.perf_counter()
+
+        if not block.is_recycle:
+            for unit in block.units:
+                self._run_unit(unit, streams, statistics)
+            block_statistics.iterations = 1
+            block_statistics.time = time.perf_counter() - start
+            return
+
+        missing = [s for s in block.tear_streams if s not in streams]
+        if len(missing) > 0:
+            raise Exception("Initial estimates must be provided for the tear "
+                            "streams {}.".format(missing))
+
+        templates = [streams[s] for s in block.tear_streams]
+        sizes = [len(stream_to_vector(t)) for t in templates]
+        splits = numpy.cumsum(sizes)[:-1]
+        x = numpy.concatenate([stream_to_vector(t) for t in templates])
+        state = {}
+
+        for iteration in range(self.max_iterations):
+            for unit in block.units:
+                self._run_unit(unit, streams, statistics)
+            templates = [streams[s] for s in block.tear_streams]
+            fx = numpy.concatenate([stream_to_vector(t) for t in templates])
+
+            residual = numpy.abs(fx - x).max()
+            block_statistics.iterations = iteration + 1
+            block_statistics.residuals.append(residual)
+            if residual <= self.tolerance:
+                block_statistics.converged = True
+                break
+
+            x = self._accelerate(state, x, fx)
+            for s, t, v in zip(block.tear_streams, templates,
+                               numpy.split(x, splits)):
+                streams[s] = vector_to_stream(t, v)
+
+        if not block_statistics.converged:
+            warnings.warn("The recycle loop of {} did not converge in {} "
+                          "iterations. The tear stream residual is {:.6e}."
+                          .format(block_statistics.units,
+                                  self.max_iterations,
+                                  block_statistics.residuals[-1]))
+
+        block_statistics.time = time.perf_counter() - start
+
+    def run(self, streams):
+        """
+        Run the flowsheet.
+
+        :param streams: A dictionary of streams. It must contain the feed
+          streams and initial estimates of the tear streams.
+
+        :returns: The streams dictionary with all the streams calculated by
+          the flowsheet's units.
+
+        The calculation statistics are available in the statistics attribute
+        after the run.
+        """
+
+        missing = [s for s in self.get_feed_streams() if s not in streams]
+        if len(missing) > 0:
+            raise Exception("The feed streams {} were not provided."
+                            .format(missing))
+
+        statistics = Statistics()
+        for unit in self.units:
+            statistics.unit_times[unit.name] = 0.0
+            statistics.unit_calls[unit.name] = 0
+        self.statistics = statistics
+
+        start = time.perf_counter()
+        for block in self.get_calculation_order():
+            self._run_block(block, streams, statistics)
+        statistics.time = time.perf_counter() - start
+
+        return streams
+
+
+if __name__ == '__main__':
+    import unittest
+    from auxi.modelling.process.flowsheet_test import FlowsheetUnitTester
+    unittest.main()
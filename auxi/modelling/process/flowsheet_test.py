@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+This module provides testing code for classes in the flowsheet module.
+"""
+
+import sys
+import unittest
+import warnings
+
+from auxi.core.helpers import get_path_relative_to_module as get_path
+from auxi.modelling.process.core import SteadyStateModel
+from auxi.modelling.process.flowsheet import Flowsheet
+from auxi.modelling.process.materials.thermo import Material
+
+
+__version__ = '0.3.6'
+__license__ = 'LGPL v3'
+__copyright__ = 'Copyright 2016, Ex Mente Technologies (Pty) Ltd'
+__author__ = 'Christoff Kok, Johan Zietsman'
+__credits__ = ['Christoff Kok', 'Johan Zietsman']
+__maintainer__ = 'Christoff Kok'
+__email__ = 'christoff.kok@ex-mente.co.za'
+__status__ = 'Planning'
+
+
+class Mixer(SteadyStateModel):
+    def __init__(self, name, inlets, outlet):
+        super().__init__(name)
+        self.inlets = inlets
+        self.outlet = outlet
+
+    def run(self, streams):
+        result = streams[self.inlets[0]].clone()
+        for inlet in self.inlets[1:]:
+            result = result + streams[inlet]
+        streams[self.outlet] = result
+        return streams
+
+
+class Splitter(SteadyStateModel):
+    def __init__(self, name, inlet, outlets, fraction):
+        super().__init__(name)
+        self.inlet = inlet
+        self.outlets = outlets
+        self.fraction = fraction
+
+    def run(self, streams):
+        inlet = streams[self.inlet]
+        streams[self.outlets[0]] = inlet * self.fraction
+        streams[self.outlets[1]] = inlet * (1.0 - self.fraction)
+        return streams
+
+
+class FlowsheetUnitTester(unittest.TestCase):
+    """
+    Tester for the auxi.modelling.process.flowsheet.Flowsheet class.
+    """
+
+    def setUp(self):
+        self.material = Material(
+            'material',
+            get_path(__file__,
+                     'materials/data/thermomaterial.test.ilmenite.txt'))
+        self.feed = self.material.create_stream('IlmeniteA', 1000.0, T=25.0)
+
+        # feed + recycle -> mixer -> mixed -> splitter -> recycle, product
+        self.flowsheet = Flowsheet('Test Flowsheet')
+        self.flowsheet.add_model(
+            Mixer('mixer', ['feed', 'recycle'], 'mixed'),
+            ['feed', 'recycle'], ['mixed'])
+        self.flowsheet.add_model(
+            Splitter('splitter', 'mixed', ['recycle', 'product'], 0.6),
+            ['mixed'], ['recycle', 'product'])
+
+    def _get_streams(self):
+        return {'feed': self.feed,
+                'recycle': self.material.create_stream('IlmeniteA', 0.0)}
+
+    def test_constructor(self):
+        self.assertEqual(self.flowsheet.name, 'Test Flowsheet')
+        self.assertEqual(self.flowsheet.method, 'wegstein')
+        self.assertRaises(ValueError, Flowsheet, 'Test', method='newton')
+
+    def test_add_model(self):
+        self.assertRaises(ValueError, self.flowsheet.add_model,
+                          Mixer('mixer', ['a'], 'b'), ['a'], ['b'])
+        self.assertRaises(ValueError, self.flowsheet.add_model,
+                          Mixer('mixer2', ['a'], 'product'), ['a'],
+                          ['product'])
+
+    def test_get_feed_streams(self):
+        self.assertEqual(self.flowsheet.get_feed_streams(), ['feed'])
+
+    def test_get_calculation_order(self):
+        self.flowsheet.add_model(
+            Mixer('final', ['product'], 'final_product'),
+            ['product'], ['final_product'])
+        blocks = self.flowsheet.get_calculation_order()
+        self.assertEqual(len(blocks), 2)
+        self.assertEqual([u.name for u in blocks[0].units],
+                         ['mixer', 'splitter'])
+        self.assertEqual(blocks[0].tear_streams, ['recycle'])
+        self.assertEqual([u.name for u in blocks[1].units], ['final'])
+        self.assertFalse(blocks[1].is_recycle)
+
+    def test_get_calculation_order_long_chain(self):
+        # The searches do not recurse, so chains that are longer than the
+        # recursion limit can be ordered.
+        n = sys.getrecursionlimit() + 100
+        flowsheet = Flowsheet('chain')
+        for i in range(n - 1, -1, -1):
+            flowsheet.add_model(
+                Mixer('unit' + str(i), ['s' + str(i)], 's' + str(i + 1)),
+                ['s' + str(i)], ['s' + str(i + 1)])
+        blocks = flowsheet.get_calculation_order()
+        self.assertEqual([b.units[0].name for b in blocks],
+                         ['unit' + str(i) for i in range(n)])
+
+        # Closing the chain creates one recycle loop with all the units.
+        flowsheet.add_model(Mixer('closer', ['s' + str(n)], 's0'),
+                            ['s' + str(n)], ['s0'])
+        blocks = flowsheet.get_calculation_order()
+        self.assertEqual(len(blocks), 1)
+        self.assertEqual(len(blocks[0].units), n + 1)
+        self.assertEqual(len(blocks[0].tear_streams), 1)
+
+    def test_get_calculation_order_specified_tears(self):
+        self.flowsheet.tear_streams = ['mixed']
+        blocks = self.flowsheet.get_calculation_order()
+        self.assertEqual([u.name for u in blocks[0].units],
+                         ['splitter', 'mixer'])
+        self.assertEqual(blocks[0].tear_streams, ['mixed'])
+
+        self.flowsheet.tear_streams = ['product']
+        self.assertRaises(Exception, self.flowsheet.get_calculation_order)
+
+    def _test_run(self, method):
+        self.flowsheet.method = method
+        streams = self.flowsheet.run(self._get_streams())
+        expected = self.feed.mfr / (1.0 - 0.6)
+        self.assertAlmostEqual(streams['mixed'].mfr, expected, places=2)
+        self.assertAlmostEqual(streams['product'].mfr, self.feed.mfr,
+                               places=2)
+        self.assertAlmostEqual(streams['product'].T, 25.0, places=3)
+
+        statistics = self.flowsheet.statistics
+        self.assertTrue(statistics.blocks[0].converged)
+        self.assertLessEqual(statistics.blocks[0].residuals[-1],
+                             self.flowsheet.tolerance)
+        self.assertEqual(statistics.unit_calls['mixer'],
+                         statistics.blocks[0].iterations)
+        self.assertGreater(statistics.unit_times['mixer'], 0.0)
+        self.assertIn('Flowsheet Statistics', str(statistics))
+        return statistics.blocks[0].iterations
+
+    def test_run_direct(self):
+        self._test_run('direct')
+
+    def test_run_wegstein(self):
+        iterations = self._test_run('wegstein')
+        self.assertLess(iterations, 10)
+
+    def test_run_broyden(self):
+        iterations = self._test_run('broyden')
+        self.assertLess(iterations, 10)
+
+    def test_run_not_converged(self):
+        self.flowsheet.method = 'direct'
+        self.flowsheet.max_iterations = 3
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter('always')
+            self.flowsheet.run(self._get_streams())
+        self.assertEqual(len(caught), 1)
+        self.assertIn('did not converge', str(caught[0].message))
+        block = self.flowsheet.statistics.blocks[0]
+        self.assertFalse(block.converged)
+        self.assertEqual(block.iterations, 3)
+
+    def test_run_missing_streams(self):
+        self.assertRaises(Exception, self.flowsheet.run, {})
+        self.assertRaises(Exception, self.flowsheet.run,
+                          {'feed': self.feed})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,292 @@
+#!/usr/bin/env python3
+"""
+This module provides settling velocity, deposition velocity and friction
+head loss correlations for the flow of slurry material packages in pipes.
+
+The functions accept arrays of flow rates and pipe diameters, which are
+broadcast against each other, so that a pipeline design sweep is
+calculated in one call.
+"""
+
+import math
+
+import numpy
+
+from auxi.modelling.process.materials import psd
+from auxi.modelling.process.materials import slurry
+
+
+__version__ = '0.3.6'
+__license__ = 'LGPL v3'
+__copyright__ = 'Copyright 2016, Ex Mente Technologies (Pty) Ltd'
+__author__ = 'Christoff Kok, Johan Zietsman'
+__credits__ = ['Christoff Kok', 'Johan Zietsman']
+__maintainer__ = 'Christoff Kok'
+__email__ = 'christoff.kok@ex-mente.co.za'
+__status__ = 'Planning'
+
+
+g = 9.81
+"""[m/s2] Gravitational acceleration."""
+
+water_density = 1000.0
+"""[kg/m3] The density of water."""
+
+water_viscosity = 1.0E-3
+"""[Pa.s] The dynamic viscosity of water."""
+
+pipe_roughness = 4.5E-5
+"""[m] Default absolute pipe roughness, that of commercial steel."""
+
+methods = ['durand', 'wasp']
+"""The available slurry head loss methods."""
+
+_durand_coefficient = 81.0
+_von_karman_constant = 0.4
+
+
+def _get_solids(package):
+    """
+    Get the properties of the solids in a package.
+
+    :param package: slurry.MaterialPackage object.
+
+    :returns: Tuple of the solid relative density, the volume fraction
+      solids, the mass fraction of each size class in the solids, and the
+      mean size of each size class [m].
+    """
+
+    if not type(package) is slurry.MaterialPackage:
+        raise TypeError("Invalid package type. Must be "
+                        "slurry.MaterialPackage")
+
+    solid_mass = package.get_solid_mass()
+    if solid_mass > 0.0:
+        fractions = package.size_class_masses / solid_mass
+    else:
+        fractions = numpy.zeros(len(package.size_class_masses))
+    return (package.solid_density / 1.0,
+            package.get_volume_fraction_solids(),
+            fractions,
+            psd.get_mean_sizes(package.material.size_classes))
+
+
+def _get_terminal_velocities(sizes, relative_density):
+    """
+    Calculate the terminal settling velocity of single spheres in water
+    with the Ferguson and Church correlation, which covers the Stokes,
+    intermediate and Newton regimes without iteration.
+
+    :param sizes: [m] Array of particle sizes.
+    :param relative_density: The density of the particles relative to water.
+
+    :returns: [m/s] Array of settling velocities.
+    """
+
+    R = relative_density - 1.0
+    nu = water_viscosity / water_density
+    return R * g * sizes ** 2 / \
+        (18.0 * nu + numpy.sqrt(0.75 * 0.4 * R * g * sizes ** 3))
+
+
+def _get_drag_coefficients(sizes, velocities, relative_density):
+    """
+    Calculate the drag coefficients of spheres that settle at their
+    terminal velocity.
+
+    :param sizes: [m] Array of particle sizes.
+    :param velocities: [m/s] Array of settling velocities.
+    :param relative_density: The density of the particles relative to the
+      fluid.
+
+    :returns: Array of drag coefficients.
+    """
+
+    return 4.0 * g * sizes * (relative_density - 1.0) / \
+        (3.0 * velocities ** 2)
+
+
+def _get_friction_factors(reynolds_numbers, relative_roughness):
+    """
+    Calculate Darcy friction factors, with the Swamee-Jain approximation of
+    the Colebrook equation for turbulent flow.
+
+    :param reynolds_numbers: Array of Reynolds numbers.
+    :param relative_roughness: Array of pipe roughness to diameter ratios.
+
+    :returns: Array of friction factors.
+    """
+
+    Re = numpy.maximum(reynolds_numbers, 1.0E-12)
+    turbulent = 0.25 / numpy.log10(relative_roughness / 3.7 +
+                                   5.74 / Re ** 0.9) ** 2
+    return numpy.where(Re < 2000.0, 64.0 / Re, turbulent)
+
+
+def get_velocities(flow_rates, diameters):
+    """
+    Calculate the mean velocity in pipes.
+
+    :param flow_rates: [m3/h] Volumetric flow rate, or an array.
+    :param diameters: [m] Internal pipe diameter, or an array that is
+      broadcast against flow_rates.
+
+    :returns: [m/s] Velocity, or an array.
+    """
+
+    diameters = numpy.asarray(diameters, dtype=float)
+    return numpy.asarray(flow_rates, dtype=float) / 3600.0 / \
+        (math.pi * diameters ** 2 / 4.0)
+
+
+def get_representative_size(package):
+    """
+    Calculate the representative particle size of a package, the mass
+    weighted average of the size class mean sizes.
+
+    :param package: slurry.MaterialPackage object.
+
+    :returns: [m] Particle size.
+    """
+
+    _, _, fractions, sizes = _get_solids(package)
+    return fractions.dot(sizes)
+
+
+def get_settling_velocities(package, hindered=True):
+    """
+    Calculate the settling velocity of each size class of a package in
+    water.
+
+    :param package: slurry.MaterialPackage object.
+    :param hindered: Indicates whether the velocities are reduced for the
+      presence of the other particles with the Richardson-Zaki equation.
+
+    :returns: [m/s] Array of settling velocities.
+    """
+
+    s, Cv, _, sizes = _get_solids(package)
+    result = _get_terminal_velocities(sizes, s)
+    if hindered:
+        Re = result * sizes * water_density / water_viscosity
+        n = (4.7 + 0.41 * Re ** 0.75) / (1.0 + 0.175 * Re ** 0.75)
+        result = result * (1.0 - Cv) ** n
+    return result
+
+
+def get_deposition_velocities(package, diameters):
+    """
+    Calculate the velocity below which solids deposit in pipes with the
+    Wasp correlation.
+
+    :param package: slurry.MaterialPackage object.
+    :param diameters: [m] Internal pipe diameter, or an array.
+
+    :returns: [m/s] Deposition velocity, or an array.
+    """
+
+    s, Cv, fractions, sizes = _get_solids(package)
+    d = fractions.dot(sizes)
+    D = numpy.asarray(diameters, dtype=float)
+    return 3.116 * Cv ** 0.186 * (d / D) ** (1.0 / 6.0) * \
+        numpy.sqrt(2.0 * g * D * (s - 1.0))
+
+
+def get_water_head_losses(flow_rates, diameters, roughness=pipe_roughness):
+    """
+    Calculate the friction head loss of water flowing in pipes.
+
+    :param flow_rates: [m3/h] Volumetric flow rate, or an array.
+    :param diameters: [m] Internal pipe diameter, or an array that is
+      broadcast against flow_rates.
+    :param roughness: [m] Absolute pipe roughness.
+
+    :returns: [m water/m] Hydraulic gradient, or an array.
+    """
+
+    D = numpy.asarray(diameters, dtype=float)
+    V = get_velocities(flow_rates, D)
+    Re = water_density * V * D / water_viscosity
+    return _get_friction_factors(Re, roughness / D) * V ** 2 / (2.0 * g * D)
+
+
+def get_head_losses(package, flow_rates, diameters, method='wasp',
+                    roughness=pipe_roughness):
+    """
+    Calculate the friction head loss of a slurry flowing in pipes.
+
+    :param package: slurry.MaterialPackage object that describes the slurry
+      composition. Its mass does not matter.
+    :param flow_rates: [m3/h] Volumetric slurry flow rate, or an array.
+    :param diameters: [m] Internal pipe diameter, or an array that is
+      broadcast against flow_rates.
+    :param method: 'durand' or 'wasp'.
+
+      * 'durand' adds the Durand-Condolios excess head loss of the
+        representative particle size to the water head loss.
+      * 'wasp' splits each size class into a homogeneous fraction, which
+        increases the density and viscosity of the carrier, and a
+        heterogeneous fraction, which adds a Durand excess head loss. The
+        split follows the concentration ratio between the top and the
+        centre of the pipe, 10^(-1.8 w / (k u*)).
+
+    :param roughness: [m] Absolute pipe roughness.
+
+    :returns: [m water/m] Hydraulic gradient, or an array.
+
+    The correlations are valid above the deposition velocity.
+    """
+
+    if method not in methods:
+        raise ValueError("Invalid method '{}'.".format(method))
+
+    s, Cv, fractions, sizes = _get_solids(package)
+    if Cv == 0.0:
+        return get_water_head_losses(flow_rates, diameters, roughness)
+    D = numpy.asarray(diameters, dtype=float)
+    V = get_velocities(flow_rates, D)
+
+    with numpy.errstate(divide='ignore', invalid='ignore'):
+        if method == 'durand':
+            i_w = get_water_head_losses(flow_rates, D, roughness)
+            d = fractions.dot(sizes)
+            C_D = _get_drag_coefficients(
+                d, _get_terminal_velocities(d, s), s)
+            excess = _durand_coefficient * Cv * \
+                (g * D * (s - 1.0) / (V ** 2 * numpy.sqrt(C_D))) ** 1.5
+            result = i_w * (1.0 + excess)
+            return result[()] if result.ndim == 0 else result
+
+        # Split each size class into homogeneous and heterogeneous parts.
+        w = _get_terminal_velocities(sizes, s)
+        C_D = _get_drag_coefficients(sizes, w, s)
+        f_w = _get_friction_factors(water_density * V * D / water_viscosity,
+                                    roughness / D)
+        u_star = (V * numpy.sqrt(f_w / 8.0))[..., numpy.newaxis]
+        homogeneous = numpy.clip(
+            10.0 ** (-1.8 * w / (_von_karman_constant * u_star)), 0.0, 1.0)
+        C_h = Cv * (homogeneous * fractions).sum(axis=-1)
+        C_het = Cv * (1.0 - homogeneous) * fractions
+
+        # The homogeneous part forms the carrier with Thomas' viscosity.
+        rho_v = water_density * (1.0 + C_h * (s - 1.0))
+        mu_v = water_viscosity * (1.0 + 2.5 * C_h + 10.05 * C_h ** 2 +
+                                  0.00273 * numpy.exp(16.6 * C_h))
+        f_v = _get_friction_factors(rho_v * V * D / mu_v, roughness / D)
+        i_v = f_v * V ** 2 / (2.0 * g * D) * rho_v / water_density
+
+        s_v = (s * water_density / rho_v)[..., numpy.newaxis]
+        D_v = D[..., numpy.newaxis]
+        V_v = V[..., numpy.newaxis]
+        excess = _durand_coefficient * \
+            C_het * (g * D_v * (s_v - 1.0) /
+                     (V_v ** 2 * numpy.sqrt(C_D))) ** 1.5
+        result = i_v * (1.0 + excess.sum(axis=-1))
+
+    return result[()] if result.ndim == 0 else result
+
+
+if __name__ == '__main__':
+    import unittest
+    from auxi.modelling.process.hydraulics_test import HydraulicsTester
+    unittest.main()
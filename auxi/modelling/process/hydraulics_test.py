@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+This module provides testing code for the hydraulics module.
+"""
+
+import math
+import os
+import unittest
+
+import numpy
+
+from auxi.modelling.process.materials import psd
+from auxi.modelling.process.materials import slurry
+from auxi.modelling.process import hydraulics
+
+
+__version__ = '0.3.6'
+__license__ = 'LGPL v3'
+__copyright__ = 'Copyright 2016, Ex Mente Technologies (Pty) Ltd'
+__author__ = 'Christoff Kok, Johan Zietsman'
+__credits__ = ['Christoff Kok', 'Johan Zietsman']
+__maintainer__ = 'Christoff Kok'
+__email__ = 'christoff.kok@ex-mente.co.za'
+__status__ = 'Planning'
+
+
+class HydraulicsTester(unittest.TestCase):
+    """
+    Tester for the auxi.modelling.process.hydraulics module.
+    """
+
+    def setUp(self):
+        self.material = slurry.Material(
+            'materiala', os.path.join(slurry.DEFAULT_DATA_PATH,
+                                      'psdslurrymaterial.test.materiala.txt'))
+
+        # A pipeline slurry with 20 % solids by volume.
+        masses = numpy.array([0.0, 0.0, 0.0, 0.0, 0.0, 0.1, 0.3, 0.3, 0.2,
+                              0.1]) * 53.0
+        self.package = slurry.MaterialPackage(self.material, 2.65, 80.0,
+                                              masses)
+        self.flow_rates = numpy.array([100.0, 200.0, 400.0])[:, numpy.newaxis]
+        self.diameters = numpy.array([0.1, 0.15, 0.2, 0.25])
+
+    def test_get_velocities(self):
+        self.assertAlmostEqual(
+            hydraulics.get_velocities(36.0 * math.pi / 4.0, 0.1), 1.0)
+        self.assertEqual(
+            hydraulics.get_velocities(self.flow_rates, self.diameters).shape,
+            (3, 4))
+
+    def test_get_settling_velocities(self):
+        sizes = psd.get_mean_sizes(self.material.size_classes)
+        w = hydraulics.get_settling_velocities(self.package, False)
+        self.assertEqual(len(w), len(sizes))
+        self.assertTrue(numpy.all(numpy.diff(w) < 0.0))
+
+        # Fine particles follow Stokes' law, and coarse ones settle slower.
+        stokes = 1.65 * hydraulics.g * sizes ** 2 / 18.0 / 1.0E-6
+        self.assertAlmostEqual(w[-1] / stokes[-1], 1.0, delta=0.05)
+        self.assertLess(w[0], 0.5 * stokes[0])
+
+        hindered = hydraulics.get_settling_velocities(self.package)
+        self.assertTrue(numpy.all(hindered < w))
+
+        # The Richardson-Zaki exponent changes from 2.35 for coarse particles
+        # to 4.65 for fine particles.
+        self.assertAlmostEqual(hindered[0] / w[0], 0.8 ** 2.35, places=2)
+        self.assertAlmostEqual(hindered[-1] / w[-1], 0.8 ** 4.65, places=2)
+
+    def test_get_deposition_velocities(self):
+        velocities = hydraulics.get_deposition_velocities(
+            self.package, self.diameters)
+        self.assertEqual(velocities.shape, (4,))
+        self.assertTrue(numpy.all(numpy.diff(velocities) > 0.0))
+        self.assertTrue(numpy.all((velocities > 1.0) & (velocities < 5.0)))
+
+        water = slurry.MaterialPackage(self.material, 2.65, 80.0,
+                                       numpy.zeros(10))
+        self.assertEqual(
+            hydraulics.get_deposition_velocities(water, 0.1), 0.0)
+
+    def test_get_water_head_losses(self):
+        # Blasius' smooth pipe friction factor at Re = 1E5.
+        V = 1.0
+        D = 0.1
+        Q = V * math.pi * D ** 2 / 4.0 * 3600.0
+        i_w = hydraulics.get_water_head_losses(Q, D, 0.0)
+        f = 0.316 / 1.0E5 ** 0.25
+        self.assertAlmostEqual(i_w / (f * V ** 2 / 2.0 / hydraulics.g / D),
+                               1.0, delta=0.03)
+
+        # Laminar flow.
+        V = 0.01
+        Q = V * math.pi * D ** 2 / 4.0 * 3600.0
+        self.assertAlmostEqual(hydraulics.get_water_head_losses(Q, D) /
+                               (64.0 / 1000.0 * V ** 2 / 2.0 /
+                                hydraulics.g / D), 1.0)
+
+    def test_get_head_losses(self):
+        i_w = hydraulics.get_water_head_losses(self.flow_rates, self.diameters)
+        for method in hydraulics.methods:
+            i_m = hydraulics.get_head_losses(
+                self.package, self.flow_rates, self.diameters, method)
+            self.assertEqual(i_m.shape, (3, 4))
+            self.assertTrue(numpy.all(i_m > i_w))
+
+            # The sweep equals the individual calculations.
+            for i, Q in enumerate(self.flow_rates[:, 0]):
+                for j, D in enumerate(self.diameters):
+                    self.assertAlmostEqual(
+                        hydraulics.get_head_losses(self.package, Q, D,
+                                                   method), i_m[i, j])
+
+            # The excess head loss decreases at higher velocities.
+            excess = i_m / i_w
+            self.assertTrue(numpy.all(numpy.diff(excess, axis=0) < 0.0))
+
+        # Fine solids flow homogeneously and only increase the density and
+        # viscosity of the carrier.
+        masses = numpy.zeros(10)
+        masses[-1] = 53.0
+        fine = slurry.MaterialPackage(self.material, 2.65, 80.0, masses)
+        i_m = hydraulics.get_head_losses(fine, 100.0, 0.1)
+        rho = 1.0 + 0.2 * 1.65
+        self.assertAlmostEqual(i_m / hydraulics.get_water_head_losses(
+            100.0, 0.1) / rho, 1.0, delta=0.1)
+
+        water = slurry.MaterialPackage(self.material, 2.65, 80.0,
+                                       numpy.zeros(10))
+        for method in hydraulics.methods:
+            self.assertAlmostEqual(
+                hydraulics.get_head_losses(water, 100.0, 0.1, method),
+                hydraulics.get_water_head_losses(100.0, 0.1))
+
+    def test_get_head_losses_invalid(self):
+        self.assertRaises(ValueError, hydraulics.get_head_losses,
+                          self.package, 100.0, 0.1, 'invalid')
+        self.assertRaises(TypeError, hydraulics.get_head_losses,
+                          'slurry', 100.0, 0.1)
+
+
+if __name__ == '__main__':
+    unittest.main()
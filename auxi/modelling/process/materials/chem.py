@@ -7,9 +7,12 @@ are described with chemical compositions.
 import copy
 from os.path import isfile
 
+import numpy
+
 from auxi.core.objects import Object, NamedObject
 from auxi.tools.chemistry.stoichiometry import element_mass_fractions as emf
 from auxi.tools.chemistry import stoichiometry as stoich
+from auxi.modelling.process.materials import datafile
 
 
 __version__ = '0.3.6'
@@ -92,66 +95,70 @@ class Material(NamedObject):
                              .format(file_path))
 
     def _read_configuration_(self, file_path):
-        self.compounds = []
-
-        # Read the material's data from the file and prepare it for use.
-        with open(file_path) as f:
-            lines = f.readlines()
-        lines = self._prepare_lines_(lines)
+        # Read the material's data from the file.
+        data = datafile.read(file_path)
+        self.compounds = list(data.row_names)
 
-        # Determine assay names, and create a dictionary entry per assay.
-        assay_names = lines[0].split(' ')
-        del(assay_names[0:1])
+        # Create a dictionary entry with the mass fractions of each assay.
         self.assays = dict()
-        for assay_name in assay_names:
-            self.assays[assay_name] = []
-
-        # Read the compounds and assays.
-        for i in range(1, len(lines)):
-            strings = lines[i].split(' ')
-            if len(strings) < len(assay_names) + 1:  # Not a full line.
-                continue
-            self.compounds.append(strings[0])  # Add the new compound.
-            for j in range(0, len(self.assays)):  # Add mass fractions.
-                assay_name = assay_names[j]
-                self.assays[assay_name].append(float(strings[j+1]))
+        for assay_name in data.column_names:
+            self.assays[assay_name] = data.get_column(assay_name)
         self.compound_count = len(self.compounds)
+        self._compound_indices = {c: i for i, c in enumerate(self.compounds)}
 
         # Determine the list of elements.
         self.elements = self._create_element_list_()
+        self._element_mass_fraction_cache = {}
+        self.element_mass_fractions = self._get_element_mass_fractions_()
 
-    def _prepare_lines_(self, lines):
+    def _create_element_list_(self):
         """
-        Prepare the lines read from the text file before starting to process
-        it.
+        Extract an alphabetically sorted list of elements from the compounds of
+        the material.
+
+        :returns: An alphabetically sorted list of elements.
         """
 
-        result = []
-        for line in lines:
-            # Remove all whitespace from the start and end of the line.
-            line = line.strip()
+        element_set = stoich.elements(self.compounds)
+        return sorted(list(element_set))
 
-            # Replace all tabs with spaces.
-            line = line.replace('\t', ' ')
+    def _get_element_mass_fractions_(self, elements=None):
+        """
+        Get the matrix of element mass fractions in the material's compounds.
 
-            # Replace all repeating spaces with a single space.
-            while line.find('  ') > -1:
-                line = line.replace('  ', ' ')
+        :param elements: A list of elements. The material's elements are used
+          if this is None.
 
-            result.append(line)
+        :returns: [compounds x elements] A matrix of element mass fractions.
+        """
 
+        if elements is None:
+            elements = self.elements
+        key = tuple(elements)
+        result = self._element_mass_fraction_cache.get(key, None)
+        if result is None:
+            result = numpy.array(
+                [emf(compound, elements) for compound in self.compounds],
+                dtype=float).reshape(self.compound_count, len(elements))
+            result.flags.writeable = False
+            self._element_mass_fraction_cache[key] = result
         return result
 
-    def _create_element_list_(self):
+    def get_element_masses(self, compound_masses, elements=None):
         """
-        Extract an alphabetically sorted list of elements from the compounds of
-        the material.
+        Determine the masses of elements in one or more compound mass vectors.
 
-        :returns: An alphabetically sorted list of elements.
+        :param compound_masses: [kg] A sequence of compound masses, or a
+          [packages x compounds] array containing a row per package.
+        :param elements: A list of elements. The material's elements are used
+          if this is None.
+
+        :returns: [kg] An array of element masses, or a [packages x elements]
+          array containing a row per package.
         """
 
-        element_set = stoich.elements(self.compounds)
-        return sorted(list(element_set))
+        return numpy.dot(compound_masses,
+                         self._get_element_mass_fractions_(elements))
 
     def get_compound_index(self, compound):
         """
@@ -165,6 +172,22 @@ class Material(NamedObject):
 
         return self.compounds.index(compound)
 
+    def get_compound_indices(self, compounds):
+        """
+        Determine the indices of the specified compounds.
+
+        :param compounds: A list of compound formulas and phases, e.g.
+          ['Fe2O3[S1]', 'TiO2[S1]'].
+
+        :returns: An integer array of compound indices.
+        """
+
+        try:
+            return numpy.array([self._compound_indices[c] for c in compounds],
+                               dtype=int)
+        except KeyError as e:
+            raise ValueError('{} is not in list'.format(e))
+
     def create_empty_assay(self):
         """
         Create an empty array to store an assay. The array's length will be
@@ -173,20 +196,20 @@ class Material(NamedObject):
         :returns: A floating point array.
         """
 
-        return [0] * self.compound_count
+        return numpy.zeros(self.compound_count)
 
     def add_assay(self, name, assay):
         """
         Add an assay to the material.
 
         :param name: The name of the new assay.
-        :param assay: A list containing the compound mass fractions for
-          the assay. The sequence of the assay's elements must correspond to
-          the sequence of the material's compounds.
+        :param assay: A numpy array or list containing the compound mass
+          fractions for the assay. The sequence of the assay's elements must
+          correspond to the sequence of the material's compounds.
         """
 
-        if not type(assay) is list:
-            raise Exception('Invalid assay. It must be a list.')
+        if not type(assay) is list and not type(assay) is numpy.ndarray:
+            raise Exception('Invalid assay. It must be a list or numpy array.')
 
         elif not len(assay) == self.compound_count:
             raise Exception('Invalid assay: It must have the same number of '
@@ -196,7 +219,7 @@ class Material(NamedObject):
             raise Exception('Invalid assay: An assay with that name already '
                             'exists.')
 
-        self.assays[name] = assay
+        self.assays[name] = numpy.asarray(assay, dtype=float)
 
     def get_assay_total(self, name):
         """
@@ -207,7 +230,7 @@ class Material(NamedObject):
         :returns: The total mass fraction of the specified assay.
         """
 
-        return sum(self.assays[name])
+        return self.assays[name].sum()
 
     def create_package(self, assay=None, mass=0.0, normalise=True):
         """
@@ -229,8 +252,7 @@ class Material(NamedObject):
             assay_total = self.get_assay_total(assay)
         else:
             assay_total = 1.0
-        masses = [(mass * m) / assay_total for m in self.assays[assay]]
-        return MaterialPackage(self, masses)
+        return MaterialPackage(self, mass * self.assays[assay] / assay_total)
 
 
 class MaterialPackage(Object):
@@ -238,14 +260,15 @@ class MaterialPackage(Object):
     A package of a material consisting of multiple chemical compounds.
 
     :param material: A reference to the Material to which self belongs.
-    :param compound_masses: [kg] The masses of the compounds in the package.
+    :param compound_masses: [kg] A numpy array or list of the masses of the
+      compounds in the package.
     """
 
     def __init__(self, material, compound_masses):
         self._validate_params_(material, compound_masses)
 
         self.material = material
-        self.compound_masses = compound_masses
+        self.compound_masses = numpy.asarray(compound_masses, dtype=float)
 
     def __str__(self):
         result = 'MaterialPackage\n'
@@ -322,13 +345,14 @@ class MaterialPackage(Object):
         """
 
         # Multiply with a scalar floating point number.
-        if type(scalar) is float:
+        if type(scalar) is float or type(scalar) is numpy.float64 or \
+           type(scalar) is numpy.float32:
             if scalar < 0.0:
                 raise Exception(
                     'Invalid multiplication operation. '
                     'Cannot multiply package with negative number.')
             result = MaterialPackage(
-                self.material, [c * scalar for c in self.compound_masses])
+                self.material, self.compound_masses * scalar)
             return result
 
         # If not one of the above, it must be an invalid argument.
@@ -339,9 +363,10 @@ class MaterialPackage(Object):
         if not type(material) is Material:
             raise TypeError('Invalid material type. Must be '
                             'chemistry.material.Material')
-        if not type(compound_masses) is list:
+        if not type(compound_masses) is list and \
+           not type(compound_masses) is numpy.ndarray:
             raise TypeError('Invalid compound_masses type. Must be '
-                            'list.')
+                            'list or numpy.ndarray.')
 
     def _is_compound_mass_tuple(self, value):
         """
@@ -355,7 +380,9 @@ class MaterialPackage(Object):
             return False
         elif not type(value[0]) is str:
             return False
-        elif not type(value[1]) is float:
+        elif not type(value[1]) is float and \
+                not type(value[1]) is numpy.float64 and \
+                not type(value[1]) is numpy.float32:
             return False
         else:
             return True
@@ -368,7 +395,7 @@ class MaterialPackage(Object):
         """
 
         result = copy.copy(self)
-        result.compound_masses = copy.deepcopy(self.compound_masses)
+        result.compound_masses = self.compound_masses.copy()
 
         return result
 
@@ -378,7 +405,7 @@ class MaterialPackage(Object):
         Set all the compound masses in the package to zero.
         """
 
-        self.compound_masses *= 0.0
+        self.compound_masses = self.compound_masses * 0.0
 
     def get_assay(self):
         """
@@ -387,8 +414,7 @@ class MaterialPackage(Object):
         :returns: [mass fractions] An array containing the assay of self.
         """
 
-        masses_sum = sum(self.compound_masses)
-        return [m / masses_sum for m in self.compound_masses]
+        return self.compound_masses / self.compound_masses.sum()
 
     def get_mass(self):
         """
@@ -397,31 +423,48 @@ class MaterialPackage(Object):
         :returns: [kg]
         """
 
-        return sum(self.compound_masses)
+        return self.compound_masses.sum()
 
     def get_compound_mass(self, compound):
         """
-        Get the mass of the specified compound in the package.
+        Get the mass of the specified compound(s) in the package.
 
-        :param compound: The formula of the compound, e.g. Fe2O3.
+        :param compound: The formula of the compound, e.g. Fe2O3, or a list
+          of compound formulas.
 
-        :returns: [kg]
+        :returns: [kg] The mass of the compound, or an array of masses if a
+          list of compounds was specified.
         """
 
-        return self.compound_masses[self.material.get_compound_index(compound)]
+        if type(compound) is str:
+            return self.compound_masses[
+                self.material.get_compound_index(compound)]
+        return self.compound_masses[
+            self.material.get_compound_indices(compound)]
 
-    # TODO: Test
     def get_compound_mass_fraction(self, compound):
         """
-        Get the mass fraction of the specified compound in self.
+        Get the mass fraction of the specified compound(s) in self.
 
-        :param compound: The formula and phase of the compound, e.g. Fe2O3.
+        :param compound: The formula and phase of the compound, e.g. Fe2O3,
+          or a list of compound formulas.
 
-        :returns: []
+        :returns: [] The mass fraction of the compound, or an array of mass
+          fractions if a list of compounds was specified.
         """
 
         return self.get_compound_mass(compound) / self.get_mass()
 
+    def get_compound_mass_fractions(self):
+        """
+        Get the mass fractions of all the compounds in self.
+
+        :returns: [] An array of compound mass fractions. The sequence
+          corresponds with the sequence of the material's compounds.
+        """
+
+        return self.get_assay()
+
     def get_element_masses(self):
         """
         Get the masses of elements in the package.
@@ -431,13 +474,7 @@ class MaterialPackage(Object):
           element list of the material.
         """
 
-        result = [0] * len(self.material.elements)
-        for compound in self.material.compounds:
-            c = self.get_compound_mass(compound)
-            f = [c * x for x in emf(compound, self.material.elements)]
-            result = [v+f[ix] for ix, v in enumerate(result)]
-
-        return result
+        return self.material.get_element_masses(self.compound_masses)
 
     def get_element_mass_dictionary(self):
         """
@@ -465,13 +502,8 @@ class MaterialPackage(Object):
           element list of the material.
         """
 
-        result = [0]
-        for compound in self.material.compounds:
-            c = self.get_compound_mass(compound)
-            f = [c * x for x in emf(compound, [element])]
-            result = [v+f[ix] for ix, v in enumerate(result)]
-
-        return result[0]
+        return self.material.get_element_masses(
+            self.compound_masses, [element])[0]
 
     def extract(self, other):
         """
@@ -496,7 +528,9 @@ class MaterialPackage(Object):
         """
 
         # Extract the specified mass.
-        if type(other) is float:
+        if type(other) is float or \
+           type(other) is numpy.float64 or \
+           type(other) is numpy.float32:
 
             if other > self.get_mass():
                 raise Exception('Invalid extraction operation. Cannot extract'
@@ -504,10 +538,9 @@ class MaterialPackage(Object):
 
             fraction_to_subtract = other / self.get_mass()
             result = MaterialPackage(
-                self.material,
-                [m * fraction_to_subtract for m in self.compound_masses])
-            self.compound_masses = [m * (1.0 - fraction_to_subtract)
-                                    for m in self.compound_masses]
+                self.material, self.compound_masses * fraction_to_subtract)
+            self.compound_masses = self.compound_masses * \
+                (1.0 - fraction_to_subtract)
 
             return result
 
@@ -521,7 +554,7 @@ class MaterialPackage(Object):
                                 'contains.')
 
             self.compound_masses[index] -= other[1]
-            resultarray = [0.0] * len(self.compound_masses)
+            resultarray = self.compound_masses * 0.0
             resultarray[index] = other[1]
             result = MaterialPackage(self.material, resultarray)
 
@@ -553,7 +586,8 @@ class MaterialPackage(Object):
 
             # Packages of the same material.
             if self.material == other.material:
-                self.compound_masses += other.compound_masses
+                self.compound_masses = \
+                    self.compound_masses + other.compound_masses
 
             # Packages of different materials.
             else:
@@ -5,6 +5,8 @@ This module provides testing code for classes in the chem module.
 
 import unittest
 
+import numpy
+
 from auxi.core.helpers import get_path_relative_to_module as get_path
 from auxi.modelling.process.materials.chem import Material, MaterialPackage
 
@@ -63,7 +65,8 @@ class ChemMaterialUnitTester(unittest.TestCase):
         new_assay[0] = 0.5
         new_assay[2] = 0.5
         self.material.add_assay("new_assay", new_assay)
-        self.assertTrue(self.material.assays["new_assay"] == new_assay)
+        self.assertTrue(
+            numpy.all(self.material.assays["new_assay"] == new_assay))
 
     def test_get_assay_total(self):
         self.assertAlmostEqual(self.material.get_assay_total("IlmeniteA"),
@@ -136,6 +139,8 @@ class ChemMaterialPackageUnitTester(unittest.TestCase):
         self.assertAlmostEqual(pkg_b_plus_c.get_mass(), 5802.3)
 
         self.assertAlmostEqual(pkg_a_plus_b_plus_c.get_mass(), 7036.8)
+        self.assertEqual(len(pkg_a_plus_b.compound_masses),
+                         self.ilm.compound_count)
 
     def test_add_operator_2(self):
         """
@@ -214,28 +219,29 @@ class ChemMaterialPackageUnitTester(unittest.TestCase):
 
         mul_package_1 = temp_package_a * 0.0
         self.assertEqual(mul_package_1.get_mass(), 0.0)
-        self.assertTrue(mul_package_1.compound_masses == [0.0] *
-                        len(temp_package_a.compound_masses))
+        self.assertTrue(numpy.all(mul_package_1.compound_masses == 0.0))
 
         mul_package_2 = temp_package_a * 1.0
         self.assertAlmostEqual(mul_package_2.get_mass(),
                                temp_package_a.get_mass(),
                                places=10)
-        self.assertTrue(mul_package_2.compound_masses ==
-                        temp_package_a.compound_masses)
+        self.assertTrue(numpy.all(mul_package_2.compound_masses ==
+                                  temp_package_a.compound_masses))
 
         mul_package_2 = temp_package_a * 123.4
         self.assertAlmostEqual(mul_package_2.get_mass(),
                                temp_package_a.get_mass() * 123.4)
-        self.assertTrue(mul_package_2.compound_masses ==
-                        [m * 123.4 for m in temp_package_a.compound_masses])
+        self.assertTrue(numpy.all(mul_package_2.compound_masses ==
+                                  temp_package_a.compound_masses * 123.4))
 
     def test_clone(self):
         clone = self.ilm_pkg_a.clone()
 
         self.assertEqual(clone.get_mass(), self.ilm_pkg_a.get_mass())
-        self.assertTrue(clone.compound_masses ==
-                        self.ilm_pkg_a.compound_masses)
+        self.assertTrue(numpy.all(clone.compound_masses ==
+                                  self.ilm_pkg_a.compound_masses))
+        clone.compound_masses[0] = 0.0
+        self.assertNotEqual(self.ilm_pkg_a.compound_masses[0], 0.0)
 
     def test_get_mass(self):
         self.assertAlmostEqual(self.ilm_pkg_a.get_mass(), 1234.5)
@@ -260,9 +266,36 @@ class ChemMaterialPackageUnitTester(unittest.TestCase):
                 self.ilm_pkg_a.get_compound_mass(compound),
                 mass)
 
+    def test_get_compound_mass_fraction(self):
+        compounds = ["TiO2", "FeO"]
+        fractions = self.ilm_pkg_a.get_compound_mass_fraction(compounds)
+        self.assertEqual(fractions.shape, (2,))
+        for compound, fraction in zip(compounds, fractions):
+            self.assertAlmostEqual(
+                self.ilm_pkg_a.get_compound_mass_fraction(compound), fraction)
+        self.assertAlmostEqual(
+            self.ilm_pkg_a.get_compound_mass_fractions().sum(), 1.0)
+        self.assertRaises(ValueError, self.ilm_pkg_a.get_compound_mass,
+                          ["Unobtainium"])
+
+    def test_add_to(self):
+        package = self.ilm_pkg_a.clone()
+        package.add_to(self.ilm_pkg_b)
+        self.assertAlmostEqual(package.get_mass(), 3580.1, places=10)
+        package.add_to(("TiO2", 1.0))
+        self.assertAlmostEqual(package.get_mass(), 3581.1, places=10)
+
     def test_get_element_masses(self):
         x = self.ilm_pkg_a.get_element_masses()
         y = self.ilm_pkg_a.get_element_mass("Ti")
+        self.assertAlmostEqual(x[self.ilm.elements.index("Ti")], y)
+        self.assertAlmostEqual(sum(x), self.ilm_pkg_a.get_mass())
+
+        batch = [self.ilm_pkg_a.compound_masses,
+                 self.ilm_pkg_a.compound_masses]
+        x = self.ilm.get_element_masses(batch, ["Ti"])
+        self.assertEqual(x.shape, (2, 1))
+        self.assertAlmostEqual(x[1, 0], y)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+"""
+This module provides a fast reader for material definition text files, with
+an in-memory and an optional on-disk cache of the parsed data.
+"""
+
+import os
+import hashlib
+import warnings
+
+import numpy
+
+from auxi.core.objects import Object
+
+
+__version__ = '0.3.6'
+__license__ = 'LGPL v3'
+__copyright__ = 'Copyright 2016, Ex Mente Technologies (Pty) Ltd'
+__author__ = 'Christoff Kok, Johan Zietsman'
+__credits__ = ['Christoff Kok', 'Johan Zietsman']
+__maintainer__ = 'Christoff Kok'
+__email__ = 'christoff.kok@ex-mente.co.za'
+__status__ = 'Planning'
+
+
+_CACHE_FORMAT = '1'
+
+cache_path = os.environ.get('AUXI_MATERIAL_CACHE', None)
+"""
+Directory in which parsed material files are cached in binary form. The
+on-disk cache is disabled when this is None. It defaults to the value of the
+AUXI_MATERIAL_CACHE environment variable.
+"""
+
+_memory_cache = {}
+
+
+class MaterialFileData(Object):
+    """
+    The parsed content of a material definition file.
+
+    :param column_names: The names in the heading line, excluding the first.
+    :param row_names: The first item of each data line.
+    :param values: [rows x columns] array of the data line values.
+    :param property_names: The names of the custom properties listed below
+      the "#" line.
+    :param property_values: [properties x columns] array of custom property
+      values.
+    """
+
+    def __init__(self, column_names, row_names, values, property_names,
+                 property_values):
+        self.column_names = column_names
+        """The names of the data columns, e.g. assay names."""
+        self.row_names = row_names
+        """The names of the data rows, e.g. compounds or size classes."""
+        self.values = values
+        """[rows x columns] The data values."""
+        self.property_names = property_names
+        """The names of the custom properties."""
+        self.property_values = property_values
+        """[properties x columns] The custom property values."""
+
+    def get_column(self, name):
+        """
+        Get a copy of the values in the specified column.
+
+        :param name: The column name, e.g. an assay name.
+
+        :returns: Array of column values.
+        """
+
+        return self.values[:, self.column_names.index(name)].copy()
+
+    def get_columns(self):
+        """
+        Get a copy of all the columns in one allocation.
+
+        :returns: Dictionary of column names and arrays. The arrays are rows
+          of a single contiguous [columns x rows] block.
+        """
+
+        block = self.values.T.copy()
+        return {name: block[j] for j, name in enumerate(self.column_names)}
+
+
+def _parse(file_path):
+    """
+    Parse a material definition file in a single pass.
+
+    :param file_path: The path of the material definition file.
+
+    :returns: MaterialFileData object.
+    """
+
+    with open(file_path) as f:
+        lines = [line.split() for line in f]
+
+    column_names = lines[0][1:]
+    column_count = len(column_names)
+    row_count = column_count + 1
+
+    row_names = []
+    rows = []
+    property_names = []
+    properties = []
+    target_names, target = row_names, rows
+    for strings in lines[1:]:
+        if len(strings) > 0 and strings[0].startswith('#'):
+            target_names, target = property_names, properties
+            continue
+        if len(strings) < row_count:  # Not a full line.
+            continue
+        target_names.append(strings[0])
+        target.append(strings[1:row_count])
+
+    values = numpy.array(rows, dtype=float).reshape(
+        len(row_names), column_count)
+    property_values = numpy.array(properties, dtype=float).reshape(
+        len(property_names), column_count)
+
+    return MaterialFileData(column_names, row_names, values, property_names,
+                            property_values)
+
+
+def _get_key(file_path):
+    """
+    Create the cache key of a file from its path, modification time and size.
+
+    :param file_path: The path of the file.
+
+    :returns: Key string.
+    """
+
+    file_path = os.path.realpath(file_path)
+    stat = os.stat(file_path)
+    return '{}|{}|{}|{}'.format(_CACHE_FORMAT, file_path, stat.st_mtime_ns,
+                                stat.st_size)
+
+
+def _get_cache_file_path(key):
+    digest = hashlib.sha1(key.encode('utf-8')).hexdigest()
+    return os.path.join(cache_path, digest + '.npz')
+
+
+def _read_cache_file(key):
+    """
+    Read parsed data from the on-disk cache.
+
+    :param key: The cache key of the material file.
+
+    :returns: MaterialFileData object, or None if it is not in the cache.
+    """
+
+    file_path = _get_cache_file_path(key)
+    if not os.path.isfile(file_path):
+        return None
+
+    try:
+        with numpy.load(file_path, allow_pickle=False) as data:
+            if str(data['key']) != key:
+                return None
+            return MaterialFileData(
+                data['column_names'].tolist(), data['row_names'].tolist(),
+                data['values'], data['property_names'].tolist(),
+                data['property_values'])
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def _write_cache_file(key, data):
+    """
+    Write parsed data to the on-disk cache.
+
+    :param key: The cache key of the material file.
+    :param data: MaterialFileData object.
+    """
+
+    file_path = _get_cache_file_path(key)
+    temp_path = '{}.{}.tmp'.format(file_path, os.getpid())
+    try:
+        os.makedirs(cache_path, exist_ok=True)
+        with open(temp_path, 'wb') as f:
+            numpy.savez(
+                f, key=numpy.array(key),
+                column_names=numpy.array(data.column_names, dtype=str),
+                row_names=numpy.array(data.row_names, dtype=str),
+                values=data.values,
+                property_names=numpy.array(data.property_names, dtype=str),
+                property_values=data.property_values)
+        os.replace(temp_path, file_path)
+    except OSError as e:
+        warnings.warn('Could not write material cache file. ({})'.format(e))
+
+
+def read(file_path, use_cache=True):
+    """
+    Read a material definition file.
+
+    :param file_path: The path of the material definition file.
+    :param use_cache: Indicates whether the in-memory and on-disk caches may
+      be used.
+
+    :returns: MaterialFileData object. The object is shared with the cache,
+      so callers must copy arrays before modifying them.
+
+    The format of the file is a heading line followed by data lines. The
+    items in a line are separated by one or more spaces or tabs. The data
+    can be ended off with a line starting with "#", after which custom
+    property lines follow. Lines with too few items are ignored.
+    """
+
+    if not use_cache:
+        return _parse(file_path)
+
+    key = _get_key(file_path)
+    result = _memory_cache.get(key, None)
+    if result is not None:
+        return result
+
+    if cache_path is not None:
+        result = _read_cache_file(key)
+    if result is None:
+        result = _parse(file_path)
+        if cache_path is not None:
+            _write_cache_file(key, result)
+
+    result.values.flags.writeable = False
+    result.property_values.flags.writeable = False
+    _memory_cache[key] = result
+    return result
+
+
+def clear_cache():
+    """
+    Clear the in-memory cache of parsed material files.
+    """
+
+    _memory_cache.clear()
+
+
+if __name__ == "__main__":
+    import unittest
+    from auxi.modelling.process.materials.datafile_test import \
+        DataFileUnitTester
+    unittest.main()
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+This module provides testing code for the datafile module.
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy
+
+from auxi.core.helpers import get_path_relative_to_module as get_path
+from auxi.modelling.process.materials import datafile
+
+__version__ = '0.3.6'
+__license__ = 'LGPL v3'
+__copyright__ = 'Copyright 2016, Ex Mente Technologies (Pty) Ltd'
+__author__ = 'Christoff Kok, Johan Zietsman'
+__credits__ = ['Christoff Kok', 'Johan Zietsman']
+__maintainer__ = 'Christoff Kok'
+__email__ = 'christoff.kok@ex-mente.co.za'
+__status__ = 'Planning'
+
+
+class DataFileUnitTester(unittest.TestCase):
+    """
+    Tester for the auxi.modelling.process.materials.datafile module.
+    """
+
+    def setUp(self):
+        self.file_path = get_path(
+            __file__, 'data/thermomaterial.test.ilmenite.txt')
+        self.temp_dir = tempfile.mkdtemp()
+        self.cache_path = datafile.cache_path
+        datafile.clear_cache()
+
+    def tearDown(self):
+        datafile.cache_path = self.cache_path
+        datafile.clear_cache()
+        shutil.rmtree(self.temp_dir)
+
+    def test_read(self):
+        data = datafile.read(self.file_path, use_cache=False)
+        self.assertEqual(data.column_names,
+                         ['IlmeniteA', 'IlmeniteB', 'IlmeniteC'])
+        self.assertEqual(len(data.row_names), 8)
+        self.assertEqual(data.row_names[3], 'Fe3O4[Salpha]')
+        self.assertEqual(data.values.shape, (8, 3))
+        self.assertEqual(data.values[7, 2], 0.45949)
+        self.assertEqual(data.property_names, ['Price[USD/kg]'])
+        self.assertTrue(numpy.all(data.property_values == [[1.2, 1.3, 1.1]]))
+
+    def test_read_without_assays(self):
+        data = datafile.read(get_path(
+            __file__, 'data/thermomaterial.test.mix.txt'), use_cache=False)
+        self.assertEqual(data.column_names, [])
+        self.assertEqual(len(data.row_names), 13)
+        self.assertEqual(data.values.shape, (13, 0))
+
+    def test_get_columns(self):
+        data = datafile.read(self.file_path)
+        columns = data.get_columns()
+        self.assertEqual(columns['IlmeniteB'][2], 0.47300)
+        columns['IlmeniteB'][2] = 0.0
+        self.assertEqual(data.values[2, 1], 0.47300)
+
+        # The column of a single column file is a writeable copy too.
+        file_path = os.path.join(self.temp_dir, 'material.txt')
+        with open(file_path, 'w') as f:
+            f.write('Compound A\nSiO2[S] 0.5\nFeO[S] 0.5\n')
+        data = datafile.read(file_path)
+        columns1 = data.get_columns()
+        columns2 = data.get_columns()
+        self.assertTrue(columns1['A'].flags.writeable)
+        self.assertFalse(numpy.shares_memory(columns1['A'], data.values))
+        self.assertFalse(numpy.shares_memory(columns1['A'], columns2['A']))
+        columns1['A'][0] = 0.0
+        self.assertEqual(data.values[0, 0], 0.5)
+
+    def test_memory_cache(self):
+        data1 = datafile.read(self.file_path)
+        data2 = datafile.read(self.file_path)
+        self.assertIs(data1, data2)
+        self.assertFalse(data1.values.flags.writeable)
+
+    def test_disk_cache(self):
+        file_path = os.path.join(self.temp_dir, 'material.txt')
+        shutil.copy(self.file_path, file_path)
+        datafile.cache_path = os.path.join(self.temp_dir, 'cache')
+
+        data1 = datafile.read(file_path)
+        self.assertEqual(len(os.listdir(datafile.cache_path)), 1)
+
+        datafile.clear_cache()
+        data2 = datafile.read(file_path)
+        self.assertIsNot(data1, data2)
+        self.assertEqual(data1.row_names, data2.row_names)
+        self.assertEqual(data1.property_names, data2.property_names)
+        self.assertTrue(numpy.all(data1.values == data2.values))
+
+    def test_cache_invalidation(self):
+        file_path = os.path.join(self.temp_dir, 'material.txt')
+        with open(file_path, 'w') as f:
+            f.write('Compound A\nSiO2[S] 1.0\n')
+        datafile.cache_path = os.path.join(self.temp_dir, 'cache')
+        self.assertEqual(datafile.read(file_path).row_names, ['SiO2[S]'])
+
+        with open(file_path, 'w') as f:
+            f.write('Compound A\nSiO2[S] 0.5\nFeO[S] 0.5\n')
+        self.assertEqual(datafile.read(file_path).row_names,
+                         ['SiO2[S]', 'FeO[S]'])
+
+
+if __name__ == '__main__':
+    unittest.main()
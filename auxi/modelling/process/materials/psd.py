@@ -6,12 +6,14 @@ size distribution calculations.
 
 import os
 import sys
-import copy
+from bisect import bisect_left, bisect_right
 
 import numpy
 
 from auxi.core.objects import Object
+from auxi.core.objects import SlottedObject
 from auxi.core.objects import NamedObject
+from auxi.modelling.process.materials import datafile
 
 __version__ = '0.3.6'
 __license__ = 'LGPL v3'
@@ -23,6 +25,102 @@ __email__ = 'christoff.kok@ex-mente.co.za'
 __status__ = 'Planning'
 
 
+_rebinning_matrices = {}
+
+
+class SizeClassIndex(Object):
+    """
+    A sorted index of size classes that finds size classes by value with a
+    relative tolerance, and finds the size classes that contain particle
+    sizes, by bisection.
+
+    :param size_classes: [m] List of size classes. Each class contains the
+      material retained on its screen size and passing the next larger
+      screen.
+    :param tolerance: The relative tolerance used to match sizes to size
+      classes.
+    """
+
+    def __init__(self, size_classes, tolerance=1.0E-9):
+        self.tolerance = tolerance
+        """The relative tolerance used to match sizes to size classes."""
+        self._order = numpy.argsort(size_classes, kind='stable')
+        self._sorted = [float(size_classes[i]) for i in self._order]
+        self._sorted_array = numpy.array(self._sorted)
+        self._exact = {}
+        for i, size_class in reversed(list(enumerate(size_classes))):
+            self._exact[float(size_class)] = i
+
+    def get_index(self, size_class):
+        """
+        Determine the index of a size class.
+
+        :param size_class: [m] The size class, as a number or string.
+
+        :returns: The index of the size class.
+        """
+
+        index = self._exact.get(size_class, None)
+        if index is not None:
+            return index
+
+        size_class = float(size_class)
+        sizes = self._sorted
+        i = bisect_left(sizes, size_class)
+        for j in (i - 1, i):
+            if 0 <= j < len(sizes) and abs(sizes[j] - size_class) <= \
+               self.tolerance * max(abs(sizes[j]), abs(size_class)):
+                return int(self._order[j])
+        raise ValueError(str(size_class) + " is not a size class.")
+
+    def get_containing_index(self, size):
+        """
+        Determine the index of the size class that contains a particle size,
+        which is the class with the largest screen size that does not exceed
+        the particle size. Particles smaller than the smallest screen are
+        assigned to its class.
+
+        :param size: [m] The particle size.
+
+        :returns: The index of the size class.
+        """
+
+        j = bisect_right(self._sorted, size * (1.0 + self.tolerance)) - 1
+        return int(self._order[max(j, 0)])
+
+    def get_containing_indices(self, sizes):
+        """
+        Determine the indices of the size classes that contain particle
+        sizes.
+
+        :param sizes: [m] Array of particle sizes.
+
+        :returns: Array of size class indices.
+        """
+
+        j = numpy.searchsorted(
+            self._sorted_array,
+            numpy.asarray(sizes, dtype=float) * (1.0 + self.tolerance),
+            side='right') - 1
+        return self._order[numpy.maximum(j, 0)]
+
+    def bin(self, sizes, weights=None):
+        """
+        Assign particle sizes to size classes and add up their weights.
+
+        :param sizes: [m] Array of particle sizes, e.g. the output of a
+          particle size analyser.
+        :param weights: Array of the weight, e.g. mass, of each particle
+          size. Each size is counted once if this is None.
+
+        :returns: Array of the total weight in each size class.
+        """
+
+        return numpy.bincount(self.get_containing_indices(sizes),
+                              weights=weights,
+                              minlength=len(self._sorted)).astype(float)
+
+
 class Material(NamedObject):
     """
     Represents a particulate material consisting of multiple particle size
@@ -66,37 +164,27 @@ class Material(NamedObject):
     def __init__(self, name, file_path, description=None):
         # Initialise the material's properties.
         self.name = name
-        self.size_classes = list()
-
-        # Read the material's data from the file and prepare it for use.
-        f = open(file_path, "r")
-        lines = f.readlines()
-        f.close()
-        lines = self._prepare_lines(lines)
-
-        # Determine the assay names, and create a dictionary entry for each
-        # assay.
-        assay_names = lines[0].split(" ")
-        del(assay_names[0:1])
-        self.assays = dict()
-        for assay_name in assay_names:
-            self.assays[assay_name] = numpy.array([])
-
-        # Read the size classes and assays.
-        for i in range(1, len(lines)):
-            strings = lines[i].split(" ")
-            if len(strings) < len(assay_names) + 1:  # Not a full line.
-                continue
-            # Add the new size class.
-            self.size_classes.append(float(strings[0]))
-            # Add the mass fractions to the assays.
-            for j in range(0, len(self.assays)):
-                assay_name = assay_names[j]
-                self.assays[assay_name] = numpy.append(
-                    self.assays[assay_name], float(strings[j+1]))
+
+        # Read the material's data from the file.
+        data = datafile.read(file_path)
+        self.size_classes = [float(c) for c in data.row_names]
+
+        # Create a dictionary entry for each assay.
+        self.assays = data.get_columns()
 
         # Initialise the remaining properties.
         self.size_class_count = len(self.size_classes)
+        self.size_class_index = SizeClassIndex(self.size_classes)
+        """
+        Index of the size classes. Its tolerance attribute sets the relative
+        tolerance used to find size classes by value.
+        """
+        self.mean_sizes = self._calculate_mean_sizes()
+        """
+        [m] The geometric mean of the lower and upper size of each size class.
+        The top size of the first class and the bottom size of the final
+        class are extrapolated with the ratio of the adjacent screen sizes.
+        """
 
     def __str__(self):
         """
@@ -122,36 +210,51 @@ class Material(NamedObject):
             result = result + "\n"
         return result
 
-    def _prepare_lines(self, lines):
+    def _calculate_mean_sizes(self):
         """
-        Prepare the lines read from the text file before starting to process
-        it.
+        Calculate the representative particle size of each size class.
+
+        :returns: [m] Array of mean sizes.
         """
 
-        result = list()
-        for line in lines:
-            # Remove all whitespace characters (e.g. spaces, line breaks, etc.)
-            # from the start and end of the line.
-            line = line.strip()
-            # Replace all tabs with spaces.
-            line = line.replace("\t", " ")
-            # Replace all repeating spaces with a single space.
-            while line.find("  ") > -1:
-                line = line.replace("  ", " ")
-            result.append(line)
-        return result
+        return get_mean_sizes(self.size_classes)
 
     def get_size_class_index(self, size_class):
         """
         Determine the index of the specified size class.
 
-        :param size_class: The formula and phase of the specified size class,
-          e.g. 'Fe2O3[S1]'.
+        :param size_class: [m] The specified size class, e.g. 4.8E-3. It
+          matches within the relative tolerance of size_class_index.
 
         :returns: The index of the specified size class.
         """
 
-        return self.size_classes.index(size_class)
+        return self.size_class_index.get_index(size_class)
+
+    def get_containing_size_class_index(self, size):
+        """
+        Determine the index of the size class that contains a particle size.
+
+        :param size: [m] The particle size.
+
+        :returns: The index of the size class.
+        """
+
+        return self.size_class_index.get_containing_index(size)
+
+    def bin_particle_sizes(self, sizes, masses=None):
+        """
+        Create size class masses from a list of particle sizes, e.g. the
+        output of a particle size analyser.
+
+        :param sizes: [m] Array of particle sizes.
+        :param masses: [kg] Array of the mass of each particle size. Each
+          size is counted as 1 kg if this is None.
+
+        :returns: [kg] Array of size class masses.
+        """
+
+        return self.size_class_index.bin(sizes, masses)
 
     def create_empty_assay(self):
         """
@@ -195,6 +298,123 @@ class Material(NamedObject):
 
         return sum(self.assays[name])
 
+    def get_cumulative_passing(self, size_class_masses):
+        """
+        Calculate the mass fractions that pass each size class' screen.
+
+        :param size_class_masses: [kg] Array of size class masses, or a
+          [packages x size classes] array to calculate the fractions of many
+          packages at once.
+
+        :returns: Array of the same shape with the cumulative mass fractions
+          passing the size classes.
+        """
+
+        masses = numpy.asarray(size_class_masses, dtype=float)
+        total = masses.sum(axis=-1)[..., numpy.newaxis]
+        with numpy.errstate(invalid='ignore', divide='ignore'):
+            result = 1.0 - numpy.cumsum(masses, axis=-1) / total
+        return numpy.clip(result, 0.0, 1.0)
+
+    def get_passing_size(self, size_class_masses, percent,
+                         method='loglinear'):
+        """
+        Determine the size that the specified percentage of the mass passes,
+        e.g. the P80, by interpolating between the screens.
+
+        :param size_class_masses: [kg] Array of size class masses, or a
+          [packages x size classes] array.
+        :param percent: [%] Percentage passing.
+        :param method: 'loglinear' interpolates the percentage passing
+          linearly in the logarithm of size. 'rosinrammler' interpolates in
+          Rosin-Rammler coordinates, ln(-ln(1 - P)) against ln(size), and
+          extrapolates beyond the finest and coarsest screens.
+
+        :returns: [m] Passing size, or an array with a passing size per
+          package. The size is nan if it cannot be determined, e.g. if the
+          loglinear percentage passing lies outside the screens.
+        """
+
+        if method not in ['loglinear', 'rosinrammler']:
+            raise ValueError("Invalid method '{}'.".format(method))
+
+        sizes = numpy.array(self.size_classes)
+        screens = sizes > 0.0
+        passing = self.get_cumulative_passing(size_class_masses)
+        x = numpy.log(sizes[screens])[::-1]
+        y = passing[..., screens][..., ::-1]
+        target = percent / 100.0
+
+        with numpy.errstate(invalid='ignore', divide='ignore'):
+            if method == 'rosinrammler':
+                y = numpy.log(-numpy.log(1.0 - y))
+                target = numpy.log(-numpy.log(1.0 - target))
+                finite = numpy.isfinite(y)
+                first = numpy.argmax(finite, axis=-1)
+                last = y.shape[-1] - 1 - numpy.argmax(finite[..., ::-1],
+                                                      axis=-1)
+                k = numpy.clip((y < target).sum(axis=-1), first + 1, last)
+                k = numpy.clip(k, 1, y.shape[-1] - 1)
+            else:
+                k = numpy.clip((y < target).sum(axis=-1), 1, y.shape[-1] - 1)
+
+            y0 = numpy.take_along_axis(y, (k - 1)[..., numpy.newaxis],
+                                       axis=-1)[..., 0]
+            y1 = numpy.take_along_axis(y, k[..., numpy.newaxis],
+                                       axis=-1)[..., 0]
+            result = numpy.exp(x[k - 1] + (target - y0) / (y1 - y0) *
+                               (x[k] - x[k - 1]))
+
+            if method == 'loglinear':
+                outside = (target < y[..., 0]) | (target > y[..., -1])
+            else:
+                outside = (finite.sum(axis=-1) < 2)
+            result = numpy.where(outside | ~numpy.isfinite(result),
+                                 numpy.nan, result)
+
+        return result[()] if result.ndim == 0 else result
+
+    def get_size_moment(self, size_class_masses, k):
+        """
+        Calculate a moment of the size distribution, the mass fraction
+        weighted average of the size class mean sizes raised to a power.
+
+        :param size_class_masses: [kg] Array of size class masses, or a
+          [packages x size classes] array.
+        :param k: The order of the moment.
+
+        :returns: [m^k] Moment, or an array with a moment per package.
+        """
+
+        masses = numpy.asarray(size_class_masses, dtype=float)
+        with numpy.errstate(invalid='ignore', divide='ignore'):
+            return masses.dot(self.mean_sizes ** k) / masses.sum(axis=-1)
+
+    def get_mean_size(self, size_class_masses, p=3, q=2):
+        """
+        Calculate the moment ratio mean size D[p,q], e.g. the Sauter mean
+        diameter D[3,2] or the volume weighted mean diameter D[4,3].
+
+        :param size_class_masses: [kg] Array of size class masses, or a
+          [packages x size classes] array.
+        :param p: The order of the numerator moment of the number
+          distribution.
+        :param q: The order of the denominator moment of the number
+          distribution.
+
+        :returns: [m] Mean size, or an array with a mean size per package.
+        """
+
+        if p == q:
+            raise ValueError("The moment orders p and q must differ.")
+
+        # A size class' number of particles is proportional to its mass
+        # divided by the cube of its size.
+        with numpy.errstate(invalid='ignore', divide='ignore'):
+            ratio = self.get_size_moment(size_class_masses, p - 3) / \
+                self.get_size_moment(size_class_masses, q - 3)
+            return ratio ** (1.0 / (p - q))
+
     def create_package(self, assay=None, mass=0.0, normalise=True):
         """
         Create a MaterialPackage based on the specified parameters.
@@ -218,7 +438,7 @@ class Material(NamedObject):
         return MaterialPackage(self, mass * self.assays[assay] / assay_total)
 
 
-class MaterialPackage(Object):
+class MaterialPackage(SlottedObject):
     """
     A package of a material consisting of multiple particle size classes.
 
@@ -229,6 +449,8 @@ class MaterialPackage(Object):
           package.
     """
 
+    __slots__ = ('material', 'size_class_masses')
+
     def __init__(self, material, size_class_masses):
         # Confirm that the parameters are OK.
         if not type(material) is Material:
@@ -283,18 +505,10 @@ class MaterialPackage(Object):
                     self.size_class_masses + other.size_class_masses)
                 return result
             else:  # Packages of different materials.
-                result = self.clone()
-                for size_class in other.material.size_classes:
-                    if size_class not in self.material.size_classes:
-                        raise Exception(
-                            "Packages of '" + other.material.name +
-                            "' cannot be added to packages of '" +
-                            self.material.name +
-                            "'. The size class '" + size_class +
-                            "' was not found in '" + self.material.name + "'.")
-                    result = result + (
-                        size_class,
-                        other.get_size_class_mass(size_class))
+                result = MaterialPackage(
+                    self.material,
+                    self.size_class_masses +
+                    other._get_rebinned_masses(self.material))
                 return result
 
         # Add the specified mass of the specified size class.
@@ -372,8 +586,9 @@ class MaterialPackage(Object):
         :returns: A MaterialPackage that is identical to self.
         """
 
-        result = copy.copy(self)
-        result.size_class_masses = copy.deepcopy(self.size_class_masses)
+        result = MaterialPackage.__new__(MaterialPackage)
+        result.material = self.material
+        result.size_class_masses = self.size_class_masses.copy()
         return result
 
     # TODO: test
@@ -428,6 +643,89 @@ class MaterialPackage(Object):
 
         return self.get_size_class_mass(size_class) / self.get_mass()
 
+    def get_cumulative_passing(self):
+        """
+        Determine the mass fractions of self that pass each size class'
+        screen.
+
+        :returns: Array of cumulative mass fractions passing.
+        """
+
+        return self.material.get_cumulative_passing(self.size_class_masses)
+
+    def get_passing_size(self, percent, method='loglinear'):
+        """
+        Determine the size that the specified percentage of self passes, e.g.
+        the P80.
+
+        :param percent: [%] Percentage passing.
+        :param method: The interpolation method, 'loglinear' or
+          'rosinrammler'. See Material.get_passing_size.
+
+        :returns: [m] Passing size.
+        """
+
+        return self.material.get_passing_size(self.size_class_masses,
+                                              percent, method)
+
+    def get_size_moment(self, k):
+        """
+        Calculate a moment of the size distribution of self.
+
+        :param k: The order of the moment.
+
+        :returns: [m^k] Mass fraction weighted average of the size class mean
+          sizes raised to the power k.
+        """
+
+        return self.material.get_size_moment(self.size_class_masses, k)
+
+    def get_mean_size(self, p=3, q=2):
+        """
+        Calculate the moment ratio mean size D[p,q] of self, e.g. the Sauter
+        mean diameter D[3,2].
+
+        :param p: The order of the numerator moment.
+        :param q: The order of the denominator moment.
+
+        :returns: [m] Mean size.
+        """
+
+        return self.material.get_mean_size(self.size_class_masses, p, q)
+
+    def _get_rebinned_masses(self, material):
+        """
+        Map the size class masses of self onto the size classes of another
+        material.
+
+        :param material: The other psd.Material.
+
+        :returns: [kg] Array of size class masses.
+        """
+
+        if self.material.size_classes == material.size_classes:
+            return self.size_class_masses
+        return get_rebinning_matrix(
+            self.material.size_classes,
+            material.size_classes).dot(self.size_class_masses)
+
+    def rebin(self, material):
+        """
+        Create a package of another material with different size classes
+        that contains the same mass as self, distributed over the size
+        classes of the other material.
+
+        :param material: The other psd.Material.
+
+        :returns: A new MaterialPackage of the other material.
+        """
+
+        if not type(material) is Material:
+            raise TypeError("Invalid material type. Must be psd.Material")
+
+        return MaterialPackage(material,
+                               self._get_rebinned_masses(material).copy())
+
     def extract(self, other):
         """
         Extract 'other' from self, modifying self and returning the extracted
@@ -507,16 +805,8 @@ class MaterialPackage(Object):
                 self.size_class_masses = \
                         self.size_class_masses + other.size_class_masses
             else:  # Packages of different materials.
-                for size_class in other.material.size_classes:
-                    if size_class not in self.material.size_classes:
-                        raise Exception(
-                            "Packages of '" + other.material.name +
-                            "' cannot be added to packages of '" +
-                            self.material.name +
-                            "'. The size class '" + size_class +
-                            "' was not found in '" + self.material.name + "'.")
-                    self.add_to(
-                        (size_class, other.get_size_class_mass(size_class)))
+                self.size_class_masses = self.size_class_masses + \
+                    other._get_rebinned_masses(self.material)
 
         # Add the specified mass of the specified size class.
         elif self._is_size_class_mass_tuple(other):
@@ -534,6 +824,94 @@ class MaterialPackage(Object):
             raise TypeError("Invalid addition argument.")
 
 
+def _get_size_class_bounds(size_classes):
+    """
+    Determine the lower and upper size of each size class. The top size of
+    the first class and the bottom size of the final class are extrapolated
+    with the ratio of the adjacent screen sizes. A single size class holds
+    all of the material, from zero up to its size.
+
+    :param size_classes: [m] List of size classes, from the largest to the
+      smallest.
+
+    :returns: Tuple of arrays of the lower and upper sizes [m].
+    """
+
+    sizes = numpy.array(size_classes, dtype=float)
+    if len(sizes) == 1:
+        return numpy.zeros(1), sizes
+    upper = numpy.empty(len(sizes))
+    upper[1:] = sizes[:-1]
+    upper[0] = sizes[0] * sizes[0] / sizes[1]
+    lower = sizes.copy()
+    if lower[-1] == 0.0:
+        ratio = sizes[-3] / sizes[-2] if len(sizes) > 2 else 2.0
+        lower[-1] = sizes[-2] / ratio
+    return lower, upper
+
+
+def get_mean_sizes(size_classes):
+    """
+    Calculate the geometric mean of the lower and upper size of each size
+    class. The top size of the first class and the bottom size of the final
+    class are extrapolated with the ratio of the adjacent screen sizes.
+
+    :param size_classes: [m] List of size classes, from the largest to the
+      smallest.
+
+    :returns: [m] Array of mean sizes.
+    """
+
+    if len(size_classes) < 2:
+        return numpy.array(size_classes, dtype=float)
+
+    lower, upper = _get_size_class_bounds(size_classes)
+    return numpy.sqrt(upper * lower)
+
+
+def get_rebinning_matrix(source_size_classes, target_size_classes):
+    """
+    Get the matrix that maps size class masses from one set of size classes
+    onto another. The mass in a source size class is assumed to be spread
+    uniformly over the logarithm of particle size between the class' lower
+    and upper size. The first and last target size classes collect the mass
+    above and below the target screens, so that mass is conserved.
+
+    The matrices are cached, so that repeated conversions between the same
+    size classes require only a matrix-vector product.
+
+    :param source_size_classes: [m] List of source size classes, from the
+      largest to the smallest.
+    :param target_size_classes: [m] List of target size classes, from the
+      largest to the smallest.
+
+    :returns: [target classes x source classes] read-only matrix.
+    """
+
+    key = (tuple(source_size_classes), tuple(target_size_classes))
+    matrix = _rebinning_matrices.get(key, None)
+    if matrix is not None:
+        return matrix
+
+    lower, upper = _get_size_class_bounds(source_size_classes)
+    screens = numpy.array(target_size_classes[:-1], dtype=float)
+
+    # Calculate the fraction of each source class (column) that passes each
+    # target screen (row).
+    with numpy.errstate(divide='ignore', invalid='ignore'):
+        passing = (numpy.log(screens)[:, numpy.newaxis] - numpy.log(lower)) / \
+            (numpy.log(upper) - numpy.log(lower))
+    passing = numpy.clip(numpy.nan_to_num(passing), 0.0, 1.0)
+    passing[screens[:, numpy.newaxis] > upper] = 1.0
+    cumulative = numpy.vstack((numpy.ones(len(lower)), passing,
+                               numpy.zeros(len(lower))))
+
+    matrix = cumulative[:-1] - cumulative[1:]
+    matrix.flags.writeable = False
+    _rebinning_matrices[key] = matrix
+    return matrix
+
+
 def _get_default_data_path():
     module_path = os.path.dirname(sys.modules[__name__].__file__)
     data_path = os.path.join(module_path, r"data")
@@ -7,6 +7,7 @@ This module provides testing code for the psdmaterial module.
 
 import unittest
 import os
+import math
 import numpy
 from auxi.modelling.process.materials import psd
 from auxi.modelling.process.materials.psd import Material, MaterialPackage
@@ -48,6 +49,46 @@ class PsdMaterialUnitTester(unittest.TestCase):
         self.assertEqual(self.material.get_size_class_index(600.0E-6), 6)
         self.assertEqual(self.material.get_size_class_index(0.0E0), 9)
 
+    def test_get_size_class_index_tolerance(self):
+        self.assertEqual(
+            self.material.get_size_class_index(4.8E-3 * (1.0 + 1.0E-12)), 4)
+        self.assertEqual(self.material.get_size_class_index("600.0E-6"), 6)
+        self.assertEqual(self.material.get_size_class_index(0.0), 9)
+        self.assertRaises(ValueError, self.material.get_size_class_index,
+                          4.9E-3)
+
+        self.material.size_class_index.tolerance = 0.0
+        self.assertRaises(ValueError, self.material.get_size_class_index,
+                          4.8E-3 * (1.0 + 1.0E-12))
+
+    def test_get_containing_size_class_index(self):
+        material = self.material
+        self.assertEqual(material.get_containing_size_class_index(5.0E-3), 4)
+        self.assertEqual(material.get_containing_size_class_index(4.8E-3), 4)
+        self.assertEqual(
+            material.get_containing_size_class_index(4.8E-3 * 0.9999999999),
+            4)
+        self.assertEqual(material.get_containing_size_class_index(4.7E-3), 5)
+        self.assertEqual(material.get_containing_size_class_index(1.0), 0)
+        self.assertEqual(material.get_containing_size_class_index(1.0E-6), 9)
+        self.assertEqual(material.get_containing_size_class_index(0.0), 9)
+
+    def test_bin_particle_sizes(self):
+        material = self.material
+        sizes = numpy.random.RandomState(1).lognormal(
+            math.log(1.0E-3), 2.0, 1000)
+        indices = material.size_class_index.get_containing_indices(sizes)
+        self.assertEqual(
+            list(indices),
+            [material.get_containing_size_class_index(x) for x in sizes])
+
+        counts = material.bin_particle_sizes(sizes)
+        self.assertEqual(counts.shape, (10,))
+        self.assertEqual(counts.sum(), 1000.0)
+        masses = material.bin_particle_sizes(sizes, sizes ** 3)
+        self.assertAlmostEqual(masses.sum(), (sizes ** 3).sum())
+        self.assertAlmostEqual(masses[4], (sizes[indices == 4] ** 3).sum())
+
     def test_create_empty_assay(self):
         empty_assay = self.material.create_empty_assay()
         self.assertEqual(len(empty_assay), 10)
@@ -72,6 +113,28 @@ class PsdMaterialUnitTester(unittest.TestCase):
         package = self.material.create_package("FeedA", 123.456, True)
         self.assertEqual(package.get_mass(), 123.45599999999999)
 
+    def test_mean_sizes(self):
+        sizes = self.material.mean_sizes
+        self.assertAlmostEqual(sizes[1], math.sqrt(307.2E-3 * 108.6E-3))
+        self.assertAlmostEqual(sizes[0], 307.2E-3 * math.sqrt(307.2 / 108.6))
+        self.assertAlmostEqual(sizes[-1], 75.0E-6 / math.sqrt(210.0 / 75.0))
+
+    def test_batch_statistics(self):
+        packages = [self.material.create_package("FeedA", 10.0),
+                    self.material.create_package("MillCharge", 20.0)]
+        masses = numpy.array([p.size_class_masses for p in packages])
+        passing = self.material.get_cumulative_passing(masses)
+        P80 = self.material.get_passing_size(masses, 80.0, 'rosinrammler')
+        D32 = self.material.get_mean_size(masses)
+        for i, package in enumerate(packages):
+            self.assertTrue(numpy.allclose(passing[i],
+                                           package.get_cumulative_passing()))
+            self.assertAlmostEqual(
+                P80[i], package.get_passing_size(80.0, 'rosinrammler'))
+            self.assertAlmostEqual(D32[i], package.get_mean_size())
+        self.assertRaises(ValueError, self.material.get_passing_size, masses,
+                          80.0, 'linear')
+
 
 class PsdMaterialPackageUnitTester(unittest.TestCase):
     """
@@ -221,6 +284,10 @@ class PsdMaterialPackageUnitTester(unittest.TestCase):
         self.assertTrue(numpy.all(clone.size_class_masses ==
                                   self.materiala_package_a.size_class_masses))
 
+        clone.size_class_masses[0] += 1.0
+        self.assertNotEqual(clone.size_class_masses[0],
+                            self.materiala_package_a.size_class_masses[0])
+
     def test_get_mass(self):
         self.assertAlmostEqual(self.materiala_package_a.get_mass(),
                                1234.5,
@@ -250,5 +317,129 @@ class PsdMaterialPackageUnitTester(unittest.TestCase):
                 self.materiala_package_a.get_size_class_mass(size_class),
                 mass)
 
+    def test_get_cumulative_passing(self):
+        self.assertTrue(numpy.allclose(
+            self.materiala_package_a.get_cumulative_passing(),
+            [0.8, 0.62, 0.45, 0.38, 0.25, 0.18, 0.12, 0.1, 0.0, 0.0]))
+
+    def test_get_passing_size(self):
+        package = self.materiala_package_a
+        self.assertAlmostEqual(package.get_passing_size(80.0), 307.2E-3)
+        expected = math.exp(math.log(38.4E-3) + 0.05 / 0.17 *
+                            math.log(108.6 / 38.4))
+        self.assertAlmostEqual(package.get_passing_size(50.0), expected)
+        self.assertTrue(math.isnan(package.get_passing_size(90.0)))
+
+        # Rosin-Rammler interpolation extrapolates beyond the top screen.
+        expected = math.log(-math.log(1.0 - 0.8))
+        slope = (expected - math.log(-math.log(1.0 - 0.62))) / \
+            math.log(307.2 / 108.6)
+        size = math.exp(math.log(307.2E-3) +
+                        (math.log(-math.log(0.1)) - expected) / slope)
+        self.assertAlmostEqual(
+            package.get_passing_size(90.0, 'rosinrammler'), size)
+
+    def test_get_mean_size(self):
+        package = self.materiala_package_a
+        fractions = package.get_assay()
+        sizes = self.materiala.mean_sizes
+        self.assertAlmostEqual(package.get_size_moment(1),
+                               (fractions * sizes).sum())
+        self.assertAlmostEqual(package.get_mean_size(),
+                               1.0 / (fractions / sizes).sum())
+        self.assertAlmostEqual(package.get_mean_size(4, 3),
+                               (fractions * sizes).sum())
+        self.assertRaises(ValueError, package.get_mean_size, 2, 2)
+
+    def test_rebin(self):
+        materialb = Material(
+            "materialb",
+            os.path.join(psd.DEFAULT_DATA_PATH,
+                         r"psdmaterial.test.materialb.txt"))
+        package = self.materiala_package_a.rebin(materialb)
+        self.assertIs(package.material, materialb)
+        self.assertAlmostEqual(package.get_mass(),
+                               self.materiala_package_a.get_mass())
+        expected = self.materiala_package_a.get_passing_size(50.0)
+        self.assertAlmostEqual(package.get_passing_size(50.0), expected,
+                               delta=0.05 * expected)
+        self.assertRaises(TypeError, self.materiala_package_a.rebin, "b")
+
+    def test_add_operator_different_size_classes(self):
+        materialb = Material(
+            "materialb",
+            os.path.join(psd.DEFAULT_DATA_PATH,
+                         r"psdmaterial.test.materialb.txt"))
+        package_b = materialb.create_package("FeedB", 100.0)
+        result = self.materiala_package_a + package_b
+        self.assertIs(result.material, self.materiala)
+        self.assertAlmostEqual(result.get_mass(),
+                               self.materiala_package_a.get_mass() + 100.0)
+        numpy.testing.assert_allclose(
+            result.size_class_masses,
+            self.materiala_package_a.size_class_masses +
+            package_b.rebin(self.materiala).size_class_masses)
+
+        package = self.materiala_package_a.clone()
+        package.add_to(package_b)
+        numpy.testing.assert_allclose(package.size_class_masses,
+                                      result.size_class_masses)
+
+
+class PsdRebinningTester(unittest.TestCase):
+    """
+    Tester for the auxi.modelling.process.materials.psd.get_rebinning_matrix
+    function.
+    """
+
+    def setUp(self):
+        self.coarse = [1.0, 0.5, 0.25, 0.0]
+        self.fine = [1.0, 0.7071, 0.5, 0.3536, 0.25, 0.1768, 0.0]
+
+    def test_identity(self):
+        numpy.testing.assert_allclose(
+            psd.get_rebinning_matrix(self.fine, self.fine),
+            numpy.identity(len(self.fine)), atol=1.0E-12)
+
+    def test_conservation(self):
+        for source, target in [(self.coarse, self.fine),
+                               (self.fine, self.coarse),
+                               (self.fine, [2.0, 0.3, 0.01])]:
+            matrix = psd.get_rebinning_matrix(source, target)
+            self.assertEqual(matrix.shape, (len(target), len(source)))
+            numpy.testing.assert_allclose(matrix.sum(axis=0), 1.0)
+            self.assertTrue(numpy.all(matrix >= 0.0))
+
+    def test_split_and_merge(self):
+        # A coarse class is split in half in log size, and merging the
+        # halves recovers it.
+        matrix = psd.get_rebinning_matrix(self.coarse, self.fine)
+        numpy.testing.assert_allclose(matrix[1:3, 1], [0.5, 0.5], atol=1.0E-4)
+        numpy.testing.assert_allclose(
+            psd.get_rebinning_matrix(self.fine, self.coarse).dot(matrix),
+            numpy.identity(len(self.coarse)), atol=1.0E-4)
+
+        masses = numpy.array([[1.0, 2.0, 3.0, 4.0], [4.0, 3.0, 2.0, 1.0]])
+        numpy.testing.assert_allclose(masses.dot(matrix.T).sum(axis=1), 10.0)
+
+    def test_single_size_class(self):
+        # All of the mass of a single source class is retained on the target
+        # screen at its size.
+        numpy.testing.assert_allclose(
+            psd.get_rebinning_matrix([0.5], self.fine),
+            [[0.0], [0.0], [1.0], [0.0], [0.0], [0.0], [0.0]])
+        numpy.testing.assert_allclose(
+            psd.get_rebinning_matrix([0.0], self.coarse),
+            [[0.0], [0.0], [0.0], [1.0]])
+        numpy.testing.assert_allclose(
+            psd.get_rebinning_matrix(self.coarse, [0.5]), [[1.0] * 4])
+
+    def test_cache(self):
+        matrix = psd.get_rebinning_matrix(self.coarse, self.fine)
+        self.assertIs(psd.get_rebinning_matrix(self.coarse, self.fine),
+                      matrix)
+        self.assertFalse(matrix.flags.writeable)
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+"""
+This module provides a shared memory representation of thermo material
+packages and streams, so that processes can exchange them by material handle
+and row index instead of pickling them.
+"""
+
+import numpy
+from multiprocessing import shared_memory
+
+from auxi.core.objects import Object
+from auxi.modelling.process.materials.thermo import Material
+from auxi.modelling.process.materials.thermo import MaterialPackage
+from auxi.modelling.process.materials.thermo import MaterialStream
+
+
+__version__ = '0.3.6'
+__license__ = 'LGPL v3'
+__copyright__ = 'Copyright 2016, Ex Mente Technologies (Pty) Ltd'
+__author__ = 'Christoff Kok, Johan Zietsman'
+__credits__ = ['Christoff Kok', 'Johan Zietsman']
+__maintainer__ = 'Christoff Kok'
+__email__ = 'christoff.kok@ex-mente.co.za'
+__status__ = 'Planning'
+
+
+_materials = {}
+
+# Layout of the header at the start of each row. The compound masses or mass
+# flow rates follow the header.
+_KIND, _P, _T, _H, _IS_COAL, _HHV, _DH298 = range(7)
+_HEADER_SIZE = 7
+_EMPTY, _PACKAGE, _STREAM = 0.0, 1.0, 2.0
+
+
+def register_material(material, handle=None):
+    """
+    Register a material in this process, so that it can be referred to by
+    handle.
+
+    :param material: thermo.Material object.
+    :param handle: The handle to register the material under. The material's
+      name is used if this is None.
+
+    :returns: The material's handle.
+    """
+
+    if not type(material) is Material:
+        raise TypeError("Invalid material type. Must be thermo.Material")
+
+    if handle is None:
+        handle = material.name
+    _materials[handle] = material
+    return handle
+
+
+def unregister_material(handle):
+    """
+    Remove a material from this process' registry.
+
+    :param handle: The material's handle.
+    """
+
+    del _materials[handle]
+
+
+def get_material(handle):
+    """
+    Get a registered material.
+
+    :param handle: The material's handle.
+
+    :returns: thermo.Material object.
+    """
+
+    try:
+        return _materials[handle]
+    except KeyError:
+        raise Exception("No material is registered with handle '{}' in this "
+                        "process.".format(handle))
+
+
+def initialise_worker(materials):
+    """
+    Register materials in a worker process. This is intended for use as the
+    initializer of a process pool, so that each material is sent to a worker
+    only once.
+
+    :param materials: Dictionary of handles and thermo.Material objects.
+    """
+
+    for handle, material in materials.items():
+        register_material(material, handle)
+
+
+def _attach(name, material_handle, size):
+    return SharedMaterialArray(material_handle, size, name=name)
+
+
+class SharedMaterialArray(Object):
+    """
+    A block of shared memory holding the state of a number of material
+    packages or streams of the same material.
+
+    :param material_handle: The handle of a registered material.
+    :param size: The number of packages or streams that the block can hold.
+    :param name: The name of an existing shared memory block to attach to. A
+      new block is created if this is None.
+
+    The object pickles to the block name, material handle and size, so a
+    worker process attaches to the same memory when it receives it. Each row
+    stores the compound masses or mass flow rates together with the
+    pressure, temperature, enthalpy and coal properties, so that packages and
+    streams are recreated without recalculating their enthalpy.
+    """
+
+    def __init__(self, material_handle, size, name=None):
+        material = get_material(material_handle)
+        self.material_handle = material_handle
+        """The handle of the material."""
+        self.size = size
+        """The number of rows."""
+        self.row_length = _HEADER_SIZE + material.compound_count
+        """The number of values in a row."""
+
+        nbytes = max(1, size * self.row_length * 8)
+        if name is None:
+            self._memory = shared_memory.SharedMemory(create=True,
+                                                      size=nbytes)
+        else:
+            self._memory = shared_memory.SharedMemory(name=name)
+        self.values = numpy.ndarray((size, self.row_length), dtype=float,
+                                    buffer=self._memory.buf)
+        """[rows x row length] View of the shared memory."""
+        if name is None:
+            self.values[:] = 0.0
+
+    def __reduce__(self):
+        return (_attach, (self.name, self.material_handle, self.size))
+
+    def __len__(self):
+        return self.size
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        self.unlink()
+
+    @property
+    def name(self):
+        """
+        Get the name of the shared memory block.
+        """
+
+        return self._memory.name
+
+    def put(self, index, obj):
+        """
+        Store a package or stream in a row.
+
+        :param index: The row index.
+        :param obj: thermo.MaterialPackage or thermo.MaterialStream object.
+        """
+
+        row = self.values[index]
+        if type(obj) is MaterialPackage:
+            obj._reconcile()
+            row[_KIND] = _PACKAGE
+            row[_H] = obj._H
+            row[_HEADER_SIZE:] = obj._compound_masses
+        elif type(obj) is MaterialStream:
+            obj._reconcile()
+            row[_KIND] = _STREAM
+            row[_H] = obj._Hfr
+            row[_HEADER_SIZE:] = obj._compound_mfrs
+        else:
+            raise TypeError("Invalid object type. Must be "
+                            "thermo.MaterialPackage or thermo.MaterialStream")
+        row[_P] = obj._P
+        row[_T] = obj._T
+        row[_IS_COAL] = 1.0 if obj.isCoal else 0.0
+        row[_HHV] = numpy.nan if obj.HHV is None else obj.HHV
+        row[_DH298] = numpy.nan if obj._DH298 is None else obj._DH298
+
+    def get(self, index, copy=True):
+        """
+        Recreate the package or stream stored in a row.
+
+        :param index: The row index.
+        :param copy: Indicates whether the compound masses are copied. If
+          this is False, the object's compound mass array is a view of the
+          shared memory.
+
+        :returns: thermo.MaterialPackage or thermo.MaterialStream object.
+        """
+
+        row = self.values[index]
+        kind = row[_KIND]
+        if kind == _PACKAGE:
+            factory = MaterialPackage._from_arrays
+        elif kind == _STREAM:
+            factory = MaterialStream._from_arrays
+        else:
+            raise Exception('Row {} is empty.'.format(index))
+
+        values = row[_HEADER_SIZE:]
+        if copy:
+            values = values.copy()
+        return factory(
+            get_material(self.material_handle), values, float(row[_P]),
+            float(row[_T]), float(row[_H]), bool(row[_IS_COAL]),
+            None if numpy.isnan(row[_HHV]) else float(row[_HHV]),
+            None if numpy.isnan(row[_DH298]) else float(row[_DH298]))
+
+    def clear(self, index):
+        """
+        Clear a row.
+
+        :param index: The row index.
+        """
+
+        self.values[index] = 0.0
+
+    def close(self):
+        """
+        Close this process' access to the shared memory.
+        """
+
+        self.values = None
+        self._memory.close()
+
+    def unlink(self):
+        """
+        Request that the shared memory block be destroyed. This must be
+        called once, by the process that created the block.
+        """
+
+        self._memory.unlink()
+
+
+if __name__ == "__main__":
+    import unittest
+    from auxi.modelling.process.materials.sharedmemory_test import \
+        SharedMaterialArrayUnitTester
+    unittest.main()
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+This module provides testing code for the sharedmemory module.
+"""
+
+import pickle
+import unittest
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy
+
+from auxi.core.helpers import get_path_relative_to_module as get_path
+from auxi.modelling.process.materials import sharedmemory
+from auxi.modelling.process.materials.thermo import Material
+from auxi.modelling.process.materials.thermo import MaterialPackage
+from auxi.modelling.process.materials.thermo import MaterialStream
+
+
+__version__ = '0.3.6'
+__license__ = 'LGPL v3'
+__copyright__ = 'Copyright 2016, Ex Mente Technologies (Pty) Ltd'
+__author__ = 'Christoff Kok, Johan Zietsman'
+__credits__ = ['Christoff Kok', 'Johan Zietsman']
+__maintainer__ = 'Christoff Kok'
+__email__ = 'christoff.kok@ex-mente.co.za'
+__status__ = 'Planning'
+
+
+def heat_package(array, index, T):
+    package = array.get(index)
+    package.T = T
+    array.put(index, package)
+    array.close()
+    return index
+
+
+class SharedMaterialArrayUnitTester(unittest.TestCase):
+    """
+    Tester for the auxi.modelling.process.materials.sharedmemory module.
+    """
+
+    def setUp(self):
+        self.material = Material(
+            'ilmenite',
+            get_path(__file__, 'data/thermomaterial.test.ilmenite.txt'))
+        self.handle = sharedmemory.register_material(self.material)
+        self.array = sharedmemory.SharedMaterialArray(self.handle, 4)
+
+    def tearDown(self):
+        self.array.close()
+        self.array.unlink()
+        sharedmemory.unregister_material(self.handle)
+
+    def test_register_material(self):
+        self.assertEqual(self.handle, 'ilmenite')
+        self.assertIs(sharedmemory.get_material('ilmenite'), self.material)
+        self.assertRaises(Exception, sharedmemory.get_material, 'unknown')
+        self.assertRaises(TypeError, sharedmemory.register_material, 'x')
+
+    def test_put_get_package(self):
+        package = self.material.create_package('IlmeniteA', 100.0, 2.0, 500.0)
+        self.array.put(1, package)
+        result = self.array.get(1)
+        self.assertIs(type(result), MaterialPackage)
+        self.assertIs(result.material, self.material)
+        self.assertTrue(numpy.all(result._compound_masses ==
+                                  package._compound_masses))
+        self.assertEqual(result.P, 2.0)
+        self.assertEqual(result.T, 500.0)
+        self.assertEqual(result.H, package.H)
+        self.assertIsNone(result.HHV)
+        for slot in MaterialPackage.__slots__:
+            getattr(result, slot)
+
+        result = self.array.get(1, copy=False)
+        result._compound_masses[0] = 0.0
+        self.assertEqual(self.array.get(1)._compound_masses[0], 0.0)
+
+    def test_put_get_stream(self):
+        stream = self.material.create_stream('IlmeniteB', 10.0, T=200.0)
+        self.array.put(0, stream)
+        result = self.array.get(0)
+        self.assertEqual(result.mfr, stream.mfr)
+        self.assertEqual(result.Hfr, stream.Hfr)
+        self.assertEqual(result.T, 200.0)
+        for slot in MaterialStream.__slots__:
+            getattr(result, slot)
+        self.assertRaises(Exception, self.array.get, 2)
+        self.assertRaises(TypeError, self.array.put, 0, 'stream')
+
+    def test_pickle(self):
+        data = pickle.dumps(self.array)
+        self.assertLess(len(data), 200)
+        other = pickle.loads(data)
+        self.array.put(3, self.material.create_package('IlmeniteA', 5.0))
+        self.assertAlmostEqual(other.get(3).mass, 5.0)
+        other.close()
+
+    def test_worker_processes(self):
+        for i in range(4):
+            self.array.put(i, self.material.create_package('IlmeniteA', 1.0))
+        with ProcessPoolExecutor(
+                2, initializer=sharedmemory.initialise_worker,
+                initargs=({self.handle: self.material},)) as executor:
+            list(executor.map(heat_package, [self.array] * 4, range(4),
+                              [100.0, 200.0, 300.0, 400.0]))
+        for i in range(4):
+            package = self.array.get(i)
+            self.assertAlmostEqual(package.T, 100.0 * (i + 1))
+            self.assertAlmostEqual(
+                package.H,
+                self.material.create_package(
+                    'IlmeniteA', 1.0, T=100.0 * (i + 1)).H)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -6,12 +6,13 @@ size distribution and slurry calculations.
 
 import os
 import sys
-import copy
 
 import numpy
 
-from auxi.core.objects import Object
+from auxi.core.objects import SlottedObject
 from auxi.core.objects import NamedObject
+from auxi.modelling.process.materials import datafile
+from auxi.modelling.process.materials.psd import SizeClassIndex
 
 __version__ = '0.3.6'
 __license__ = 'LGPL v3'
@@ -75,65 +76,40 @@ class Material(NamedObject):
     def __init__(self, name, file_path, description=None):
         # Initialise the material's properties.
         self.name = name
-        self.size_classes = list()
-
-        # Read the material's data from the file and prepare it for use.
-        f = open(file_path, "r")
-        lines = f.readlines()
-        f.close()
-        lines = self._prepare_lines(lines)
-
-        # Determine the assay names, and create a dictionary entry
-        # for each assay.
-        assay_names = lines[0].split(" ")
-        del(assay_names[0:1])
-        self.assays = dict()
-        self.solid_densities = dict()
-        self.H2O_fractions = dict()
-        for assay_name in assay_names:
-            self.assays[assay_name] = numpy.array([])
-            self.solid_densities[assay_name] = 1.0
-            self.H2O_fractions[assay_name] = 0.0
 
-        # Read the solid densities of the assays.
-        strings = lines[1].split(" ")
-        if not strings[0] == "solid_density":
+        # Read the material's data from the file.
+        data = datafile.read(file_path)
+        assay_names = data.column_names
+
+        # Read the solid densities and water fractions of the assays.
+        if len(data.row_names) < 1 or \
+                not data.row_names[0] == "solid_density":
             raise Exception(
                 "Invalid data file. "
                 "The second line of the data file must start with"
                 "'solid_density'.")
-        # Add the solid densities.
-        for j in range(0, len(self.solid_densities)):
-            assay_name = assay_names[j]
-            self.solid_densities[assay_name] = float(strings[j+1])
-
-        # Read the water fractions of the assays.
-        strings = lines[2].split(" ")
-        if not strings[0] == "H2O":
+        if len(data.row_names) < 2 or not data.row_names[1] == "H2O":
             raise Exception(
                 "Invalid data file. "
                 "The third line of the data file must start with 'H2O'.")
-        # Add the water fractions.
-        for j in range(0, len(self.H2O_fractions)):
-            assay_name = assay_names[j]
-            self.H2O_fractions[assay_name] = float(strings[j+1])
+        self.solid_densities = dict()
+        self.H2O_fractions = dict()
+        for j, assay_name in enumerate(assay_names):
+            self.solid_densities[assay_name] = float(data.values[0, j])
+            self.H2O_fractions[assay_name] = float(data.values[1, j])
 
         # Read the size classes and mass fractions.
-        for i in range(3, len(lines)):
-            strings = lines[i].split(" ")
-            # Not a full line.
-            if len(strings) < len(assay_names) + 1:
-                continue
-            # Add the new size class.
-            self.size_classes.append(float(strings[0]))
-            # Add the mass fractions to the assays.
-            for j in range(0, len(self.assays)):
-                assay_name = assay_names[j]
-                self.assays[assay_name] = numpy.append(
-                    self.assays[assay_name], float(strings[j+1]))
+        self.size_classes = [float(c) for c in data.row_names[2:]]
+        block = data.values[2:].T.copy()
+        self.assays = {name: block[j] for j, name in enumerate(assay_names)}
 
         # Initialise the remaining properties.
         self.size_class_count = len(self.size_classes)
+        self.size_class_index = SizeClassIndex(self.size_classes)
+        """
+        Index of the size classes. Its tolerance attribute sets the relative
+        tolerance used to find size classes by value.
+        """
 
     def __str__(self):
         """
@@ -173,36 +149,42 @@ class Material(NamedObject):
             result = result + "\n"
         return result
 
-    def _prepare_lines(self, lines):
+    def get_size_class_index(self, size_class):
         """
-        Prepare the lines read from the text file before starting to process
-        it.
+        Determine the index of the specified size class.
+
+        :param size_class: [m] The specified size class, e.g. 4.8E-3. It
+          matches within the relative tolerance of size_class_index.
+
+        :returns: The index of the specified size class.
         """
 
-        result = list()
-        for line in lines:
-            # Remove all whitespace characters (e.g. spaces, line breaks, etc.)
-            # from the start and end of the line.
-            line = line.strip()
-            # Replace all tabs with spaces.
-            line = line.replace("\t", " ")
-            # Replace all repeating spaces with a single space.
-            while line.find("  ") > -1:
-                line = line.replace("  ", " ")
-            result.append(line)
-        return result
+        return self.size_class_index.get_index(size_class)
 
-    def get_size_class_index(self, size_class):
+    def get_containing_size_class_index(self, size):
         """
-        Determine the index of the specified size class.
+        Determine the index of the size class that contains a particle size.
 
-        :param size_class: The formula and phase of the specified size class,
-          e.g. 'Fe2O3[S1]'.
+        :param size: [m] The particle size.
 
-        :returns: The index of the specified size class.
+        :returns: The index of the size class.
+        """
+
+        return self.size_class_index.get_containing_index(size)
+
+    def bin_particle_sizes(self, sizes, masses=None):
         """
+        Create size class masses from a list of particle sizes, e.g. the
+        output of a particle size analyser.
 
-        return self.size_classes.index(size_class)
+        :param sizes: [m] Array of particle sizes.
+        :param masses: [kg] Array of the mass of each particle size. Each
+          size is counted as 1 kg if this is None.
+
+        :returns: [kg] Array of size class masses.
+        """
+
+        return self.size_class_index.bin(sizes, masses)
 
     def create_empty_assay(self):
         """
@@ -308,7 +290,7 @@ class Material(NamedObject):
                                solid_mass * self.assays[assay] / assay_total)
 
 
-class MaterialPackage(Object):
+class MaterialPackage(SlottedObject):
     """
     A package of a slurry material consisting of multiple particle size
     classes.
@@ -318,6 +300,8 @@ class MaterialPackage(Object):
           package.
     """
 
+    __slots__ = ('material', 'solid_density', 'H2O_mass', 'size_class_masses')
+
     def __init__(self, material, solid_density, H2O_mass, size_class_masses):
         # Confirm that the parameters are OK.
         if not type(material) is Material:
@@ -376,9 +360,9 @@ class MaterialPackage(Object):
         if type(other) is MaterialPackage:
             solid_mass = self.get_solid_mass()
             other_solid_mass = other.get_solid_mass()
-            solid_density = (solid_mass + other_solid_mass) / \
-                (solid_mass / self.solid_density +
-                    other_solid_mass / other.solid_density)
+            solid_density = _blend_solid_densities(
+                solid_mass, self.solid_density,
+                other_solid_mass, other.solid_density)
             H2O_mass = self.H2O_mass + other.H2O_mass
             # Packages of the same material.
             if self.material == other.material:
@@ -514,8 +498,11 @@ class MaterialPackage(Object):
         :returns: A MaterialPackage that is identical to self.
         """
 
-        result = copy.copy(self)
-        result.size_class_masses = copy.deepcopy(self.size_class_masses)
+        result = MaterialPackage.__new__(MaterialPackage)
+        result.material = self.material
+        result.solid_density = self.solid_density
+        result.H2O_mass = self.H2O_mass
+        result.size_class_masses = self.size_class_masses.copy()
         return result
 
     def clear(self):
@@ -544,7 +531,7 @@ class MaterialPackage(Object):
         :returns: [kg] The mass of self.
         """
 
-        return self.size_class_masses.sum() + self.H2O_mass
+        return self.get_solid_mass() + self.H2O_mass
 
     def get_solid_mass(self):
         """
@@ -586,14 +573,17 @@ class MaterialPackage(Object):
         Determine the density of self.
         """
 
-        return self.get_mass() / self.get_volume()
+        solid_mass = self.get_solid_mass()
+        return (solid_mass + self.H2O_mass) / \
+            (self.H2O_mass / 1.0 + solid_mass / self.solid_density)
 
     def get_mass_fraction_solids(self):
         """
         Determine the mass fraction of the solids of self.
         """
 
-        return self.get_solid_mass() / self.get_mass()
+        solid_mass = self.get_solid_mass()
+        return solid_mass / (solid_mass + self.H2O_mass)
 
     def get_volume(self):
         """
@@ -728,6 +718,262 @@ class MaterialPackage(Object):
 #            raise TypeError("Invalid addition argument.")
 
 
+class MaterialPackageBatch(SlottedObject):
+    """
+    A batch of packages of a slurry material, stored as arrays so that the
+    properties of all the packages are calculated at once.
+
+    :param material: A reference to the Material to which self belongs.
+    :param solid_densities: The solid density of each package, or one
+      solid density for all the packages.
+    :param H2O_masses: [kg] The water mass of each package, or one water mass
+      for all the packages.
+    :param size_class_masses: [kg] [packages x classes] array of the masses
+      of the size classes in the packages.
+    """
+
+    __slots__ = ('material', 'solid_densities', 'H2O_masses',
+                 'size_class_masses')
+
+    def __init__(self, material, solid_densities, H2O_masses,
+                 size_class_masses):
+        # Confirm that the parameters are OK.
+        if not type(material) is Material:
+            raise TypeError(
+                "Invalid material type. Must be psdslurrymaterial.Material")
+        if not type(size_class_masses) is numpy.ndarray or \
+           size_class_masses.ndim != 2 or \
+           size_class_masses.shape[1] != len(material.size_classes):
+            raise TypeError(
+                "Invalid size_class_masses type. Must be a [packages x "
+                "classes] numpy.ndarray.")
+
+        # Initialise the object's properties.
+        count = size_class_masses.shape[0]
+        self.material = material
+        self.solid_densities = numpy.zeros(count) + solid_densities
+        """The solid density of each package."""
+        self.H2O_masses = numpy.zeros(count) + H2O_masses
+        """[kg] The water mass of each package."""
+        self.size_class_masses = size_class_masses
+        """[kg] [packages x classes] array of size class masses."""
+
+        if self.solid_densities.shape != (count,) or \
+           self.H2O_masses.shape != (count,):
+            raise Exception("A solid density and water mass is required for "
+                            "each package.")
+
+    @staticmethod
+    def from_packages(packages):
+        """
+        Create a batch from a list of packages of the same material.
+
+        :param packages: List of MaterialPackage objects.
+
+        :returns: A MaterialPackageBatch.
+        """
+
+        if len(packages) == 0:
+            raise Exception("At least one package is required.")
+        material = packages[0].material
+        for package in packages:
+            if package.material is not material:
+                raise Exception("The packages must be of the same material.")
+
+        return MaterialPackageBatch(
+            material,
+            numpy.array([p.solid_density for p in packages], dtype=float),
+            numpy.array([p.H2O_mass for p in packages], dtype=float),
+            numpy.array([p.size_class_masses for p in packages], dtype=float))
+
+    def __len__(self):
+        return self.size_class_masses.shape[0]
+
+    def __getitem__(self, index):
+        """
+        Get a package, or a batch of some of the packages.
+
+        :param index: An integer, slice, or array of indices or booleans.
+
+        :returns: A MaterialPackage for an integer index, and a
+          MaterialPackageBatch otherwise.
+        """
+
+        if isinstance(index, (int, numpy.integer)):
+            result = MaterialPackage(
+                self.material, float(self.solid_densities[index]),
+                float(self.H2O_masses[index]),
+                self.size_class_masses[index].copy())
+            return result
+
+        return MaterialPackageBatch(
+            self.material, self.solid_densities[index],
+            self.H2O_masses[index], self.size_class_masses[index])
+
+    def __add__(self, other):
+        """
+        Addition operator (+).
+        Add the packages of 'other' to the packages of self, return the
+        result as a new batch, and leave self unchanged.
+
+        :param other: A MaterialPackageBatch of the same material and
+          length, or a MaterialPackage that is added to every package.
+
+        :returns: A new MaterialPackageBatch.
+        """
+
+        if type(other) is MaterialPackage:
+            other_solid_masses = other.get_solid_mass()
+            other_densities = other.solid_density
+            other_H2O_masses = other.H2O_mass
+        elif type(other) is MaterialPackageBatch:
+            if len(other) != len(self):
+                raise Exception("Batches of different lengths cannot be "
+                                "added.")
+            other_solid_masses = other.get_solid_masses()
+            other_densities = other.solid_densities
+            other_H2O_masses = other.H2O_masses
+        else:
+            raise TypeError("Invalid addition argument.")
+
+        if other.material is not self.material:
+            raise Exception("Packages of '" + other.material.name +
+                            "' cannot be added to a batch of '" +
+                            self.material.name + "'.")
+
+        solid_masses = self.get_solid_masses()
+        result = MaterialPackageBatch(
+            self.material,
+            _blend_solid_densities(solid_masses, self.solid_densities,
+                                   other_solid_masses, other_densities),
+            self.H2O_masses + other_H2O_masses,
+            self.size_class_masses + other.size_class_masses)
+        return result
+
+    def __mul__(self, scalar):
+        """
+        The multiplication operator (*).
+        Create a new batch by multiplying self with a scalar or with an
+        array of a scalar for each package.
+
+        :param scalar: A float, or an array with a value for each package.
+
+        :returns: A new MaterialPackageBatch.
+        """
+
+        scalar = numpy.asarray(scalar, dtype=float)
+        if numpy.any(scalar < 0.0):
+            raise Exception(
+                "Invalid multiplication operation. "
+                "Cannot multiply package with negative number.")
+        return MaterialPackageBatch(
+            self.material, self.solid_densities.copy(),
+            self.H2O_masses * scalar,
+            self.size_class_masses * scalar[..., numpy.newaxis])
+
+    def clone(self):
+        """
+        Create a complete copy of self.
+
+        :returns: A MaterialPackageBatch that is identical to self.
+        """
+
+        result = MaterialPackageBatch.__new__(MaterialPackageBatch)
+        result.material = self.material
+        result.solid_densities = self.solid_densities.copy()
+        result.H2O_masses = self.H2O_masses.copy()
+        result.size_class_masses = self.size_class_masses.copy()
+        return result
+
+    def get_solid_masses(self):
+        """
+        Determine the solid mass of each package.
+
+        :returns: [kg] Array of solid masses.
+        """
+
+        return self.size_class_masses.sum(axis=1)
+
+    def get_masses(self):
+        """
+        Determine the mass of each package.
+
+        :returns: [kg] Array of masses.
+        """
+
+        return self.get_solid_masses() + self.H2O_masses
+
+    def get_volumes(self):
+        """
+        Determine the volume of each package.
+
+        :returns: Array of volumes.
+        """
+
+        return self.H2O_masses / 1.0 + \
+            self.get_solid_masses() / self.solid_densities
+
+    def get_densities(self):
+        """
+        Determine the density of each package.
+
+        :returns: Array of densities.
+        """
+
+        return self.get_masses() / self.get_volumes()
+
+    def get_mass_fractions_solids(self):
+        """
+        Determine the mass fraction of the solids of each package.
+
+        :returns: Array of mass fractions.
+        """
+
+        return self.get_solid_masses() / self.get_masses()
+
+    def get_volume_fractions_solids(self):
+        """
+        Determine the volume fraction of the solids of each package.
+
+        :returns: Array of volume fractions.
+        """
+
+        return 1.0 - (self.H2O_masses / 1.0) / self.get_volumes()
+
+
+def _blend_solid_densities(solid_mass, solid_density, other_solid_mass,
+                           other_solid_density):
+    """
+    Calculate the solid density of a mixture of two solids, assuming that
+    their volumes are additive.
+
+    :param solid_mass: [kg] The mass of the first solid, or an array.
+    :param solid_density: The density of the first solid, or an array.
+    :param other_solid_mass: [kg] The mass of the second solid, or an array.
+    :param other_solid_density: The density of the second solid, or an
+      array.
+
+    :returns: The solid density of the mixture, or an array. The density of
+      the first solid is used where there are no solids.
+    """
+
+    if numpy.isscalar(solid_density) and \
+       numpy.isscalar(other_solid_density):
+        if solid_density == other_solid_density:
+            return solid_density
+        total = solid_mass + other_solid_mass
+        if total == 0.0:
+            return solid_density
+        return total / (solid_mass / solid_density +
+                        other_solid_mass / other_solid_density)
+
+    total = solid_mass + other_solid_mass
+    with numpy.errstate(divide='ignore', invalid='ignore'):
+        result = total / (solid_mass / solid_density +
+                          other_solid_mass / other_solid_density)
+    return numpy.where(total == 0.0, solid_density, result)
+
+
 def _get_default_data_path():
     module_path = os.path.dirname(sys.modules[__name__].__file__)
     data_path = os.path.join(module_path, r"data")
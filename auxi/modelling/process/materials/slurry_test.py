@@ -10,6 +10,7 @@ import os
 import numpy
 from auxi.modelling.process.materials import slurry
 from auxi.modelling.process.materials.slurry import Material, MaterialPackage
+from auxi.modelling.process.materials.slurry import MaterialPackageBatch
 
 __version__ = '0.3.6'
 __license__ = 'LGPL v3'
@@ -47,6 +48,18 @@ class SlurryMaterialUnitTester(unittest.TestCase):
         self.assertEqual(self.material.get_size_class_index(38.4E-3), 2)
         self.assertEqual(self.material.get_size_class_index(600.0E-6), 6)
         self.assertEqual(self.material.get_size_class_index(0.0E0), 9)
+        self.assertEqual(
+            self.material.get_size_class_index(38.4E-3 * (1.0 - 1.0E-12)), 2)
+        self.assertRaises(ValueError, self.material.get_size_class_index,
+                          38.5E-3)
+
+    def test_bin_particle_sizes(self):
+        self.assertEqual(
+            self.material.get_containing_size_class_index(40.0E-3), 2)
+        numpy.testing.assert_array_equal(
+            self.material.bin_particle_sizes([40.0E-3, 1.0, 1.0E-6],
+                                             [1.0, 2.0, 3.0]),
+            [2.0, 0.0, 1.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 3.0])
 
     def test_create_empty_assay(self):
         empty_assay = self.material.create_empty_assay()
@@ -220,6 +233,13 @@ class SlurryMaterialPackageUnitTester(unittest.TestCase):
         self.assertEqual(clone.get_mass(), self.materiala_package_a.get_mass())
         self.assertTrue(numpy.all(clone.size_class_masses ==
                                   self.materiala_package_a.size_class_masses))
+        self.assertEqual(clone.H2O_mass, self.materiala_package_a.H2O_mass)
+        self.assertEqual(clone.solid_density,
+                         self.materiala_package_a.solid_density)
+
+        clone.size_class_masses[0] += 1.0
+        self.assertNotEqual(clone.size_class_masses[0],
+                            self.materiala_package_a.size_class_masses[0])
 
     def test_get_mass(self):
         self.assertAlmostEqual(self.materiala_package_a.get_mass(), 1234.5)
@@ -248,6 +268,154 @@ class SlurryMaterialPackageUnitTester(unittest.TestCase):
                 self.materiala_package_a.get_size_class_mass(size_class),
                 mass)
 
+    def test_solid_mass(self):
+        package = self.materiala.create_package("WetFeedA", 100.0)
+        self.assertAlmostEqual(package.get_solid_mass(), 20.0)
+
+        package.size_class_masses = package.size_class_masses * 2.0
+        self.assertAlmostEqual(package.get_solid_mass(), 40.0)
+
+        # In-place changes of the size class masses are seen immediately.
+        density = package.get_density()
+        package.size_class_masses[2] += 1.0
+        self.assertAlmostEqual(package.get_solid_mass(), 41.0)
+        self.assertGreater(package.get_density(), density)
+        package.size_class_masses *= 0.5
+        self.assertAlmostEqual(package.get_solid_mass(), 20.5)
+        self.assertAlmostEqual(package.get_volume_fraction_solids(),
+                               20.5 / package.solid_density /
+                               package.get_volume())
+        package.size_class_masses[2] -= 0.5
+        self.assertAlmostEqual(package.get_solid_mass(), 20.0)
+        package.size_class_masses *= 2.0
+
+        package.extract((4.8E-3, 1.0))
+        self.assertAlmostEqual(package.get_solid_mass(), 39.0)
+        package.extract("4.8E-3")
+        self.assertAlmostEqual(package.get_solid_mass(),
+                               package.size_class_masses.sum())
+        extracted = package.extract(10.0)
+        self.assertAlmostEqual(
+            extracted.get_solid_mass(), extracted.size_class_masses.sum())
+        self.assertAlmostEqual(package.get_solid_mass(),
+                               package.size_class_masses.sum())
+        self.assertAlmostEqual((package * 0.5).get_solid_mass(),
+                               package.size_class_masses.sum() * 0.5)
+
+        result = package + (4.8E-3, 1.0)
+        self.assertAlmostEqual(result.get_solid_mass(),
+                               package.get_solid_mass() + 1.0)
+        package.clear()
+        self.assertEqual(package.get_solid_mass(), 0.0)
+
+    def test_add_operator_solid_density(self):
+        package_a = MaterialPackage(self.materiala, 2.0, 1.0,
+                                    numpy.ones(10))
+        package_b = MaterialPackage(self.materiala, 4.0, 1.0,
+                                    numpy.ones(10) * 2.0)
+        result = package_a + package_b
+        self.assertAlmostEqual(result.solid_density,
+                               30.0 / (10.0 / 2.0 + 20.0 / 4.0))
+        self.assertAlmostEqual(result.get_volume(), 12.0)
+
+        empty = package_a * 0.0
+        self.assertEqual((empty + empty).solid_density, 2.0)
+
+
+class SlurryMaterialPackageBatchUnitTester(unittest.TestCase):
+    """
+    Tester for the
+    auxi.modelling.process.materials.slurry.MaterialPackageBatch class.
+    """
+
+    def setUp(self):
+        self.materiala = Material(
+            "materiala",
+            os.path.join(slurry.DEFAULT_DATA_PATH,
+                         r"psdslurrymaterial.test.materiala.txt"))
+        self.packages = [
+            self.materiala.create_package("WetFeedA", 100.0),
+            self.materiala.create_package("WetMillCharge", 50.0),
+            MaterialPackage(self.materiala, 2.0, 3.0, numpy.ones(10))]
+        self.batch = MaterialPackageBatch.from_packages(self.packages)
+
+    def test_constructor(self):
+        batch = MaterialPackageBatch(self.materiala, 3.0, 1.0,
+                                     numpy.ones((4, 10)))
+        self.assertEqual(len(batch), 4)
+        numpy.testing.assert_array_equal(batch.solid_densities, 3.0)
+        self.assertRaises(TypeError, MaterialPackageBatch, self.materiala,
+                          3.0, 1.0, numpy.ones(10))
+        self.assertRaises(Exception, MaterialPackageBatch, self.materiala,
+                          [3.0, 2.0], 1.0, numpy.ones((4, 10)))
+
+    def test_from_packages(self):
+        self.assertEqual(len(self.batch), 3)
+        numpy.testing.assert_array_equal(
+            self.batch.H2O_masses, [p.H2O_mass for p in self.packages])
+        other = Material(
+            "materiala",
+            os.path.join(slurry.DEFAULT_DATA_PATH,
+                         r"psdslurrymaterial.test.materiala.txt"))
+        self.assertRaises(Exception, MaterialPackageBatch.from_packages,
+                          [self.packages[0], other.create_package()])
+
+    def test_queries(self):
+        batch = self.batch
+        packages = self.packages
+        for values, method in [
+                (batch.get_solid_masses(), MaterialPackage.get_solid_mass),
+                (batch.get_masses(), MaterialPackage.get_mass),
+                (batch.get_volumes(), MaterialPackage.get_volume),
+                (batch.get_densities(), MaterialPackage.get_density),
+                (batch.get_mass_fractions_solids(),
+                 MaterialPackage.get_mass_fraction_solids),
+                (batch.get_volume_fractions_solids(),
+                 MaterialPackage.get_volume_fraction_solids)]:
+            numpy.testing.assert_allclose(values,
+                                          [method(p) for p in packages])
+
+    def test_getitem(self):
+        package = self.batch[1]
+        self.assertEqual(type(package), MaterialPackage)
+        self.assertAlmostEqual(package.get_mass(), 50.0)
+        package.size_class_masses[0] = 100.0
+        self.assertNotEqual(self.batch.size_class_masses[1, 0], 100.0)
+
+        batch = self.batch[1:]
+        self.assertEqual(type(batch), MaterialPackageBatch)
+        numpy.testing.assert_allclose(batch.get_masses(),
+                                      self.batch.get_masses()[1:])
+
+    def test_add_operator(self):
+        result = self.batch + self.batch
+        numpy.testing.assert_allclose(result.get_masses(),
+                                      self.batch.get_masses() * 2.0)
+        for i, package in enumerate(self.packages):
+            expected = package + self.packages[0]
+            actual = (self.batch + self.packages[0])[i]
+            self.assertAlmostEqual(actual.solid_density,
+                                   expected.solid_density)
+            self.assertAlmostEqual(actual.get_density(),
+                                   expected.get_density())
+        self.assertRaises(Exception, self.batch.__add__, self.batch[1:])
+        self.assertRaises(TypeError, self.batch.__add__, 1.0)
+
+    def test_multiply_operator(self):
+        result = self.batch * 2.0
+        numpy.testing.assert_allclose(result.get_masses(),
+                                      self.batch.get_masses() * 2.0)
+        result = self.batch * numpy.array([1.0, 2.0, 0.0])
+        numpy.testing.assert_allclose(
+            result.get_masses(), self.batch.get_masses() * [1.0, 2.0, 0.0])
+        self.assertRaises(Exception, self.batch.__mul__, -1.0)
+
+    def test_clone(self):
+        clone = self.batch.clone()
+        clone.size_class_masses[0, 0] += 1.0
+        self.assertAlmostEqual(clone.get_solid_masses()[0],
+                               self.batch.get_solid_masses()[0] + 1.0)
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -5,15 +5,19 @@ This module provides a material class that can do thermochemical calculations.
 
 import os
 import sys
-import copy
+import math
+from collections import OrderedDict
+from contextlib import contextmanager
 
 import numpy
 
-from auxi.core.objects import Object, NamedObject
+from auxi.core import instrumentation
+from auxi.core.objects import NamedObject, SlottedObject
 from auxi.tools.chemistry import stoichiometry as stoich
 from auxi.tools.chemistry.stoichiometry import convert_compound as cc
 from auxi.tools.chemistry import thermochemistry as thermo
 from auxi.tools.materialphysicalproperties import coals
+from auxi.modelling.process.materials import datafile
 
 __version__ = '0.3.6'
 __license__ = 'LGPL v3'
@@ -25,6 +29,16 @@ __email__ = 'christoff.kok@ex-mente.co.za'
 __status__ = 'Planning'
 
 
+_coal_elements = ['C', 'H', 'O', 'N', 'S']
+"""The elements that make up dry ash-free coal."""
+
+_daf_H_model = coals.DafHTy()
+"""Shared enthalpy model for dry ash-free coal."""
+
+_H_table_segment_size = 20
+"""The number of temperature intervals in an assay enthalpy table segment."""
+
+
 class Material(NamedObject):
     """
     Represents a material consisting of multiple chemical compounds, having
@@ -84,72 +98,54 @@ class Material(NamedObject):
         self.description = description
         """The material's description."""
 
-        self.compounds = list()
-        """The material's list of chemical compounds."""
+        # Read the material's data from the file.
+        data = datafile.read(file_path)
+        assay_names = data.column_names
 
-        # Read the material's data from the file and prepare it for use.
-        with open(file_path) as f:
-            lines = f.readlines()
-        lines = self._prepare_lines(lines)
+        self.compounds = list(data.row_names)
+        """The material's list of chemical compounds."""
 
-        # Determine the assay names, and create a dictionary entry for each
-        # assay.
-        assay_names = lines[0].split(" ")
-        del(assay_names[0:1])
-        self.raw_assays = {}
+        # Create a dictionary entry for each assay.
+        self.raw_assays = data.get_columns()
         """A dictionary containing raw assays for this material."""
-        self.converted_assays = {}
+        self.converted_assays = data.get_columns()
         """A dictionary containing converted assays for this material."""
 
-        for assay_name in assay_names:
-            self.raw_assays[assay_name] = numpy.array([])
-            self.converted_assays[assay_name] = numpy.array([])
-
-        # Read the compounds and assays.
-        must_read_custom_properties = False
-        for i in range(1, len(lines)):
-            if lines[i].startswith("#"):
-                must_read_custom_properties = True
-                break
-            strings = lines[i].split(" ")
-            if len(strings) < len(assay_names) + 1:  # Not a full line.
-                continue
-
-            # Add the new compound.
-            self.compounds.append(strings[0])
-
-            # Add the mass fractions to the assays.
-            for j in range(0, len(self.raw_assays)):
-                assay_name = assay_names[j]
-                self.raw_assays[assay_name] = numpy.append(
-                    self.raw_assays[assay_name],
-                    float(strings[j+1]))
-                self.converted_assays[assay_name] = numpy.append(
-                    self.converted_assays[assay_name],
-                    float(strings[j+1]))
-
         # Read the custom properties.
         self.assay_custom_properties = dict()
-        for j in range(0, len(self.raw_assays)):
-            assay_name = assay_names[j]
-            self.assay_custom_properties[assay_name] = dict()
-        self.custom_properties = []
-        if must_read_custom_properties:
-            for i in range(i+1, len(lines)):
-                strings = lines[i].split(" ")
-                for j in range(0, len(self.raw_assays)):
-                    assay_name = assay_names[j]
-                    property_name = strings[0]
-                    self.custom_properties.append(property_name)
-                    property_dictionary = self.assay_custom_properties[
-                        assay_name]
-                    property_dictionary[property_name] = float(strings[j+1])
+        for j, assay_name in enumerate(assay_names):
+            self.assay_custom_properties[assay_name] = {
+                p: float(v) for p, v in zip(data.property_names,
+                                            data.property_values[:, j])}
+        self.custom_properties = list(data.property_names)
 
         # Initialise the remaining properties.
         self.compound_count = len(self.compounds)
         """The number of chemical compounds in the material."""
 
         self.elements = self._create_element_list()
+        """The material's alphabetically sorted list of elements."""
+
+        self._element_mass_fraction_cache = {}
+        self.element_mass_fractions = self._get_element_mass_fractions()
+        """
+        [compounds x elements] Matrix of the mass fractions of the material's
+        elements in each of its compounds.
+        """
+
+        self._classify_coal_compounds()
+        self._specific_H_cache = {}
+
+        self.H_table_T_range = (0.0, 2500.0)
+        """
+        [°C] Temperature range of the assay enthalpy tables. The enthalpy of
+        packages outside this range is calculated exactly.
+        """
+        self.H_table_T_step = 5.0
+        """[°C] Temperature interval of the assay enthalpy tables."""
+        self.H_table_cache_size = 128
+        """The maximum number of assay enthalpy table segments to cache."""
+        self._assay_H_tables = OrderedDict()
 
     def __str__(self):
         if len(self.raw_assays) > 0:
@@ -218,41 +214,304 @@ class Material(NamedObject):
 
         return result
 
-    def _prepare_lines(self, lines):
+    def _create_element_list(self):
         """
-        Prepare the lines read from the text file before starting to
-        process it.
+        Extract an alphabetically sorted list of elements from the
+        material's compounds.
 
-        :param lines: The lines to prepare.
+        :returns: Alphabetically sorted list of elements.
         """
 
-        result = list()
-
-        for line in lines:
-            # Remove all whitespace from the start and end of the line.
-            line = line.strip()
+        element_set = stoich.elements(self.compounds)
+        return sorted(list(element_set))
 
-            # Replace all tabs with spaces.
-            line = line.replace("\t", " ")
+    def _get_element_mass_fractions(self, elements=None):
+        """
+        Get the matrix of element mass fractions in the material's compounds.
 
-            # Replace all repeating spaces with a single space.
-            while line.find("  ") > -1:
-                line = line.replace("  ", " ")
+        :param elements: List of elements. The material's elements are used
+          if this is None.
 
-            result.append(line)
+        :returns: [compounds x elements] Matrix of element mass fractions.
+        """
 
+        if elements is None:
+            elements = self.elements
+        key = tuple(elements)
+        result = self._element_mass_fraction_cache.get(key, None)
+        if result is None:
+            result = numpy.array(
+                [stoich.element_mass_fractions(compound, elements)
+                 for compound in self.compounds],
+                dtype=float).reshape(self.compound_count, len(elements))
+            result.flags.writeable = False
+            self._element_mass_fraction_cache[key] = result
         return result
 
-    def _create_element_list(self):
+    def get_element_masses(self, compound_masses, elements=None):
         """
-        Extract an alphabetically sorted list of elements from the
-        material's compounds.
+        Determine the masses of elements in one or more compound mass vectors.
 
-        :returns: Alphabetically sorted list of elements.
+        :param compound_masses: [kg] Array of compound masses, or a
+          [packages x compounds] array containing a row per package.
+        :param elements: List of elements. The material's elements are used
+          if this is None.
+
+        :returns: [kg] Array of element masses, or a [packages x elements]
+          array containing a row per package.
         """
 
-        element_set = stoich.elements(self.compounds)
-        return sorted(list(element_set))
+        return numpy.dot(compound_masses,
+                         self._get_element_mass_fractions(elements))
+
+    def _classify_coal_compounds(self):
+        """
+        Determine which of the material's compounds consist purely of one of
+        the elements that make up dry ash-free coal (C, H, O, N and S).
+
+        The classification is stored as a mask matrix with a row per coal
+        element and a column per compound, so that the coal enthalpy
+        calculations do not need to parse compound formulas.
+        """
+
+        masks = numpy.zeros((len(_coal_elements), self.compound_count),
+                            dtype=bool)
+        for index, compound in enumerate(self.compounds):
+            for row, element in enumerate(_coal_elements):
+                if stoich.element_mass_fraction(compound, element) == 1.0:
+                    masks[row, index] = True
+                    break
+
+        self._coal_masks = masks.astype(float)
+        """Matrix used to sum compound masses into C-H-O-N-S masses."""
+        daf = masks.any(axis=0)
+        self._coal_daf_compounds = [(i, self.compounds[i])
+                                    for i in numpy.flatnonzero(daf)]
+        """Indices and names of the pure C-H-O-N-S compounds."""
+        self._coal_other_compounds = [(i, self.compounds[i])
+                                      for i in numpy.flatnonzero(~daf)]
+        """Indices and names of the remaining (ash) compounds."""
+
+    def _calculate_coal_daf_H(self, daf_masses, T):
+        """
+        Calculate the specific enthalpy of dry ash-free coal relative to
+        298.15 K.
+
+        :param daf_masses: [kg] C, H, O, N and S masses of the daf coal.
+        :param T: [°C] temperature
+
+        :returns: [kWh/kg] specific enthalpy change from 25 °C to T
+        """
+
+        y_C, y_H, y_O, y_N, y_S = daf_masses / daf_masses.sum()
+        H = _daf_H_model.calculate(T=T+273.15, y_C=y_C, y_H=y_H, y_O=y_O,
+                                   y_N=y_N, y_S=y_S)
+        H298 = _daf_H_model.calculate(T=298.15, y_C=y_C, y_H=y_H, y_O=y_O,
+                                      y_N=y_N, y_S=y_S)
+        return (H - H298) / 3.6e6  # kWh/kg
+
+    def _calculate_coal_Hout(self, daf_masses, T=25.0):
+        """
+        Calculate the enthalpy of the combustion products of dry ash-free
+        coal.
+
+        :param daf_masses: [kg] C, H, O, N and S masses of the daf coal.
+        :param T: [°C] temperature
+
+        :returns: [kWh] enthalpy of the combustion products
+        """
+
+        m_C, m_H, m_O, m_N, m_S = daf_masses
+        Hout = 0.0  # kWh
+        Hout += thermo.H('CO2[G]', T, cc(m_C, 'C', 'CO2', 'C'))
+        Hout += thermo.H('H2O[L]', T, cc(m_H, 'H', 'H2O', 'H'))
+        Hout += thermo.H('O2[G]', T, m_O)
+        Hout += thermo.H('N2[G]', T, m_N)
+        Hout += thermo.H('SO2[G]', T, cc(m_S, 'S', 'SO2', 'S'))
+        return Hout
+
+    def _get_compound_specific_H(self, T):
+        """
+        Calculate the specific enthalpy of each of the material's compounds.
+
+        :param T: [°C] temperature
+
+        :returns: [kWh/kg] array of compound enthalpies
+        """
+
+        return numpy.array([thermo.H(compound, T, 1.0)
+                            for compound in self.compounds])
+
+    def _get_compound_specific_H_table(self, Tmin, Tmax, T_step):
+        """
+        Create a table of the specific enthalpies of the material's compounds
+        at temperatures that are whole multiples of a temperature step. The
+        table rows are cached, so tables that overlap share calculations.
+
+        :param Tmin: [°C] lowest temperature that the table must cover
+        :param Tmax: [°C] highest temperature that the table must cover
+        :param T_step: [°C] temperature interval of the table
+
+        :returns: [°C] array of the table temperatures.
+        :returns: [kWh/kg] [temperatures x compounds] array of compound
+          enthalpies.
+        """
+
+        start = int(math.floor(Tmin / T_step))
+        end = max(int(math.ceil(Tmax / T_step)), start + 1)
+        T = numpy.arange(start, end + 1) * T_step
+
+        cache = self._specific_H_cache
+        table = numpy.empty((len(T), self.compound_count))
+        for row, i in enumerate(range(start, end + 1)):
+            key = (T_step, i)
+            if key not in cache:
+                cache[key] = self._get_compound_specific_H(T[row])
+            table[row] = cache[key]
+        return T, table
+
+    def _get_assay_H_segment(self, assay, index):
+        """
+        Get a segment of the specific enthalpy table of an assay. A segment
+        is calculated when it is first needed, and the least recently used
+        segments are discarded when the cache is full. A cached segment is
+        only used while the assay's converted mass fractions are the ones it
+        was calculated from, so assays that are edited or replaced are
+        recalculated.
+
+        :param assay: Assay name.
+        :param index: Segment index. A segment covers _H_table_segment_size
+          temperature intervals.
+
+        :returns: [kWh/kg] array of the assay's specific enthalpy at the
+          segment's temperatures, and [kWh/kg] array of the enthalpy change
+          over a temperature interval at the same rate as the heat capacity
+          at each temperature. None if the enthalpy does not increase with
+          temperature.
+        """
+
+        assay_fractions = self.converted_assays[assay]
+        T_step = self.H_table_T_step
+        key = (assay, T_step, index)
+        cache = self._assay_H_tables
+        if key in cache:
+            cached_fractions, segment = cache[key]
+            if numpy.array_equal(cached_fractions, assay_fractions):
+                cache.move_to_end(key)
+                return segment
+            del cache[key]
+
+        fractions = assay_fractions / assay_fractions.sum()
+        compounds = [(c, x) for c, x in zip(self.compounds, fractions)
+                     if x != 0.0]
+        n = _H_table_segment_size
+        T = (index * n + numpy.arange(n + 1)) * T_step
+        h = numpy.array([sum(thermo.H(c, t, x) for c, x in compounds)
+                         for t in T])
+        d = numpy.array([sum(thermo.Cp(c, t, x) for c, x in compounds)
+                         for t in T]) * T_step
+
+        # Limit the slopes so that the interpolation is monotone
+        # (Fritsch-Carlson).
+        delta = numpy.diff(h)
+        if (delta <= 0.0).any():
+            segment = None
+        else:
+            limit = 3.0 * numpy.minimum(numpy.append(delta, delta[-1]),
+                                        numpy.insert(delta, 0, delta[0]))
+            segment = (h, numpy.clip(d, 0.0, limit))
+
+        cache[key] = (assay_fractions.copy(), segment)
+        while len(cache) > self.H_table_cache_size:
+            cache.popitem(last=False)
+        return segment
+
+    def _lookup_assay_H(self, assay, T):
+        """
+        Look up the specific enthalpy of an assay in its enthalpy table.
+
+        :param assay: Assay name.
+        :param T: [°C] temperature
+
+        :returns: [kWh/kg] specific enthalpy, or None if the table cannot be
+          used at the temperature.
+        """
+
+        Tmin, Tmax = self.H_table_T_range
+        if not Tmin <= T <= Tmax:
+            return None
+
+        x = T / self.H_table_T_step
+        k = int(math.floor(x))
+        index, i = divmod(k, _H_table_segment_size)
+        segment = self._get_assay_H_segment(assay, index)
+        if segment is None:
+            return None
+
+        h, d = segment
+        return _hermite(h[i], h[i + 1], d[i], d[i + 1], x - k)
+
+    def _lookup_assay_T(self, assay, h, T):
+        """
+        Look up the temperature at which an assay has the specified specific
+        enthalpy in its enthalpy table.
+
+        :param assay: Assay name.
+        :param h: [kWh/kg] specific enthalpy
+        :param T: [°C] temperature estimate, used to find the first table
+          segment to search
+
+        :returns: [°C] temperature, or None if the table cannot be used to
+          find it.
+        """
+
+        Tmin, Tmax = self.H_table_T_range
+        T_step = self.H_table_T_step
+        n = _H_table_segment_size
+        first = int(math.floor(Tmin / T_step)) // n
+        last = int(math.floor(Tmax / T_step)) // n
+
+        # Search the segments from the estimate towards the enthalpy.
+        index = int(math.floor(min(max(T, Tmin), Tmax) / T_step)) // n
+        while True:
+            if not first <= index <= last:
+                return None
+            segment = self._get_assay_H_segment(assay, index)
+            if segment is None:
+                return None
+            hs, d = segment
+            if h < hs[0]:
+                index -= 1
+            elif h > hs[-1]:
+                index += 1
+            else:
+                break
+
+        # Solve the interval's cubic with Newton's method, keeping the
+        # solution bracketed.
+        i = min(int(numpy.searchsorted(hs, h, side='right')) - 1, n - 1)
+        h0, h1, d0, d1 = hs[i], hs[i + 1], d[i], d[i + 1]
+        lower, upper = 0.0, 1.0
+        t = (h - h0) / (h1 - h0)
+        for iteration in range(50):
+            y = _hermite(h0, h1, d0, d1, t) - h
+            if y > 0.0:
+                upper = t
+            else:
+                lower = t
+            dy = _hermite_derivative(h0, h1, d0, d1, t)
+            t_new = t - y / dy if dy > 0.0 else -1.0
+            if not lower <= t_new <= upper:
+                t_new = (lower + upper) / 2.0
+            if abs(t_new - t) < 1.0e-12:
+                t = t_new
+                break
+            t = t_new
+
+        T = (index * n + i + t) * T_step
+        if not Tmin <= T <= Tmax:
+            return None
+        return T
 
     def _isCoal(self, assay):
         if 'IsCoal' in self.custom_properties and \
@@ -341,9 +600,11 @@ class Material(NamedObject):
         else:
             assay_total = 1.0
 
+        isCoal = self._isCoal(assay)
         return MaterialPackage(self, mass * self.converted_assays[assay] /
-                               assay_total, P, T, self._isCoal(assay),
-                               self._get_HHV(assay))
+                               assay_total, P, T, isCoal,
+                               self._get_HHV(assay),
+                               None if isCoal else assay)
 
     def create_stream(self, assay=None, mfr=0.0, P=1.0, T=25.0,
                       normalise=True):
@@ -373,7 +634,7 @@ class Material(NamedObject):
                               self._get_HHV(assay))
 
 
-class MaterialPackage(Object):
+class MaterialPackage(SlottedObject):
     """
     Represents a quantity of material consisting of multiple chemical
     compounds, having a specific mass, pressure, temperature and enthalpy.
@@ -384,10 +645,17 @@ class MaterialPackage(Object):
     :param T: [°C] package temperature
     :param isCoal: a boolean that indicates whether the material is coal
     :param HHV: [MJ/kg] higher heating value of the coal
+    :param assay: name of the material assay that the compound masses are
+      proportional to, if any. The enthalpy and temperature of the package
+      are then looked up in the assay's enthalpy table until its composition
+      changes.
     """
 
+    __slots__ = ('material', '_P', '_T', 'isCoal', 'HHV', '_compound_masses',
+                 '_DH298', '_H', '_custom_properties', '_deferred', '_assay')
+
     def __init__(self, material, compound_masses, P=1.0, T=25.0, isCoal=False,
-                 HHV=None):
+                 HHV=None, assay=None):
         # Confirm that the parameters are OK.
         if not type(material) is Material:
             raise TypeError("Invalid material type. Must be "
@@ -403,6 +671,9 @@ class MaterialPackage(Object):
         self.isCoal = isCoal
         self.HHV = HHV
         self._compound_masses = compound_masses
+        self._deferred = None
+        self._assay = assay
+        self._DH298 = None
         if self.mass > 0.0:
             if self.isCoal:
                 self._DH298 = self._calculate_DH298_coal()
@@ -410,7 +681,7 @@ class MaterialPackage(Object):
         else:
             self._H = 0.0
 
-        self.custom_properties = dict()
+        self._custom_properties = None
 
     def __str__(self):
         b1 = '='*67 + '\n'
@@ -457,7 +728,7 @@ class MaterialPackage(Object):
                 result += "\n"
 
         # Write the custom properties.
-        if len(self.custom_properties) > 0:
+        if self._custom_properties:
             result += b2
             result += "Custom Properties:\n"
             result += b2
@@ -491,14 +762,28 @@ class MaterialPackage(Object):
         :returns: A new Material package that is the sum of self and 'other'.
         """
 
+        self._reconcile()
+
         # Add another package.
         if type(other) is MaterialPackage:
+            other._reconcile()
             if self.material == other.material:  # Packages of same material.
-                result = MaterialPackage(self.material,
-                                         self._compound_masses +
-                                         other._compound_masses)
-                result.H = self._H + other._H
-                result.P = self.P
+                result = self._copy(self._compound_masses +
+                                    other._compound_masses,
+                                    self._H + other._H)
+                result.isCoal = False
+                result.HHV = None
+                result._DH298 = None
+                if other._assay != self._assay:
+                    result._assay = None
+
+                # The mass weighted temperature is a good first estimate for
+                # the temperature solver.
+                mass = result.mass
+                if mass > 0.0:
+                    result._T = (self.mass * self._T +
+                                 other.mass * other._T) / mass
+                    result._T = result._calculate_T(result._H)
                 return result
             else:  # Packages of different materials.
                 H = self.H + other.H
@@ -528,6 +813,7 @@ class MaterialPackage(Object):
             result = self.clone()
             result._compound_masses[index] = result._compound_masses[index] + \
                 mass
+            result._assay = None
             result._H += enthalpy
             result._P = self._P
             return result
@@ -545,6 +831,7 @@ class MaterialPackage(Object):
             result = self * 1.0
             result._compound_masses[index] = result._compound_masses[index] + \
                 mass
+            result._assay = None
             result.H = self._H + enthalpy
             result._P = self._P
             return result
@@ -571,9 +858,9 @@ class MaterialPackage(Object):
             if scalar < 0.0:
                 raise Exception("Invalid multiplication operation. Cannot "
                                 "multiply package with negative number.")
-            result = MaterialPackage(self.material, self._compound_masses *
-                                     scalar, self._P, self._T)
-            return result
+            self._reconcile()
+            return self._copy(self._compound_masses * scalar,
+                              self._H * scalar)
 
         # If not one of the above, it must be an invalid argument.
         else:
@@ -589,7 +876,12 @@ class MaterialPackage(Object):
         """
 
         if self.isCoal:
-            return self._calculate_Hfr_coal(T)
+            return self._calculate_H_coal(T)
+
+        if self._assay is not None:
+            h = self.material._lookup_assay_H(self._assay, T)
+            if h is not None:
+                return h * self.mass
 
         H = 0.0
         for compound in self.material.compounds:
@@ -600,56 +892,41 @@ class MaterialPackage(Object):
 
     def _calculate_DH298_coal(self):
         """
-        Calculate the enthalpy of formation of the package at the specified temperature, in
-        case the material is coal.
+        Calculate the enthalpy of formation of the dry-ash-free (daf) component
+        of the package, in case the material is coal.
 
-        :returns: [kWh/kg] enthalpy of formation of daf coal
-        """
+        The HHV is the (positive) heat released when the coal burns to CO2,
+        H2O(l), SO2, N2 and O2 at 25 °C, i.e. the enthalpy of the coal minus
+        that of its combustion products. The enthalpy of formation of the coal
+        is therefore the enthalpy of the combustion products plus the HHV.
+        When no HHV is specified, the HHV is estimated as the heat released by
+        burning the unbonded elements, which makes the enthalpy of formation
+        of the coal equal to that of its elements.
 
-        m_C = 0  # kg
-        m_H = 0  # kg
-        m_O = 0  # kg
-        m_N = 0  # kg
-        m_S = 0  # kg
+        :returns: [kWh/kg daf] enthalpy of formation of daf coal
+        """
 
         T = 25  # °C
+        masses = self._compound_masses
+        daf_masses = self.material._coal_masks.dot(masses)  # kg
+        m_total = daf_masses.sum()  # kg
+
         Hin = 0.0  # kWh
-        for compound in self.material.compounds:
-            index = self.material.get_compound_index(compound)
-            if stoich.element_mass_fraction(compound, 'C') == 1.0:
-                m_C += self._compound_masses[index]
-                Hin = thermo.H(compound, T, self._compound_masses[index])
-            elif stoich.element_mass_fraction(compound, 'H') == 1.0:
-                m_H += self._compound_masses[index]
-                Hin = thermo.H(compound, T, self._compound_masses[index])
-            elif stoich.element_mass_fraction(compound, 'O') == 1.0:
-                m_O += self._compound_masses[index]
-                Hin = thermo.H(compound, T, self._compound_masses[index])
-            elif stoich.element_mass_fraction(compound, 'N') == 1.0:
-                m_N += self._compound_masses[index]
-                Hin = thermo.H(compound, T, self._compound_masses[index])
-            elif stoich.element_mass_fraction(compound, 'S') == 1.0:
-                m_S += self._compound_masses[index]
-                Hin = thermo.H(compound, T, self._compound_masses[index])
-
-        m_total = m_C + m_H + m_O + m_N + m_S  # kg
+        for index, compound in self.material._coal_daf_compounds:
+            Hin += thermo.H(compound, T, masses[index])
 
-        Hout = 0.0  # kWh
-        Hout += thermo.H('CO2[G]', T, cc(m_C, 'C', 'CO2', 'C'))
-        Hout += thermo.H('H2O[L]', T, cc(m_H, 'H', 'H2O', 'H'))
-        Hout += thermo.H('O2[G]', T, m_O)
-        Hout += thermo.H('N2[G]', T, m_N)
-        Hout += thermo.H('SO2[G]', T, cc(m_S, 'S', 'SO2', 'S'))
+        Hout = self.material._calculate_coal_Hout(daf_masses, T)  # kWh
 
         if self.HHV is None:
             # If no HHV is specified, calculate it from the proximate assay
-            # using C-H-O-N-S.
-            HHV = Hout - Hin / m_total  # kWh/kg
+            # using C-H-O-N-S, as the heat released by burning the elements.
+            HHV = (Hin - Hout) / m_total  # kWh/kg daf
         else:
-            # If an HHV is specified, convert it from MJ/kg to kWh/kg.
-            HHV = self.HHV / 3.6  # kWh/kg
+            # If an HHV is specified, convert it from MJ/kg coal to kWh/kg daf.
+            HHV = self.HHV / 3.6  # kWh/kg coal
+            HHV *= self.mass / m_total  # kWh/kg daf
 
-        return HHV + Hout / m_total  # kWh/kg
+        return HHV + Hout / m_total  # kWh/kg daf
 
     def _calculate_H_coal(self, T):
         """
@@ -661,43 +938,16 @@ class MaterialPackage(Object):
         :returns: [kWh] enthalpy
         """
 
-        m_C = 0  # kg
-        m_H = 0  # kg
-        m_O = 0  # kg
-        m_N = 0  # kg
-        m_S = 0  # kg
+        masses = self._compound_masses
+        daf_masses = self.material._coal_masks.dot(masses)  # kg
 
-        H = 0.0  # kWh/h
-        for compound in self.material.compounds:
-            index = self.material.get_compound_index(compound)
-            if stoich.element_mass_fraction(compound, 'C') == 1.0:
-                m_C += self._compound_masses[index]
-            elif stoich.element_mass_fraction(compound, 'H') == 1.0:
-                m_H += self._compound_masses[index]
-            elif stoich.element_mass_fraction(compound, 'O') == 1.0:
-                m_O += self._compound_masses[index]
-            elif stoich.element_mass_fraction(compound, 'N') == 1.0:
-                m_N += self._compound_masses[index]
-            elif stoich.element_mass_fraction(compound, 'S') == 1.0:
-                m_S += self._compound_masses[index]
-            else:
-                dH = thermo.H(compound, T, self._compound_masses[index])
-                H += dH
-
-        m_total = y_C + y_H + y_O + y_N + y_S  # kg/h
-        y_C = m_C / m_total
-        y_H = m_H / m_total
-        y_O = m_O / m_total
-        y_N = m_N / m_total
-        y_S = m_S / m_total
-
-        hmodel = coals.DafHTy()
-        H = hmodel.calculate(T=T+273.15, y_C=y_C, y_H=y_H, y_O=y_O, y_N=y_N,
-                             y_S=y_S) / 3.6e6  # kWh/kg
-        H298 = hmodel.calculate(T=298.15, y_C=y_C, y_H=y_H, y_O=y_O, y_N=y_N,
-                                y_S=y_S) / 3.6e6  # kWh/kg
-        Hdaf = H - H298 + self._DH298  # kWh/kg
-        Hdaf *= m_total  # kWh
+        H = 0.0  # kWh
+        for index, compound in self.material._coal_other_compounds:
+            H += thermo.H(compound, T, masses[index])
+
+        Hdaf = self.material._calculate_coal_daf_H(daf_masses, T)  # kWh/kg
+        Hdaf += self._DH298  # kWh/kg
+        Hdaf *= daf_masses.sum()  # kWh
 
         H += Hdaf
 
@@ -713,6 +963,12 @@ class MaterialPackage(Object):
         :returns: Temperature. [°C]
         """
 
+        if self._assay is not None and self.mass > 0.0:
+            T = self.material._lookup_assay_T(self._assay, H / self.mass,
+                                              self._T)
+            if T is not None:
+                return T
+
         # Create the initial guesses for temperature.
         x = list()
         x.append(self._T)
@@ -788,6 +1044,8 @@ class MaterialPackage(Object):
         :returns: Enthalpy. [kWh]
         """
 
+        if self._deferred == 'H':
+            self._reconcile()
         return self._H
 
     @H.setter
@@ -800,7 +1058,10 @@ class MaterialPackage(Object):
         """
 
         self._H = H
-        self._T = self._calculate_T(H)
+        if self._deferred is None:
+            self._T = self._calculate_T(H)
+        else:
+            self._deferred = 'T'
 
     @property
     def T(self):
@@ -810,6 +1071,8 @@ class MaterialPackage(Object):
         :returns: Temperature. [°C]
         """
 
+        if self._deferred == 'T':
+            self._reconcile()
         return self._T
 
     @T.setter
@@ -822,7 +1085,10 @@ class MaterialPackage(Object):
         """
 
         self._T = T
-        self._H = self._calculate_H(T)
+        if self._deferred is None:
+            self._H = self._calculate_H(T)
+        else:
+            self._deferred = 'H'
 
     @property
     def P(self):
@@ -840,18 +1106,119 @@ class MaterialPackage(Object):
 
         self._P = P
 
+    @property
+    def custom_properties(self):
+        """
+        Get the dictionary of custom properties of the package. It is created
+        when it is first used.
+
+        :returns: Dictionary of property names and values.
+        """
+
+        if self._custom_properties is None:
+            self._custom_properties = dict()
+        return self._custom_properties
+
+    @custom_properties.setter
+    def custom_properties(self, value):
+        self._custom_properties = value
+
     # -------------------------------------------------------------------------
     # Public methods.
     # -------------------------------------------------------------------------
+    def batch_update(self):
+        """
+        Create a context in which the package can be changed without
+        recalculating its temperature or enthalpy after every change.
+
+        Inside the context, setting the temperature or the enthalpy only
+        marks the other as out of date, and extractions do not refresh the
+        enthalpy. The out of date value is calculated once when the context
+        exits, or earlier if it is read. The value that was set last is kept.
+
+        :returns: Context manager that yields the package.
+        """
+
+        return _batch_update(self)
+
+    def _reconcile(self):
+        """
+        Calculate the temperature or enthalpy if it is out of date.
+        """
+
+        if self._deferred == 'H':
+            self._H = self._calculate_H(self._T)
+        elif self._deferred == 'T':
+            self._T = self._calculate_T(self._H)
+        else:
+            return
+        self._deferred = ''
+
     def clone(self):
-        """Create a complete copy of the package.
+        """Create a complete copy of the package. Its enthalpy, temperature
+        and coal properties are copied, not recalculated.
 
         :returns: A new MaterialPackage object."""
 
-        result = copy.copy(self)
-        result._compound_masses = copy.deepcopy(self._compound_masses)
+        self._reconcile()
+        result = self._copy(self._compound_masses.copy(), self._H)
+        if self._custom_properties is not None:
+            result._custom_properties = dict(self._custom_properties)
         return result
 
+    @staticmethod
+    def _from_arrays(material, compound_masses, P, T, H, isCoal=False,
+                     HHV=None, DH298=None, assay=None):
+        """
+        Create a package from its state without validating it or
+        calculating its enthalpy. This is the only place, other than the
+        constructor, that initialises the package's slots.
+
+        :param material: The Material to which the package belongs.
+        :param compound_masses: Compound masses. The array is not copied.
+          [kg]
+        :param P: Pressure. [atm]
+        :param T: Temperature. [°C]
+        :param H: Enthalpy. [kWh]
+        :param isCoal: Indicates whether the package is coal.
+        :param HHV: Higher heating value of coal. [MJ/kg]
+        :param DH298: Enthalpy of formation of daf coal. [kWh/kg daf]
+        :param assay: Name of the assay that the package's composition
+          matches, or None.
+
+        :returns: New MaterialPackage object.
+        """
+
+        result = MaterialPackage.__new__(MaterialPackage)
+        result.material = material
+        result._P = P
+        result._T = T
+        result.isCoal = isCoal
+        result.HHV = HHV
+        result._compound_masses = compound_masses
+        result._DH298 = DH298
+        result._H = H
+        result._custom_properties = None
+        result._deferred = None
+        result._assay = assay
+        return result
+
+    def _copy(self, compound_masses, H):
+        """
+        Create a package with the same material, pressure, temperature, assay
+        and coal properties as this package, without calculating its
+        enthalpy.
+
+        :param compound_masses: Compound masses. [kg]
+        :param H: Enthalpy. [kWh]
+
+        :returns: New MaterialPackage object.
+        """
+
+        return MaterialPackage._from_arrays(
+            self.material, compound_masses, self._P, self._T, H, self.isCoal,
+            self.HHV, self._DH298, self._assay)
+
     def clear(self):
         """
         Set all the compound masses in the package to zero.
@@ -859,9 +1226,12 @@ class MaterialPackage(Object):
         """
 
         self._compound_masses = self._compound_masses * 0.0
+        self._assay = None
         self._P = 1.0
         self._T = 25.0
         self._H = 0.0
+        if self._deferred is not None:
+            self._deferred = ''
 
     def get_assay(self):
         """
@@ -937,14 +1307,8 @@ class MaterialPackage(Object):
         :returns: Array of element masses. [kg]
         """
 
-        if elements is None:
-            elements = self.material.elements
-        result = numpy.zeros(len(elements))
-
-        for compound in self.material.compounds:
-            result += self.get_compound_mass(compound) *\
-                numpy.array(stoich.element_mass_fractions(compound, elements))
-        return result
+        return self.material.get_element_masses(self._compound_masses,
+                                                elements)
 
     def get_element_mass_dictionary(self):
         """
@@ -966,11 +1330,7 @@ class MaterialPackage(Object):
         :returns: Masses. [kg]
         """
 
-        result = numpy.zeros(1)
-        for compound in self.material.compounds:
-            result += self.get_compound_mass(compound) *\
-                numpy.array(stoich.element_mass_fractions(compound, [element]))
-        return result[0]
+        return self.get_element_masses([element])[0]
 
     def extract(self, other):
         """
@@ -1023,13 +1383,13 @@ class MaterialPackage(Object):
             raise Exception("Invalid extraction operation. \
                 Cannot extract a mass larger than the package's mass.")
         fraction_to_subtract = mass / self.mass
-        result = MaterialPackage(
-            self.material, self._compound_masses *
-            fraction_to_subtract, self._P, self._T)
+        self._reconcile()
+        result = self._copy(self._compound_masses * fraction_to_subtract,
+                            self._H * fraction_to_subtract)
 
         self._compound_masses = self._compound_masses * \
             (1.0 - fraction_to_subtract)
-        self.T = self.T
+        self._H = self._H * (1.0 - fraction_to_subtract)
 
         return result
 
@@ -1045,6 +1405,7 @@ class MaterialPackage(Object):
         result.P = self.P
 
         self._compound_masses[index] = 0.0
+        self._assay = None
         self.T = self.T
 
         return result
@@ -1058,6 +1419,7 @@ class MaterialPackage(Object):
             raise Exception("Invalid extraction operation. Cannot extract a \
                 compound mass larger than what the package contains.")
         self._compound_masses[index] = self._compound_masses[index] - mass
+        self._assay = None
         self.T = self.T
 
         result = self.material.create_package(P=self._P, T=self._T)
@@ -1076,7 +1438,7 @@ class MaterialPackage(Object):
         return result
 
 
-class MaterialStream(Object):
+class MaterialStream(SlottedObject):
     """
     Represents a flow of material consisting of multiple chemical compounds,
     having a specific mass flow rate, pressure, temperature and enthalpy.
@@ -1089,6 +1451,9 @@ class MaterialStream(Object):
     :param HHV: [MJ/kg] higher heating value of the coal
     """
 
+    __slots__ = ('material', '_P', '_T', '_compound_mfrs', 'isCoal', '_HHV',
+                 '_DH298', '_Hfr', '_custom_properties', '_deferred')
+
     def __init__(self, material, compound_mfrs, P=1.0, T=25.0, isCoal=False,
                  HHV=None):
         # Confirm that the parameters are OK.
@@ -1105,13 +1470,15 @@ class MaterialStream(Object):
         self._T = T
         self._compound_mfrs = compound_mfrs
         self.isCoal = isCoal
+        self._DH298 = None
         self.HHV = HHV
+        self._deferred = None
         if self.mfr > 0.0:
             self._Hfr = self._calculate_Hfr(T)
         else:
             self._Hfr = 0.0
 
-        self.custom_properties = dict()
+        self._custom_properties = None
 
     def __str__(self):
         b1 = '='*67 + '\n'
@@ -1160,7 +1527,7 @@ class MaterialStream(Object):
                 result += "\n"
 
         # Write the custom properties.
-        if len(self.custom_properties) > 0:
+        if self._custom_properties:
             result += b2
             result += "Custom Properties:\n"
             result += b2
@@ -1194,16 +1561,21 @@ class MaterialStream(Object):
         :returns: A new MaterialStream that is the sum of self and 'other'.
         """
 
+        self._reconcile()
+
         # Add another stream.
         if type(other) is MaterialStream:
+            other._reconcile()
             if self.material == other.material:  # Streams of same material.
                 if self.isCoal or other.isCoal:
-                    HHV = 0
-                    if self.HHV:
-                        HHV += self.HHV * self.mfr
-                    if other.HHV:
-                        HHV += other.HHV * other.mfr
-                    HHV /= self.mfr + other.mfr
+                    HHV = None
+                    if self.HHV is not None or other.HHV is not None:
+                        HHV = 0
+                        if self.HHV is not None:
+                            HHV += self.HHV * self.mfr
+                        if other.HHV is not None:
+                            HHV += other.HHV * other.mfr
+                        HHV /= self.mfr + other.mfr
                     isCoal = True
                 else:
                     isCoal = False
@@ -1285,10 +1657,9 @@ class MaterialStream(Object):
             if scalar < 0.0:
                 raise Exception("Invalid multiplication operation. Cannot "
                                 "multiply stream with negative number.")
-            result = MaterialStream(self.material, self._compound_mfrs *
-                                    scalar, self._P, self._T, self.isCoal,
-                                    self.HHV)
-            return result
+            self._reconcile()
+            return self._copy(self._compound_mfrs * scalar,
+                              self._Hfr * scalar)
 
         # If not one of the above, it must be an invalid argument.
         else:
@@ -1316,58 +1687,41 @@ class MaterialStream(Object):
 
     def _calculate_DH298_coal(self):
         """
-        Calculate the enthalpy of formation of the dry-ash-free (daf) component of the coal.
+        Calculate the enthalpy of formation of the dry-ash-free (daf) component
+        of the stream, in case the material is coal.
+
+        The HHV is the (positive) heat released when the coal burns to CO2,
+        H2O(l), SO2, N2 and O2 at 25 °C, i.e. the enthalpy of the coal minus
+        that of its combustion products. The enthalpy of formation of the coal
+        is therefore the enthalpy of the combustion products plus the HHV.
+        When no HHV is specified, the HHV is estimated as the heat released by
+        burning the unbonded elements, which makes the enthalpy of formation
+        of the coal equal to that of its elements.
 
         :returns: [kWh/kg daf] enthalpy of formation of daf coal
         """
 
-        m_C = 0  # kg
-        m_H = 0  # kg
-        m_O = 0  # kg
-        m_N = 0  # kg
-        m_S = 0  # kg
-
         T = 25  # °C
-        Hin = 0.0  # kWh
-        for compound in self.material.compounds:
-            index = self.material.get_compound_index(compound)
-            formula = compound.split('[')[0]
-            if stoich.element_mass_fraction(formula, 'C') == 1.0:
-                m_C += self._compound_mfrs[index]
-                Hin += thermo.H(compound, T, self._compound_mfrs[index])
-            elif stoich.element_mass_fraction(formula, 'H') == 1.0:
-                m_H += self._compound_mfrs[index]
-                Hin += thermo.H(compound, T, self._compound_mfrs[index])
-            elif stoich.element_mass_fraction(formula, 'O') == 1.0:
-                m_O += self._compound_mfrs[index]
-                Hin += thermo.H(compound, T, self._compound_mfrs[index])
-            elif stoich.element_mass_fraction(formula, 'N') == 1.0:
-                m_N += self._compound_mfrs[index]
-                Hin += thermo.H(compound, T, self._compound_mfrs[index])
-            elif stoich.element_mass_fraction(formula, 'S') == 1.0:
-                m_S += self._compound_mfrs[index]
-                Hin += thermo.H(compound, T, self._compound_mfrs[index])
-
-        m_total = m_C + m_H + m_O + m_N + m_S  # kg
+        mfrs = self._compound_mfrs
+        daf_mfrs = self.material._coal_masks.dot(mfrs)  # kg/h
+        m_total = daf_mfrs.sum()  # kg/h
 
-        Hout = 0.0  # kWh
-        Hout += thermo.H('CO2[G]', T, cc(m_C, 'C', 'CO2', 'C'))
-        Hout += thermo.H('H2O[L]', T, cc(m_H, 'H', 'H2O', 'H'))
-        Hout += thermo.H('O2[G]', T, m_O)
-        Hout += thermo.H('N2[G]', T, m_N)
-        Hout += thermo.H('SO2[G]', T, cc(m_S, 'S', 'SO2', 'S'))
-        Hout /= m_total
+        Hin = 0.0  # kWh/h
+        for index, compound in self.material._coal_daf_compounds:
+            Hin += thermo.H(compound, T, mfrs[index])
+
+        Hout = self.material._calculate_coal_Hout(daf_mfrs, T)  # kWh/h
 
         if self.HHV is None:
             # If no HHV is specified, calculate it from the proximate assay
-            # using C-H-O-N-S.
-            HHV = (Hout - Hin) / m_total  # kWh/kg daf
+            # using C-H-O-N-S, as the heat released by burning the elements.
+            HHV = (Hin - Hout) / m_total  # kWh/kg daf
         else:
             # If an HHV is specified, convert it from MJ/kg coal to kWh/kg daf.
             HHV = self.HHV / 3.6  # kWh/kg coal
             HHV *= self.mfr / m_total  # kWh/kg daf
 
-        return HHV + Hout  # kWh/kg daf
+        return HHV + Hout / m_total  # kWh/kg daf
 
     def _calculate_Hfr_coal(self, T):
         """
@@ -1379,44 +1733,16 @@ class MaterialStream(Object):
         :returns: Enthalpy flow rate. [kWh/h]
         """
 
-        m_C = 0  # kg/h
-        m_H = 0  # kg/h
-        m_O = 0  # kg/h
-        m_N = 0  # kg/h
-        m_S = 0  # kg/h
+        mfrs = self._compound_mfrs
+        daf_mfrs = self.material._coal_masks.dot(mfrs)  # kg/h
 
         Hfr = 0.0  # kWh/h
-        for compound in self.material.compounds:
-            index = self.material.get_compound_index(compound)
-            formula = compound.split('[')[0]
-            if stoich.element_mass_fraction(formula, 'C') == 1.0:
-                m_C += self._compound_mfrs[index]
-            elif stoich.element_mass_fraction(formula, 'H') == 1.0:
-                m_H += self._compound_mfrs[index]
-            elif stoich.element_mass_fraction(formula, 'O') == 1.0:
-                m_O += self._compound_mfrs[index]
-            elif stoich.element_mass_fraction(formula, 'N') == 1.0:
-                m_N += self._compound_mfrs[index]
-            elif stoich.element_mass_fraction(formula, 'S') == 1.0:
-                m_S += self._compound_mfrs[index]
-            else:
-                dHfr = thermo.H(compound, T, self._compound_mfrs[index])
-                Hfr += dHfr
-
-        m_total = m_C + m_H + m_O + m_N + m_S  # kg/h
-        y_C = m_C / m_total
-        y_H = m_H / m_total
-        y_O = m_O / m_total
-        y_N = m_N / m_total
-        y_S = m_S / m_total
-
-        hmodel = coals.DafHTy()
-        H = hmodel.calculate(T=T+273.15, y_C=y_C, y_H=y_H, y_O=y_O, y_N=y_N,
-                             y_S=y_S) / 3.6e6  # kWh/kg
-        H298 = hmodel.calculate(T=298.15, y_C=y_C, y_H=y_H, y_O=y_O, y_N=y_N,
-                                y_S=y_S) / 3.6e6  # kWh/kg
-        Hdaf = H - H298 + self._DH298  # kWh/kg
-        Hdaf *= m_total  # kWh/h
+        for index, compound in self.material._coal_other_compounds:
+            Hfr += thermo.H(compound, T, mfrs[index])
+
+        Hdaf = self.material._calculate_coal_daf_H(daf_mfrs, T)  # kWh/kg
+        Hdaf += self._DH298  # kWh/kg
+        Hdaf *= daf_mfrs.sum()  # kWh/h
 
         Hfr += Hdaf
 
@@ -1507,6 +1833,8 @@ class MaterialStream(Object):
         :returns: Enthalpy flow rate. [kWh/h]
         """
 
+        if self._deferred == 'H':
+            self._reconcile()
         return self._Hfr
 
     @Hfr.setter
@@ -1519,7 +1847,10 @@ class MaterialStream(Object):
         """
 
         self._Hfr = Hfr
-        self._T = self._calculate_T(Hfr)
+        if self._deferred is None:
+            self._T = self._calculate_T(Hfr)
+        else:
+            self._deferred = 'T'
 
     @property
     def T(self):
@@ -1529,6 +1860,8 @@ class MaterialStream(Object):
         :returns: Temperature. [°C]
         """
 
+        if self._deferred == 'T':
+            self._reconcile()
         return self._T
 
     @T.setter
@@ -1541,7 +1874,10 @@ class MaterialStream(Object):
         """
 
         self._T = T
-        self._Hfr = self._calculate_Hfr(T)
+        if self._deferred is None:
+            self._Hfr = self._calculate_Hfr(T)
+        else:
+            self._deferred = 'H'
 
     @property
     def HHV(self):
@@ -1582,16 +1918,66 @@ class MaterialStream(Object):
 
         self._P = P
 
+    @property
+    def custom_properties(self):
+        """
+        Get the dictionary of custom properties of the stream. It is created
+        when it is first used.
+
+        :returns: Dictionary of property names and values.
+        """
+
+        if self._custom_properties is None:
+            self._custom_properties = dict()
+        return self._custom_properties
+
+    @custom_properties.setter
+    def custom_properties(self, value):
+        self._custom_properties = value
+
     # -------------------------------------------------------------------------
     # Public methods.
     # -------------------------------------------------------------------------
+    def batch_update(self):
+        """
+        Create a context in which the stream can be changed without
+        recalculating its temperature or enthalpy flow rate after every
+        change.
+
+        Inside the context, setting the temperature or the enthalpy flow rate
+        only marks the other as out of date, and extractions do not refresh
+        the enthalpy flow rate. The out of date value is calculated once when
+        the context exits, or earlier if it is read. The value that was set
+        last is kept.
+
+        :returns: Context manager that yields the stream.
+        """
+
+        return _batch_update(self)
+
+    def _reconcile(self):
+        """
+        Calculate the temperature or enthalpy flow rate if it is out of date.
+        """
+
+        if self._deferred == 'H':
+            self._Hfr = self._calculate_Hfr(self._T)
+        elif self._deferred == 'T':
+            self._T = self._calculate_T(self._Hfr)
+        else:
+            return
+        self._deferred = ''
+
     def clone(self):
-        """Create a complete copy of the stream.
+        """Create a complete copy of the stream. Its enthalpy flow rate,
+        temperature and coal properties are copied, not recalculated.
 
         :returns: A new MaterialStream object."""
 
-        result = copy.copy(self)
-        result._compound_mfrs = copy.deepcopy(self._compound_mfrs)
+        self._reconcile()
+        result = self._copy(self._compound_mfrs.copy(), self._Hfr)
+        if self._custom_properties is not None:
+            result._custom_properties = dict(self._custom_properties)
         return result
 
     def clear(self):
@@ -1603,7 +1989,164 @@ class MaterialStream(Object):
         self._compound_mfrs = self._compound_mfrs * 0.0
         self._P = 1.0
         self._T = 25.0
-        self._H = 0.0
+        self._Hfr = 0.0
+        if self._deferred is not None:
+            self._deferred = ''
+
+    def split(self, fractions):
+        """
+        Split the stream into a number of streams with the same composition,
+        pressure and temperature as this stream, leaving it unchanged.
+
+        :param fractions: The fraction of the stream's mass flow rate that
+          reports to each of the new streams. The fractions must add up to
+          one.
+
+        :returns: List of new MaterialStream objects.
+        """
+
+        fractions = numpy.asarray(fractions, dtype=float)
+        if fractions.ndim != 1 or (fractions < 0.0).any():
+            raise Exception("Invalid split fractions. Must be a list of "
+                            "non-negative values.")
+        if abs(fractions.sum() - 1.0) > 1.0e-9:
+            raise ValueError("Invalid split fractions. Must add up to one.")
+
+        # Enthalpy is proportional to mass flow rate at a fixed composition
+        # and temperature.
+        self._reconcile()
+        compound_mfrs = numpy.outer(fractions, self._compound_mfrs)
+        return [self._copy(compound_mfrs[k], f * self._Hfr)
+                for k, f in enumerate(fractions)]
+
+    def separate(self, split_fractions):
+        """
+        Separate the stream's compounds into a number of streams with the
+        same pressure and temperature as this stream, leaving it unchanged.
+
+        :param split_fractions: Either a [compounds] array of the fractions of
+          the compounds that report to the first of two new streams, the rest
+          reporting to the second, or an [outlets x compounds] matrix of the
+          fractions of the compounds that report to each new stream. The
+          fractions of each compound must add up to one.
+
+        :returns: List of new MaterialStream objects.
+        """
+
+        split = numpy.asarray(split_fractions, dtype=float)
+        if split.ndim == 1:
+            split = numpy.array([split, 1.0 - split])
+        if split.ndim != 2 or split.shape[1] != self.material.compound_count:
+            raise Exception("Invalid split fractions. Must have a value for "
+                            "each of the material's compounds.")
+        if (split < 0.0).any() or not numpy.allclose(split.sum(axis=0), 1.0):
+            raise Exception("Invalid split fractions. Must be non-negative "
+                            "and add up to one for each compound.")
+
+        self._reconcile()
+        compound_mfrs = split * self._compound_mfrs
+        if self.isCoal:
+            return self._separate_coal(compound_mfrs)
+
+        h = self.material._get_compound_specific_H(self._T)  # kWh/kg
+        return [self._copy(mfrs, numpy.dot(mfrs, h))
+                for mfrs in compound_mfrs]
+
+    def _separate_coal(self, compound_mfrs):
+        """
+        Create the streams that result from separating coal.
+
+        :param compound_mfrs: [outlets x compounds] compound mass flow rates
+          of the new streams. [kg/h]
+
+        :returns: List of new MaterialStream objects.
+
+        The coal model attributes the heat of combustion of the stream to its
+        daf coal, so the enthalpy of the daf coal is apportioned to the new
+        streams in proportion to their daf coal mass flow rates, and the new
+        streams keep the enthalpy of formation of this stream's daf coal.
+        This conserves enthalpy whether or not an HHV is specified.
+        """
+
+        masks = self.material._coal_masks
+        daf_mfrs = compound_mfrs.dot(masks.T).sum(axis=1)  # kg/h
+        daf_mfr = masks.dot(self._compound_mfrs).sum()  # kg/h
+
+        # The enthalpy of the other compounds is proportional to their mass
+        # flow rates.
+        h = self.material._get_compound_specific_H(self._T)  # kWh/kg
+        h[masks.sum(axis=0) > 0.0] = 0.0
+        Hdaf = self._Hfr - numpy.dot(self._compound_mfrs, h)  # kWh/h
+
+        Q = None
+        if self.HHV is not None:
+            Q = self.HHV * self.mfr * daf_mfrs / daf_mfr  # MJ/h
+
+        result = []
+        for k, mfrs in enumerate(compound_mfrs):
+            outlet = self._copy(mfrs, numpy.dot(mfrs, h))
+            mfr = mfrs.sum()
+            if mfr == 0.0:
+                pass
+            elif daf_mfrs[k] == 0.0:
+                # No daf coal reports to this stream.
+                outlet.isCoal = False
+                outlet._HHV = None
+            else:
+                outlet._HHV = None if Q is None else Q[k] / mfr
+                outlet._Hfr += Hdaf * daf_mfrs[k] / daf_mfr
+            result.append(outlet)
+        return result
+
+    @staticmethod
+    def _from_arrays(material, compound_mfrs, P, T, Hfr, isCoal=False,
+                     HHV=None, DH298=None):
+        """
+        Create a stream from its state without validating it or calculating
+        its enthalpy flow rate. This is the only place, other than the
+        constructor, that initialises the stream's slots.
+
+        :param material: The Material to which the stream belongs.
+        :param compound_mfrs: Compound mass flow rates. The array is not
+          copied. [kg/h]
+        :param P: Pressure. [atm]
+        :param T: Temperature. [°C]
+        :param Hfr: Enthalpy flow rate. [kWh/h]
+        :param isCoal: Indicates whether the stream is coal.
+        :param HHV: Higher heating value of coal. [MJ/kg]
+        :param DH298: Enthalpy of formation of daf coal. [kWh/kg daf]
+
+        :returns: New MaterialStream object.
+        """
+
+        result = MaterialStream.__new__(MaterialStream)
+        result.material = material
+        result._P = P
+        result._T = T
+        result._compound_mfrs = compound_mfrs
+        result.isCoal = isCoal
+        result._HHV = HHV
+        result._DH298 = DH298
+        result._Hfr = Hfr
+        result._custom_properties = None
+        result._deferred = None
+        return result
+
+    def _copy(self, compound_mfrs, Hfr):
+        """
+        Create a stream with the same material, pressure, temperature and
+        coal properties as this stream, without calculating its enthalpy flow
+        rate.
+
+        :param compound_mfrs: Compound mass flow rates. [kg/h]
+        :param Hfr: Enthalpy flow rate. [kWh/h]
+
+        :returns: New MaterialStream object.
+        """
+
+        return MaterialStream._from_arrays(
+            self.material, compound_mfrs, self._P, self._T, Hfr, self.isCoal,
+            self._HHV, self._DH298)
 
     def get_assay(self):
         """
@@ -1682,13 +2225,7 @@ class MaterialStream(Object):
         :returns: Array of element mass flow rates. [kg/h]
         """
 
-        if elements is None:
-            elements = self.material.elements
-        result = numpy.zeros(len(elements))
-        for compound in self.material.compounds:
-            result += self.get_compound_mfr(compound) *\
-                stoich.element_mass_fractions(compound, elements)
-        return result
+        return self.material.get_element_masses(self._compound_mfrs, elements)
 
     def get_element_mfr_dictionary(self):
         """
@@ -1712,12 +2249,7 @@ class MaterialStream(Object):
         :returns: Mass flow rates. [kg/h]
         """
 
-        result = 0.0
-        for compound in self.material.compounds:
-            formula = compound.split('[')[0]
-            result += self.get_compound_mfr(compound) *\
-                stoich.element_mass_fraction(formula, element)
-        return result
+        return self.get_element_mfrs([element])[0]
 
     def extract(self, other):
         """
@@ -1771,13 +2303,13 @@ class MaterialStream(Object):
                             "mass flow rate larger than the streams's mass "
                             "flow rate.")
         fraction_to_subtract = mfr / self.mfr
-        result = MaterialStream(
-            self.material, self._compound_mfrs *
-            fraction_to_subtract, self._P, self._T)
+        self._reconcile()
+        result = self._copy(self._compound_mfrs * fraction_to_subtract,
+                            self._Hfr * fraction_to_subtract)
 
         self._compound_mfrs = self._compound_mfrs * \
             (1.0 - fraction_to_subtract)
-        self.T = self.T
+        self._Hfr = self._Hfr * (1.0 - fraction_to_subtract)
 
         return result
 
@@ -1845,6 +2377,570 @@ class MaterialStream(Object):
         return result
 
 
+class MaterialStreamSeries(SlottedObject):
+    """
+    Represents a time series of the flow of a material, e.g. plant historian
+    data, with a row of compound mass flow rates and a temperature for each
+    timestep.
+
+    :param material: A reference to the Material to which the series belongs.
+    :param compound_mfrs: [timesteps x compounds] array of compound mass flow
+      rates. [kg/h]
+    :param T: Temperature, either one value or an array with a value for each
+      timestep. [°C]
+    :param P: Pressure. [atm]
+    :param dt: Duration of a timestep. [h]
+    :param T_step: Interval of the compound enthalpy tables used to calculate
+      enthalpy flow rates. [°C]
+
+    Enthalpy is calculated for all the timesteps at once by interpolating
+    linearly in compound enthalpy tables at whole multiples of T_step. The
+    tables are cached by the material. Coal is not supported, since its
+    enthalpy is not linear in the compound mass flow rates.
+    """
+
+    __slots__ = ('material', '_compound_mfrs', '_T', '_Hfr', '_P', 'dt',
+                 'T_step')
+
+    def __init__(self, material, compound_mfrs, T=25.0, P=1.0, dt=1.0,
+                 T_step=1.0):
+        # Confirm that the parameters are OK.
+        if not type(material) is Material:
+            raise TypeError("Invalid material type. Must be "
+                            "thermomaterial.Material")
+        compound_mfrs = numpy.array(compound_mfrs, dtype=float, ndmin=2)
+        if compound_mfrs.ndim != 2 or \
+           compound_mfrs.shape[1] != material.compound_count:
+            raise Exception("Invalid compound_mfrs. Must be a [timesteps x "
+                            "compounds] array.")
+
+        # Initialise the object's properties.
+        self.material = material
+        self._compound_mfrs = compound_mfrs
+        self._P = P
+        self.dt = dt
+        """Duration of a timestep. [h]"""
+        self.T_step = T_step
+        """Interval of the compound enthalpy tables. [°C]"""
+        self._T = numpy.zeros(len(compound_mfrs)) + T
+        self._Hfr = self._calculate_Hfr(self._T)
+
+    def __len__(self):
+        return len(self._compound_mfrs)
+
+    def __str__(self):
+        b1 = '=' * 67 + '\n'
+        b2 = '-' * 67 + '\n'
+        result = b1
+        result += 'MaterialStreamSeries\n'
+        result += b1
+        result += 'Material'.ljust(20) + self.material.name + '\n'
+        result += 'Timesteps'.ljust(20) + str(len(self)) + '\n'
+        result += 'Timestep'.ljust(20) + '{:.8e}'.format(self.dt) + ' h\n'
+        result += 'Pressure'.ljust(20) + '{:.8e}'.format(self._P) + ' atm\n'
+        result += b2
+        result += 'Timestep'.ljust(10) + 'Mfr [kg/h]'.rjust(19) + \
+            'T [°C]'.rjust(19) + 'Hfr [kWh/h]'.rjust(19) + '\n'
+        result += b2
+        for i, (mfr, T, Hfr) in enumerate(zip(self.mfr, self._T, self._Hfr)):
+            result += str(i).ljust(10) + '{:.8e}'.format(mfr).rjust(19) + \
+                '{:.8e}'.format(T).rjust(19) + \
+                '{:.8e}'.format(Hfr).rjust(19) + '\n'
+        result += b1
+        return result
+
+    def __getitem__(self, index):
+        """
+        Get a timestep as a stream or a range of timesteps as a series.
+
+        :param index: Timestep index or slice.
+
+        :returns: MaterialStream or MaterialStreamSeries object.
+        """
+
+        if isinstance(index, slice):
+            return self._create(self._compound_mfrs[index].copy(),
+                                self._T[index].copy(), self._Hfr[index].copy())
+        return MaterialStream(self.material,
+                              self._compound_mfrs[index].copy(), self._P,
+                              float(self._T[index]))
+
+    def __add__(self, other):
+        """
+        Addition operator (+).
+
+        Add this series (self) and 'other' together, return the result as a
+        new series, and leave self unchanged.
+
+        :param other: A MaterialStreamSeries of the same material and length,
+          or a MaterialStream that is added to each timestep.
+
+        :returns: A new MaterialStreamSeries.
+        """
+
+        if type(other) is MaterialStream:
+            if other.isCoal:
+                raise Exception("Coal streams cannot be added to a series.")
+            compound_mfrs = other._compound_mfrs
+            T = other.T
+            mfr = other.mfr
+            Hfr = other.Hfr
+        elif type(other) is MaterialStreamSeries:
+            if len(other) != len(self):
+                raise Exception("Series of different lengths cannot be "
+                                "added.")
+            compound_mfrs = other._compound_mfrs
+            T = other._T
+            mfr = other.mfr
+            Hfr = other._Hfr
+        else:
+            raise TypeError("Invalid addition argument.")
+
+        if other.material is not self.material:
+            raise Exception("Series of '" + other.material.name + "' cannot "
+                            "be added to series of '" + self.material.name +
+                            "'.")
+
+        # The mass weighted temperature is the first estimate for the
+        # temperature solver.
+        total = self.mfr + mfr
+        with numpy.errstate(invalid='ignore', divide='ignore'):
+            T = numpy.where(total > 0.0,
+                            (self.mfr * self._T + mfr * T) / total, self._T)
+        result = self._create(self._compound_mfrs + compound_mfrs, T,
+                              self._Hfr + Hfr)
+        result._T = result._calculate_T(result._Hfr)
+        return result
+
+    def __mul__(self, scalar):
+        """
+        The multiplication operator (*).
+
+        Create a new series by multiplying self with scalar.
+
+        :param scalar: A non-negative value, or an array with a value for
+          each timestep.
+
+        :returns: New MaterialStreamSeries object.
+        """
+
+        scalar = numpy.asarray(scalar, dtype=float)
+        if (scalar < 0.0).any():
+            raise Exception("Invalid multiplication operation. Cannot "
+                            "multiply series with negative number.")
+        column = scalar[..., numpy.newaxis] if scalar.ndim > 0 else scalar
+        return self._create(self._compound_mfrs * column, self._T.copy(),
+                            self._Hfr * scalar)
+
+    def _create(self, compound_mfrs, T, Hfr):
+        """
+        Create a series of the same material and settings as this series,
+        without calculating its enthalpy.
+        """
+
+        result = MaterialStreamSeries.__new__(MaterialStreamSeries)
+        result.material = self.material
+        result._compound_mfrs = compound_mfrs
+        result._T = T
+        result._Hfr = Hfr
+        result._P = self._P
+        result.dt = self.dt
+        result.T_step = self.T_step
+        return result
+
+    def _calculate_Hfr(self, T):
+        """
+        Calculate the enthalpy flow rates of the series at the specified
+        temperatures.
+
+        :param T: Array of temperatures. [°C]
+
+        :returns: Array of enthalpy flow rates. [kWh/h]
+        """
+
+        if len(T) == 0:
+            return numpy.zeros(0)
+
+        grid, table = self.material._get_compound_specific_H_table(
+            T.min(), T.max(), self.T_step)
+        k = numpy.clip(numpy.searchsorted(grid, T), 1, len(grid) - 1)
+        w = ((T - grid[k - 1]) / (grid[k] - grid[k - 1]))[:, numpy.newaxis]
+        h = table[k - 1] * (1.0 - w) + table[k] * w
+        return (self._compound_mfrs * h).sum(axis=1)
+
+    def _calculate_T(self, Hfr):
+        """
+        Calculate the temperatures of the series given the specified enthalpy
+        flow rates.
+
+        :param Hfr: Array of enthalpy flow rates. [kWh/h]
+
+        :returns: Array of temperatures. [°C]
+        """
+
+        result = self._T.copy()
+        rows = numpy.flatnonzero(self.mfr > 0.0)
+        if len(rows) == 0:
+            return result
+
+        # Widen the temperature range until it contains all the solutions.
+        # The table does not extend below absolute zero.
+        mfrs = self._compound_mfrs[rows]
+        Hfr = Hfr[rows]
+        T_zero = math.ceil(-273.15 / self.T_step) * self.T_step
+        Tmin = max(result[rows].min() - 100.0, T_zero)
+        Tmax = result[rows].max() + 100.0
+        for i in range(10):
+            grid, table = self.material._get_compound_specific_H_table(
+                Tmin, Tmax, self.T_step)
+            H = mfrs.dot(table.T)  # [rows x temperatures]
+            below = (Hfr < H[:, 0]).any() and Tmin > T_zero
+            above = (Hfr > H[:, -1]).any()
+            if not below and not above:
+                break
+            if below:
+                Tmin = max(Tmin - 500.0, T_zero)
+            if above:
+                Tmax += 500.0
+
+        # Interpolate in the bracketing interval of each row.
+        k = numpy.clip((H < Hfr[:, numpy.newaxis]).sum(axis=1), 1,
+                       len(grid) - 1)
+        i = numpy.arange(len(rows))
+        H0 = H[i, k - 1]
+        H1 = H[i, k]
+        with numpy.errstate(invalid='ignore', divide='ignore'):
+            w = numpy.where(H1 != H0, (Hfr - H0) / (H1 - H0), 0.0)
+        result[rows] = grid[k - 1] + w * (grid[k] - grid[k - 1])
+
+        # The bracket is only valid if the enthalpy rises monotonically over
+        # the table and the table contains the enthalpy. The other rows are
+        # solved exactly.
+        valid = (numpy.diff(H, axis=1) > 0.0).all(axis=1) & \
+            (H[:, 0] <= Hfr) & (Hfr <= H[:, -1])
+        for j in numpy.flatnonzero(~valid):
+            stream = MaterialStream(self.material, mfrs[j], self._P,
+                                    float(self._T[rows[j]]))
+            result[rows[j]] = stream._calculate_T(Hfr[j])
+        return result
+
+    def _get_window_totals(self, values, window):
+        """
+        Integrate values over time.
+
+        :param values: Array with a value or row of values per timestep.
+        :param window: Number of timesteps per window. The whole series is
+          one window if this is None.
+
+        :returns: Array of integrals, with a value or row per window.
+        """
+
+        if window is None:
+            return values.sum(axis=0) * self.dt
+        starts = numpy.arange(0, len(values), window)
+        return numpy.add.reduceat(values, starts, axis=0) * self.dt
+
+    @property
+    def T(self):
+        """
+        Get the temperatures of the series.
+
+        :returns: Array of temperatures. [°C]
+        """
+
+        return self._T
+
+    @T.setter
+    def T(self, T):
+        """
+        Set the temperatures of the series, and recalculate its enthalpy flow
+        rates.
+
+        :param T: One temperature or an array of temperatures. [°C]
+        """
+
+        self._T = numpy.zeros(len(self)) + T
+        self._Hfr = self._calculate_Hfr(self._T)
+
+    @property
+    def Hfr(self):
+        """
+        Get the enthalpy flow rates of the series.
+
+        :returns: Array of enthalpy flow rates. [kWh/h]
+        """
+
+        return self._Hfr
+
+    @Hfr.setter
+    def Hfr(self, Hfr):
+        """
+        Set the enthalpy flow rates of the series, and recalculate its
+        temperatures.
+
+        :param Hfr: Array of enthalpy flow rates. [kWh/h]
+        """
+
+        self._Hfr = numpy.zeros(len(self)) + Hfr
+        self._T = self._calculate_T(self._Hfr)
+
+    @property
+    def P(self):
+        """Determine the pressure of the series.
+
+        :returns: Pressure. [atm]"""
+
+        return self._P
+
+    @P.setter
+    def P(self, P):
+        """Set the pressure of the series.
+
+        :param P: Pressure. [atm]"""
+
+        self._P = P
+
+    @property
+    def mfr(self):
+        """
+        Get the mass flow rates of the series.
+
+        :returns: Array of mass flow rates. [kg/h]
+        """
+
+        return self._compound_mfrs.sum(axis=1)
+
+    def get_compound_mfrs(self, compound=None):
+        """
+        Get compound mass flow rates.
+
+        :param compound: Formula and phase of a compound, e.g. "Fe2O3[S1]".
+          The mass flow rates of all the compounds are returned if this is
+          None.
+
+        :returns: Array of the compound's mass flow rates, or [timesteps x
+          compounds] array. [kg/h]
+        """
+
+        if compound is None:
+            return self._compound_mfrs
+        return self._compound_mfrs[:, self.material.get_compound_index(
+            compound)]
+
+    def get_element_mfrs(self, elements=None):
+        """
+        Determine the element mass flow rates of the series.
+
+        :param elements: List of elements. The material's elements are used
+          if this is None.
+
+        :returns: [timesteps x elements] array of element mass flow rates.
+          [kg/h]
+        """
+
+        return self.material.get_element_masses(self._compound_mfrs, elements)
+
+    def get_compound_masses(self, window=None):
+        """
+        Determine the compound masses that flowed over time.
+
+        :param window: Number of timesteps per window, e.g. 60 for hourly
+          totals of minute data. The whole series is used if this is None.
+
+        :returns: Array of compound masses, or a [windows x compounds] array.
+          [kg]
+        """
+
+        return self._get_window_totals(self._compound_mfrs, window)
+
+    def get_mass(self, window=None):
+        """
+        Determine the mass that flowed over time.
+
+        :param window: Number of timesteps per window. The whole series is
+          used if this is None.
+
+        :returns: Mass, or array of masses per window. [kg]
+        """
+
+        return self._get_window_totals(self.mfr, window)
+
+    def get_enthalpy(self, window=None):
+        """
+        Determine the enthalpy that flowed over time.
+
+        :param window: Number of timesteps per window. The whole series is
+          used if this is None.
+
+        :returns: Enthalpy, or array of enthalpies per window. [kWh]
+        """
+
+        return self._get_window_totals(self._Hfr, window)
+
+    def resample(self, window):
+        """
+        Create a series with the average flows over windows of timesteps.
+
+        :param window: Number of timesteps per window.
+
+        :returns: New MaterialStreamSeries object.
+        """
+
+        starts = numpy.arange(0, len(self), window)
+        counts = numpy.diff(numpy.append(starts, len(self)))
+        mfrs = numpy.add.reduceat(self._compound_mfrs, starts, axis=0)
+        mfrs /= counts[:, numpy.newaxis]
+        Hfr = numpy.add.reduceat(self._Hfr, starts) / counts
+        T = numpy.add.reduceat(self._T, starts) / counts
+
+        result = self._create(mfrs, T, Hfr)
+        result.dt = self.dt * window
+        result._T = result._calculate_T(Hfr)
+        return result
+
+
+@contextmanager
+def _batch_update(obj):
+    """
+    Defer the recalculation of a package or stream's temperature and
+    enthalpy until the context exits. Nested contexts reconcile when the
+    outermost one exits.
+
+    :param obj: MaterialPackage or MaterialStream object.
+    """
+
+    if obj._deferred is not None:
+        yield obj
+        return
+
+    obj._deferred = ''
+    try:
+        yield obj
+    finally:
+        obj._reconcile()
+        obj._deferred = None
+
+
+def _hermite(y0, y1, d0, d1, t):
+    """
+    Evaluate a cubic Hermite polynomial on the unit interval.
+
+    :param y0: Value at the start of the interval.
+    :param y1: Value at the end of the interval.
+    :param d0: Slope at the start of the interval, scaled to the interval.
+    :param d1: Slope at the end of the interval, scaled to the interval.
+    :param t: Position in the interval, from 0 to 1.
+
+    :returns: Interpolated value.
+    """
+
+    t2 = t * t
+    t3 = t2 * t
+    return (2.0 * t3 - 3.0 * t2 + 1.0) * y0 + (t3 - 2.0 * t2 + t) * d0 + \
+        (3.0 * t2 - 2.0 * t3) * y1 + (t3 - t2) * d1
+
+
+def _hermite_derivative(y0, y1, d0, d1, t):
+    """
+    Evaluate the derivative of a cubic Hermite polynomial on the unit
+    interval with respect to the position in the interval.
+
+    :param y0: Value at the start of the interval.
+    :param y1: Value at the end of the interval.
+    :param d0: Slope at the start of the interval, scaled to the interval.
+    :param d1: Slope at the end of the interval, scaled to the interval.
+    :param t: Position in the interval, from 0 to 1.
+
+    :returns: Derivative.
+    """
+
+    t2 = t * t
+    return (6.0 * t2 - 6.0 * t) * (y0 - y1) + \
+        (3.0 * t2 - 4.0 * t + 1.0) * d0 + (3.0 * t2 - 2.0 * t) * d1
+
+
+def mix(streams):
+    """
+    Mix a number of streams into a single stream. The compound mass flow
+    rates and enthalpy flow rates are summed in one pass and the temperature
+    of the result is solved once, instead of once per pairwise addition.
+
+    :param streams: A list of MaterialStream objects.
+
+    :returns: A new MaterialStream object. Its pressure is that of the first
+      stream.
+    """
+
+    streams = list(streams)
+    if len(streams) == 0:
+        raise Exception("At least one stream is required for mixing.")
+    for stream in streams:
+        if not type(stream) is MaterialStream:
+            raise TypeError("Invalid stream type. Must be "
+                            "thermo.MaterialStream")
+        stream._reconcile()
+
+    first = streams[0]
+    material = first.material
+    if any(s.material is not material for s in streams[1:]):
+        # Streams of different materials are added compound by compound.
+        result = first.clone()
+        for stream in streams[1:]:
+            result = result + stream
+        return result
+
+    mfrs = numpy.array([s._compound_mfrs for s in streams])
+    stream_mfrs = mfrs.sum(axis=1)
+    total_mfr = stream_mfrs.sum()
+    compound_mfrs = mfrs.sum(axis=0)
+
+    # The HHV stays None when no stream has one, so that the DH298 of the
+    # result is calculated from its proximate assay.
+    isCoal = any(s.isCoal for s in streams)
+    HHV = None
+    if isCoal and total_mfr > 0.0 and \
+            any(s.HHV is not None for s in streams):
+        HHV = sum(s.HHV * m for s, m in zip(streams, stream_mfrs)
+                  if s.HHV is not None) / total_mfr
+
+    if total_mfr == 0.0:
+        return MaterialStream(material, compound_mfrs, first._P, first._T,
+                              isCoal, HHV)
+
+    # The mass weighted inlet temperature is a good first estimate for the
+    # temperature solver.
+    T = numpy.dot(stream_mfrs, [s._T for s in streams]) / total_mfr
+    result = MaterialStream(material, compound_mfrs, first._P, T, isCoal, HHV)
+    result.Hfr = sum(s._Hfr for s in streams)
+    return result
+
+
+def instrument():
+    """
+    Count the calls to and time spent in the package and stream operations,
+    and in the thermochemistry and stoichiometry functions that they use,
+    while the context is active.
+
+    The nested call counts of an operation show what it costs, e.g. the
+    thermochemistry.H calls per MaterialPackage.extract call, or the
+    MaterialPackage._calculate_H calls (solver iterations) per
+    MaterialPackage._calculate_T call. There is no overhead when the context
+    is not active.
+
+    :returns: Context manager that yields an instrumentation.Report.
+    """
+
+    targets = []
+    for cls, H in [(MaterialPackage, 'H'), (MaterialStream, 'Hfr')]:
+        targets += [(cls, '__init__'), (cls, '__add__'), (cls, '__mul__'),
+                    (cls, 'clone'), (cls, 'extract'), (cls, 'T'), (cls, H),
+                    (cls, '_calculate_' + H), (cls, '_calculate_T')]
+    targets += [(MaterialStream, 'split'), (MaterialStream, 'separate'),
+                (thermo, 'H'), (thermo.Compound, 'H'), (thermo.CpRecord, 'H'),
+                (stoich, 'parse_compound')]
+    return instrumentation.instrument(targets)
+
+
 def _get_default_data_path():
     module_path = os.path.dirname(sys.modules[__name__].__file__)
     data_path = os.path.join(module_path, r"../data")
@@ -7,6 +7,7 @@ This module provides testing code for classes in the thermo module.
 #       Material does not have an 'assays' property,
 #       only a raw_assays and converted_assays property.
 
+import pickle
 import unittest
 
 import numpy as np
@@ -14,6 +15,9 @@ import numpy as np
 from auxi.core.helpers import get_path_relative_to_module as get_path
 from auxi.tools.chemistry import thermochemistry as thermo
 from auxi.modelling.process.materials.thermo import Material, MaterialPackage
+from auxi.modelling.process.materials.thermo import MaterialStream
+from auxi.modelling.process.materials.thermo import MaterialStreamSeries
+from auxi.modelling.process.materials.thermo import mix, instrument
 
 __version__ = '0.3.6'
 __license__ = 'LGPL v3'
@@ -62,6 +66,51 @@ class ThermoMaterialUnitTester(unittest.TestCase):
         self.assertEqual(
             np.all(self.m.converted_assays["new_assay"] == new_assay), True)
 
+    def test_assay_H_tables(self):
+        assay = self.m.converted_assays["IlmeniteA"]
+        for T in [0.0, 12.5, 512.3, 2499.9]:
+            expected = sum(thermo.H(c, T, x) for c, x in
+                           zip(self.m.compounds, assay))
+            self.assertAlmostEqual(self.m._lookup_assay_H("IlmeniteA", T),
+                                   expected, places=9)
+            self.assertAlmostEqual(
+                self.m._lookup_assay_T("IlmeniteA", expected, 1000.0), T,
+                places=6)
+        self.assertIsNone(self.m._lookup_assay_H("IlmeniteA", -10.0))
+        self.assertIsNone(self.m._lookup_assay_T("IlmeniteA", -100.0, 25.0))
+
+        # The least recently used segments are discarded.
+        self.m.H_table_cache_size = 2
+        for index in [0, 1, 0, 2]:
+            self.m._get_assay_H_segment("IlmeniteB", index)
+        self.assertEqual([k[2] for k in self.m._assay_H_tables], [0, 2])
+
+    def test_add_assay_invalidates_H_tables(self):
+        new_assay = self.m.create_empty_assay()
+        new_assay[0] = 1.0
+        self.m.add_assay("new_assay", new_assay)
+        h = self.m._lookup_assay_H("new_assay", 500.0)
+
+        del self.m.raw_assays["new_assay"]
+        del self.m.converted_assays["new_assay"]
+        new_assay = self.m.create_empty_assay()
+        new_assay[7] = 1.0
+        self.m.add_assay("new_assay", new_assay)
+        self.assertAlmostEqual(self.m._lookup_assay_H("new_assay", 500.0),
+                               thermo.H("TiO2[Srutile]", 500.0))
+        self.assertNotAlmostEqual(self.m._lookup_assay_H("new_assay", 500.0),
+                                  h)
+
+    def test_edit_assay_invalidates_H_tables(self):
+        self.m._lookup_assay_H("IlmeniteA", 500.0)
+        assay = self.m.converted_assays["IlmeniteA"]
+        assay[:] = 0.0
+        assay[7] = 1.0
+        self.assertAlmostEqual(self.m._lookup_assay_H("IlmeniteA", 500.0),
+                               thermo.H("TiO2[Srutile]", 500.0))
+        pkg = self.m.create_package("IlmeniteA", 2.0, T=500.0)
+        self.assertAlmostEqual(pkg.H, thermo.H("TiO2[Srutile]", 500.0, 2.0))
+
     def test_get_assay_total(self):
         self.assertAlmostEqual(self.m.get_assay_total("IlmeniteA"), 1.0)
         self.assertAlmostEqual(self.m.get_assay_total("IlmeniteB"), 1.0)
@@ -92,6 +141,72 @@ class ThermoMaterialUnitTester(unittest.TestCase):
         self.assertAlmostEqual(pkg.T, 205.0)
         self.assertAlmostEqual(pkg.Hfr, -277.82600298002848)
 
+    def test_classify_coal_compounds(self):
+        coal = Material("coal", get_path(
+            __file__, 'data/thermomaterial.test.coal.txt'))
+        daf = [c for i, c in coal._coal_daf_compounds]
+        other = [c for i, c in coal._coal_other_compounds]
+        self.assertEqual(daf, ['C[Sgr]', 'H2[G]', 'O2[G]', 'N2[G]',
+                               'S[Smono]'])
+        self.assertEqual(other, ['Al2O3[S]', 'CaO[S]', 'SiO2[S]'])
+        self.assertEqual(coal._coal_masks.sum(), 5.0)
+        self.assertEqual(self.m._coal_masks.sum(), 0.0)
+
+    def test_create_coal_package_and_stream(self):
+        coal = Material("coal", get_path(
+            __file__, 'data/thermomaterial.test.coal.txt'))
+        pkg = coal.create_package("CoalA", 1000.0, 1.0, 25.0)
+        stream = coal.create_stream("CoalA", 1000.0, 1.0, 25.0)
+        self.assertAlmostEqual(stream.Hfr, -987.9641900025367)
+        self.assertAlmostEqual(pkg.H, stream.Hfr)
+
+        stream.T = 500.0
+        self.assertAlmostEqual(stream.Hfr, -757.459324646914)
+        stream.Hfr = -987.9641900025367
+        self.assertAlmostEqual(stream.T, 25.0)
+
+    def test_create_coal_package_and_stream_without_HHV(self):
+        coal = Material("coal", get_path(
+            __file__, 'data/thermomaterial.test.coal.txt'))
+        assay = coal.converted_assays["CoalA"] / coal.get_assay_total("CoalA")
+        pkg_small = MaterialPackage(coal, 1.0 * assay, 1.0, 25.0, True)
+        pkg_large = MaterialPackage(coal, 1000.0 * assay, 1.0, 25.0, True)
+        stream_small = MaterialStream(coal, 1.0 * assay, 1.0, 25.0, True)
+        stream_large = MaterialStream(coal, 1000.0 * assay, 1.0, 25.0, True)
+
+        # The specific enthalpy does not depend on the quantity of coal.
+        self.assertAlmostEqual(pkg_small._DH298, pkg_large._DH298)
+        self.assertAlmostEqual(pkg_small.H, pkg_large.H / 1000.0)
+        self.assertAlmostEqual(stream_small._DH298, stream_large._DH298)
+        self.assertAlmostEqual(stream_small.Hfr, stream_large.Hfr / 1000.0)
+        self.assertAlmostEqual(pkg_large.H, stream_large.Hfr)
+
+    def test_coal_DH298(self):
+        coal = Material("coal", get_path(
+            __file__, 'data/thermomaterial.test.coal.txt'))
+        pkg = coal.create_package("CoalA", 1000.0, 1.0, 25.0)
+        stream = coal.create_stream("CoalA", 1000.0, 1.0, 25.0)
+
+        # Calculate the value independently from the standard enthalpies of
+        # formation of the combustion products of 1 kg CoalA.
+        m_daf = 0.72 + 0.045 + 0.08 + 0.015 + 0.006  # kg
+        Hout = 720.0 / 12.011 * -393.51  # kJ, CO2[G]
+        Hout += 45.0 / (2 * 1.008) * -285.83  # kJ, H2O[L]
+        Hout += 6.0 / 32.06 * -296.81  # kJ, SO2[G]
+        HHV = 28.5 * 1000.0  # kJ
+        DH298 = (HHV + Hout) / 3600.0 / m_daf  # kWh/kg daf
+        self.assertAlmostEqual(pkg._DH298, DH298, places=3)
+        self.assertAlmostEqual(stream._DH298, DH298, places=3)
+        self.assertAlmostEqual(pkg._DH298, -0.489, places=3)
+
+        # Without an HHV, daf coal has the enthalpy of its elements, which is
+        # zero at 25 °C.
+        assay = coal.converted_assays["CoalA"] / coal.get_assay_total("CoalA")
+        pkg = MaterialPackage(coal, 1000.0 * assay, 1.0, 25.0, True)
+        stream = MaterialStream(coal, 1000.0 * assay, 1.0, 25.0, True)
+        self.assertAlmostEqual(pkg._DH298, 0.0, places=4)
+        self.assertAlmostEqual(stream._DH298, 0.0, places=4)
+
 
 class ThermoMaterialPackageUnitTester(unittest.TestCase):
     """
@@ -320,6 +435,30 @@ class ThermoMaterialPackageUnitTester(unittest.TestCase):
         self.assertEqual(clone.T, self.ilm_pkg_a.T)
         self.assertEqual(clone.H, self.ilm_pkg_a.H)
 
+        clone._compound_masses[0] += 1.0
+        self.assertNotEqual(clone._compound_masses[0],
+                            self.ilm_pkg_a._compound_masses[0])
+
+    def test_clone_coal(self):
+        coal = Material("coal", get_path(
+            __file__, 'data/thermomaterial.test.coal.txt'))
+        package = coal.create_package("CoalA", 100.0, T=300.0)
+        package.custom_properties['Price[USD/kg]'] = 0.1
+
+        clone = package.clone()
+        self.assertTrue(clone.isCoal)
+        self.assertEqual(clone.HHV, package.HHV)
+        self.assertEqual(clone._DH298, package._DH298)
+        self.assertEqual(clone.H, package.H)
+        clone.custom_properties['Price[USD/kg]'] = 0.2
+        self.assertEqual(package.custom_properties['Price[USD/kg]'], 0.1)
+
+        # Scaling a package scales its enthalpy.
+        double = package * 2.0
+        self.assertTrue(double.isCoal)
+        self.assertAlmostEqual(double.H, package._calculate_H(300.0) * 2.0)
+        self.assertEqual(double.T, 300.0)
+
     def test_mass(self):
         self.assertAlmostEqual(self.ilm_pkg_a.mass, 1234.5)
         self.assertAlmostEqual(self.ilm_pkg_b.mass, 2345.6)
@@ -364,6 +503,403 @@ class ThermoMaterialPackageUnitTester(unittest.TestCase):
     def test_get_element_masses(self):
         x = self.ilm_pkg_a.get_element_masses()
         y = self.ilm_pkg_a.get_element_mass("Ti")
+        self.assertEqual(len(x), len(self.ilm.elements))
+        self.assertAlmostEqual(x[self.ilm.elements.index("Ti")], y)
+        self.assertAlmostEqual(x.sum(), self.ilm_pkg_a.mass)
+
+        x = self.ilm_pkg_a.get_element_masses(["Fe", "Zr"])
+        self.assertAlmostEqual(x[0], self.ilm_pkg_a.get_element_mass("Fe"))
+        self.assertEqual(x[1], 0.0)
+
+    def test_get_element_masses_batch(self):
+        packages = [self.ilm_pkg_a, self.ilm_pkg_b, self.ilm_pkg_c]
+        batch = np.array([p._compound_masses for p in packages])
+        x = self.ilm.get_element_masses(batch)
+        self.assertEqual(x.shape, (3, len(self.ilm.elements)))
+        for i, package in enumerate(packages):
+            self.assertTrue(np.allclose(x[i], package.get_element_masses()))
+
+    def test_slots(self):
+        stream = self.ilm.create_stream("IlmeniteA", 10.0)
+        for obj in [self.ilm_pkg_a, stream]:
+            self.assertFalse(hasattr(obj, '__dict__'))
+            self.assertIsNone(obj._custom_properties)
+            self.assertNotIn('Custom Properties', str(obj))
+            obj.custom_properties['Price[USD/kg]'] = 1.2
+            self.assertIn('Custom Properties', str(obj))
+
+            new_obj = pickle.loads(pickle.dumps(obj))
+            self.assertAlmostEqual(new_obj.T, obj.T)
+            self.assertEqual(new_obj.custom_properties['Price[USD/kg]'], 1.2)
+
+    def test_assay_H_tables(self):
+        package = self.ilm.create_package("IlmeniteA", 100.0, T=500.0)
+        exact = MaterialPackage(self.ilm, package._compound_masses.copy(),
+                                T=500.0)
+        self.assertEqual(package._assay, "IlmeniteA")
+        self.assertIsNone(exact._assay)
+        self.assertAlmostEqual(package.H, exact.H, places=6)
+
+        package.H = exact.H + 10.0
+        exact.H = exact.H + 10.0
+        self.assertAlmostEqual(package.T, exact.T, places=4)
+
+        # Scaling keeps the composition, but adding a compound changes it.
+        self.assertEqual(package.extract(10.0)._assay, "IlmeniteA")
+        self.assertEqual((package * 2.0)._assay, "IlmeniteA")
+        self.assertIsNone((package + ("TiO2[Srutile]", 1.0))._assay)
+        package.extract(("FeO[S]", 1.0))
+        self.assertIsNone(package._assay)
+
+    def test_instrument(self):
+        package = MaterialPackage(self.ilm, self.ilm_pkg_a._compound_masses,
+                                  T=100.0)
+        with instrument() as report:
+            result = package + self.ilm_pkg_b
+            result.extract("FeO[S]")
+        self.assertEqual(report['MaterialPackage.__add__'].calls, 1)
+        self.assertEqual(report['MaterialPackage.extract'].calls, 1)
+        self.assertEqual(report['MaterialPackage.T.setter'].calls, 2)
+        self.assertGreater(report.get_nested_calls_per_call(
+            'MaterialPackage._calculate_T', 'MaterialPackage._calculate_H'),
+            2)
+        self.assertEqual(report['MaterialPackage._calculate_H'].nested_calls[
+            'thermochemistry.H'],
+            report['MaterialPackage._calculate_H'].calls *
+            self.ilm.compound_count)
+        self.assertFalse(hasattr(MaterialPackage.__dict__['T'].fset,
+                                 '__wrapped__'))
+
+    def test_batch_update(self):
+        expected = self.ilm_pkg_a.clone()
+        expected.extract(100.0)
+        expected.extract("TiO2[S1]")
+        expected.T = 500.0
+
+        package = self.ilm_pkg_a.clone()
+        with package.batch_update():
+            package.extract(100.0)
+            package.extract("TiO2[S1]")
+            package.H = 0.0
+            package.T = 500.0
+            self.assertEqual(package._H, 0.0)
+        self.assertIsNone(package._deferred)
+        self.assertAlmostEqual(package.H, expected.H)
+        self.assertEqual(package.T, 500.0)
+
+        # The value that is set last is kept, and is read inside the context.
+        with package.batch_update():
+            package.T = 900.0
+            package.H = expected.H
+            self.assertAlmostEqual(package.T, 500.0)
+            with package.batch_update():
+                package.T = 800.0
+            self.assertEqual(package._deferred, 'H')
+        self.assertEqual(package.T, 800.0)
+        self.assertAlmostEqual(package.H, package._calculate_H(800.0))
+
+    def test_batch_update_operators(self):
+        package = self.ilm_pkg_a.clone()
+        with package.batch_update():
+            package.T = 500.0
+            result = package * 1.0
+            clone = package.clone()
+        self.assertAlmostEqual(result.H, package.H)
+        self.assertIsNone(clone._deferred)
+        self.assertAlmostEqual(clone.H, package.H)
+
+
+class ThermoMaterialStreamUnitTester(unittest.TestCase):
+    """
+    Unit tester for the auxi.modelling.process.materials.thermo.MaterialStream
+    class.
+    """
+
+    def setUp(self):
+        self.ilm = Material("ilmenite",
+                            get_path(__file__,
+                                     'data/thermomaterial.test.ilmenite.txt'))
+        self.stream = self.ilm.create_stream("IlmeniteA", 100.0, 1.2, 700.0)
+        self.coal = Material("coal", get_path(
+            __file__, 'data/thermomaterial.test.coal.txt'))
+        self.coal_stream = self.coal.create_stream("CoalA", 1000.0, 1.0, 300.0)
+
+    def test_clone(self):
+        clone = self.coal_stream.clone()
+        self.assertTrue(clone.isCoal)
+        self.assertEqual(clone.HHV, self.coal_stream.HHV)
+        self.assertEqual(clone._DH298, self.coal_stream._DH298)
+        self.assertEqual(clone.Hfr, self.coal_stream.Hfr)
+        clone._compound_mfrs[0] += 1.0
+        self.assertNotEqual(clone._compound_mfrs[0],
+                            self.coal_stream._compound_mfrs[0])
+
+        Hfr = self.coal_stream.Hfr
+        extracted = self.coal_stream.extract(100.0)
+        self.assertTrue(extracted.isCoal)
+        self.assertAlmostEqual(extracted.Hfr, Hfr * 0.1)
+        self.assertAlmostEqual(self.coal_stream.Hfr, Hfr * 0.9)
+        self.assertAlmostEqual(self.coal_stream.Hfr,
+                               self.coal_stream._calculate_Hfr(300.0))
+
+    def test_batch_update(self):
+        expected = self.stream.clone()
+        expected.extract(10.0)
+        expected.extract(("TiO2[S1]", 1.0))
+        expected.T = 500.0
+
+        stream = self.stream.clone()
+        with stream.batch_update() as s:
+            s.extract(10.0)
+            s.extract(("TiO2[S1]", 1.0))
+            s.T = 500.0
+            outlets = s.split([0.5, 0.5])
+        self.assertAlmostEqual(stream.Hfr, expected.Hfr)
+        self.assertAlmostEqual(outlets[0].Hfr, expected.Hfr * 0.5)
+        self.assertIsNone(outlets[0]._deferred)
+
+        with stream.batch_update():
+            stream.Hfr = expected.Hfr - 10.0
+            stream.P = 2.0
+        self.assertLess(stream.T, 500.0)
+        self.assertEqual(stream.P, 2.0)
+
+    def test_split(self):
+        outlets = self.stream.split([0.2, 0.5, 0.3])
+        self.assertEqual(len(outlets), 3)
+        for outlet, fraction in zip(outlets, [0.2, 0.5, 0.3]):
+            self.assertAlmostEqual(outlet.mfr, 100.0 * fraction)
+            self.assertEqual(outlet.T, 700.0)
+            self.assertEqual(outlet.P, 1.2)
+            self.assertAlmostEqual(outlet.Hfr, (self.stream * fraction).Hfr)
+        self.assertAlmostEqual(self.stream.mfr, 100.0)
+        self.assertRaises(Exception, self.stream.split, [-0.1, 1.1])
+        self.assertRaises(ValueError, self.stream.split, [0.2, 0.5])
+        self.assertRaises(ValueError, self.stream.split, [0.5, 0.8])
+
+    def test_split_coal(self):
+        outlets = self.coal_stream.split([0.25, 0.75])
+        self.assertTrue(outlets[0].isCoal)
+        self.assertEqual(outlets[0].HHV, self.coal_stream.HHV)
+        self.assertAlmostEqual(outlets[1].Hfr, self.coal_stream.Hfr * 0.75)
+
+    def test_separate(self):
+        split = np.zeros(self.ilm.compound_count)
+        split[self.ilm.get_compound_index("TiO2[Srutile]")] = 0.9
+        top, bottom = self.stream.separate(split)
+        self.assertAlmostEqual(
+            top.mfr, self.stream.get_compound_mfr("TiO2[Srutile]") * 0.9)
+        self.assertAlmostEqual(top.mfr + bottom.mfr, self.stream.mfr)
+        self.assertAlmostEqual(top.Hfr + bottom.Hfr, self.stream.Hfr)
+        self.assertEqual(top.T, 700.0)
+
+        expected = self.ilm.create_stream("IlmeniteA", 0.0, 1.2, 700.0)
+        expected = expected + ("TiO2[Srutile]", top.mfr)
+        self.assertAlmostEqual(top.Hfr, expected.Hfr)
+
+        matrix = np.array([split, 1.0 - split])
+        outlets = self.stream.separate(matrix)
+        self.assertAlmostEqual(outlets[0].Hfr, top.Hfr)
+        self.assertRaises(Exception, self.stream.separate, matrix * 0.5)
+        self.assertRaises(Exception, self.stream.separate, split[:-1])
+
+    def test_separate_coal(self):
+        split = np.zeros(self.coal.compound_count)
+        for compound in ["Al2O3[S]", "CaO[S]", "SiO2[S]"]:
+            split[self.coal.get_compound_index(compound)] = 1.0
+        ash, daf = self.coal_stream.separate(split)
+        self.assertFalse(ash.isCoal)
+        self.assertTrue(daf.isCoal)
+        self.assertAlmostEqual(ash.mfr + daf.mfr, 1000.0)
+        self.assertEqual(daf.T, 300.0)
+        self.assertAlmostEqual(daf.HHV * daf.mfr,
+                               self.coal_stream.HHV * 1000.0)
+        self.assertAlmostEqual(ash.Hfr + daf.Hfr, self.coal_stream.Hfr)
+
+        halves = self.coal_stream.separate(np.full(self.coal.compound_count,
+                                                   0.5))
+        self.assertAlmostEqual(halves[0].HHV, self.coal_stream.HHV)
+        self.assertAlmostEqual(halves[0].Hfr, self.coal_stream.Hfr * 0.5)
+
+    def test_separate_coal_without_HHV(self):
+        assay = self.coal.converted_assays["CoalA"] / \
+            self.coal.get_assay_total("CoalA")
+        stream = MaterialStream(self.coal, 1000.0 * assay, 1.0, 300.0, True)
+        split = np.full(self.coal.compound_count, 0.2)
+        split[self.coal.get_compound_index("C[Sgr]")] = 0.9
+        split[self.coal.get_compound_index("SiO2[S]")] = 1.0
+        outlets = stream.separate(split)
+        self.assertIsNone(outlets[0].HHV)
+        self.assertEqual(outlets[0]._DH298, stream._DH298)
+        self.assertAlmostEqual(outlets[0].Hfr + outlets[1].Hfr, stream.Hfr)
+        self.assertEqual(outlets[0].T, 300.0)
+
+
+class ThermoMixUnitTester(unittest.TestCase):
+    """
+    Unit tester for the auxi.modelling.process.materials.thermo.mix function.
+    """
+
+    def setUp(self):
+        self.ilm = Material("ilmenite",
+                            get_path(__file__,
+                                     'data/thermomaterial.test.ilmenite.txt'))
+        self.streams = [
+            self.ilm.create_stream("IlmeniteA", 100.0, 1.1, 100.0),
+            self.ilm.create_stream("IlmeniteB", 200.0, 1.0, 500.0),
+            self.ilm.create_stream("IlmeniteC", 300.0, 1.0, 900.0)]
+
+    def test_mix(self):
+        expected = self.streams[0] + self.streams[1] + self.streams[2]
+        result = mix(self.streams)
+        self.assertTrue(np.allclose(result._compound_mfrs,
+                                    expected._compound_mfrs))
+        self.assertAlmostEqual(result.Hfr, expected.Hfr)
+        self.assertAlmostEqual(result.T, expected.T, places=4)
+        self.assertEqual(result.P, 1.1)
+        self.assertAlmostEqual(result.T, 653.2347, places=3)
+
+    def test_mix_coal(self):
+        coal = Material("coal", get_path(
+            __file__, 'data/thermomaterial.test.coal.txt'))
+        streams = [coal.create_stream("CoalA", 1000.0, 1.0, 25.0),
+                   coal.create_stream("CoalB", 3000.0, 1.0, 200.0)]
+        expected = streams[0] + streams[1]
+        result = mix(streams)
+        self.assertTrue(result.isCoal)
+        self.assertAlmostEqual(result.HHV, (28.5 * 1000 + 25.0 * 3000) / 4000)
+        self.assertAlmostEqual(result.HHV, expected.HHV)
+        self.assertAlmostEqual(result.Hfr, expected.Hfr)
+        self.assertAlmostEqual(result.T, expected.T, places=4)
+
+    def test_mix_coal_without_HHV(self):
+        coal = Material("coal", get_path(
+            __file__, 'data/thermomaterial.test.coal.txt'))
+        assay = coal.converted_assays["CoalA"] / coal.get_assay_total("CoalA")
+        streams = [MaterialStream(coal, 1000.0 * assay, 1.0, 25.0, True),
+                   MaterialStream(coal, 3000.0 * assay, 1.0, 200.0, True)]
+        expected = streams[0] + streams[1]
+        result = mix(streams)
+        self.assertTrue(result.isCoal)
+        self.assertIsNone(result.HHV)
+        self.assertIsNone(expected.HHV)
+        self.assertAlmostEqual(result._DH298, streams[0]._DH298)
+        self.assertAlmostEqual(result.Hfr, streams[0].Hfr + streams[1].Hfr)
+        self.assertAlmostEqual(result.Hfr, expected.Hfr)
+        self.assertAlmostEqual(result.T, expected.T, places=4)
+
+    def test_mix_empty(self):
+        streams = [self.ilm.create_stream("IlmeniteA", 0.0, T=300.0)] * 3
+        result = mix(streams)
+        self.assertEqual(result.mfr, 0.0)
+        self.assertEqual(result.Hfr, 0.0)
+        self.assertEqual(result.T, 300.0)
+
+    def test_mix_invalid(self):
+        self.assertRaises(Exception, mix, [])
+        self.assertRaises(TypeError, mix, [self.streams[0], 1.0])
+
+
+class ThermoMaterialStreamSeriesUnitTester(unittest.TestCase):
+    """
+    Unit tester for the
+    auxi.modelling.process.materials.thermo.MaterialStreamSeries class.
+    """
+
+    def setUp(self):
+        self.ilm = Material("ilmenite",
+                            get_path(__file__,
+                                     'data/thermomaterial.test.ilmenite.txt'))
+        assay = self.ilm.converted_assays["IlmeniteA"]
+        self.mfrs = np.outer([100.0, 120.0, 80.0, 110.0, 90.0, 100.0], assay)
+        self.T = np.array([600.0, 650.5, 700.0, 720.3, 690.0, 25.0])
+        self.series = MaterialStreamSeries(self.ilm, self.mfrs, self.T,
+                                           dt=0.5)
+        self.streams = [MaterialStream(self.ilm, self.mfrs[i], 1.0,
+                                       self.T[i])
+                        for i in range(len(self.T))]
+
+    def assertAllClose(self, a, b, rtol=1.0e-6):
+        self.assertTrue(np.allclose(a, b, rtol=rtol), '{} != {}'.format(a, b))
+
+    def test_constructor(self):
+        self.assertEqual(len(self.series), 6)
+        self.assertAllClose(self.series.mfr, [s.mfr for s in self.streams])
+        self.assertAllClose(self.series.Hfr, [s.Hfr for s in self.streams])
+        self.assertRaises(Exception, MaterialStreamSeries, self.ilm,
+                          self.mfrs[:, :2])
+
+    def test_Hfr(self):
+        self.series.Hfr = self.series.Hfr - 50.0
+        for i, stream in enumerate(self.streams):
+            stream.Hfr = stream.Hfr - 50.0
+            self.assertAlmostEqual(self.series.T[i], stream.T, places=1)
+
+    def test_Hfr_cooling(self):
+        # The table is widened below the initial temperatures, but not below
+        # absolute zero.
+        series = MaterialStreamSeries(self.ilm, self.mfrs, 25.0)
+        Hfr = series.Hfr.copy()
+        series.T = 300.0
+        series.Hfr = Hfr
+        for T in series.T:
+            self.assertAlmostEqual(T, 25.0, delta=1.0e-6)
+
+    def test_T(self):
+        self.series.T = 900.0
+        stream = self.streams[0]
+        stream.T = 900.0
+        self.assertAlmostEqual(self.series.Hfr[0], stream.Hfr, places=3)
+
+    def test___getitem__(self):
+        stream = self.series[1]
+        self.assertEqual(type(stream), MaterialStream)
+        self.assertAlmostEqual(stream.Hfr, self.streams[1].Hfr)
+        series = self.series[2:4]
+        self.assertEqual(len(series), 2)
+        self.assertAllClose(series.Hfr, self.series.Hfr[2:4])
+
+    def test___add__(self):
+        result = self.series + self.series * 0.5
+        self.assertAllClose(result.mfr, self.series.mfr * 1.5)
+        self.assertAllClose(result.T, self.series.T, rtol=1.0e-4)
+
+        stream = self.ilm.create_stream("IlmeniteB", 50.0, 1.0, 300.0)
+        result = self.series + stream
+        for i in range(len(self.T)):
+            expected = self.streams[i] + stream
+            self.assertAlmostEqual(result.T[i], expected.T, places=1)
+        self.assertRaises(TypeError, self.series.__add__, 1.0)
+
+    def test___mul__(self):
+        result = self.series * np.arange(6)
+        self.assertAllClose(result.mfr, self.series.mfr * np.arange(6))
+        self.assertAllClose(result.T, self.series.T)
+        self.assertRaises(Exception, self.series.__mul__, -1.0)
+
+    def test_get_element_mfrs(self):
+        result = self.series.get_element_mfrs()
+        for i, stream in enumerate(self.streams):
+            self.assertAllClose(result[i], stream.get_element_mfrs())
+
+    def test_aggregation(self):
+        self.assertAllClose(self.series.get_mass(), self.series.mfr.sum() / 2)
+        self.assertAllClose(self.series.get_mass(4),
+                            [self.series.mfr[:4].sum() / 2,
+                             self.series.mfr[4:].sum() / 2])
+        self.assertAllClose(self.series.get_enthalpy(2),
+                            [sum(s.Hfr for s in self.streams[i:i + 2]) / 2
+                             for i in [0, 2, 4]])
+        self.assertEqual(self.series.get_compound_masses(3).shape,
+                         (2, self.ilm.compound_count))
+
+    def test_resample(self):
+        result = self.series.resample(2)
+        self.assertEqual(len(result), 3)
+        self.assertEqual(result.dt, 1.0)
+        self.assertAllClose(result.get_enthalpy(), self.series.get_enthalpy())
+        expected = mix(self.streams[:2]) * 0.5
+        self.assertAlmostEqual(result.T[0], expected.T, places=1)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,457 @@
+#!/usr/bin/env python3
+"""
+This module provides weighted least-squares reconciliation of measured
+stream masses and assays around the units of a flowsheet.
+"""
+
+import numpy
+
+from auxi.core.objects import Object
+from auxi.modelling.process.materials import chem
+from auxi.modelling.process.materials import thermo
+
+
+__version__ = '0.3.6'
+__license__ = 'LGPL v3'
+__copyright__ = 'Copyright 2016, Ex Mente Technologies (Pty) Ltd'
+__author__ = 'Christoff Kok, Johan Zietsman'
+__credits__ = ['Christoff Kok', 'Johan Zietsman']
+__maintainer__ = 'Christoff Kok'
+__email__ = 'christoff.kok@ex-mente.co.za'
+__status__ = 'Planning'
+
+
+def _get_compound_masses(package):
+    """
+    Get the compound masses of a chem or thermo material package.
+
+    :param package: chem.MaterialPackage or thermo.MaterialPackage object.
+
+    :returns: [kg] Array of compound masses.
+    """
+
+    if type(package) is chem.MaterialPackage:
+        return package.compound_masses
+    if type(package) is thermo.MaterialPackage:
+        return package._compound_masses
+    raise TypeError("Invalid package type. Must be chem.MaterialPackage or "
+                    "thermo.MaterialPackage")
+
+
+def _create_package(template, compound_masses):
+    """
+    Create a package with new compound masses.
+
+    :param template: The chem.MaterialPackage or thermo.MaterialPackage
+      object from which the material, pressure, temperature and coal
+      properties are taken.
+    :param compound_masses: [kg] Array of compound masses.
+
+    :returns: New package.
+    """
+
+    if type(template) is chem.MaterialPackage:
+        return chem.MaterialPackage(template.material, compound_masses)
+    return thermo.MaterialPackage(template.material, compound_masses,
+                                  template.P, template.T, template.isCoal,
+                                  template.HHV)
+
+
+class Reconciler(Object):
+    """
+    Adjusts measured stream masses and assays by weighted least squares so
+    that they satisfy the mass balances of the units on a flowsheet.
+
+    The units conserve elements, or compounds if they do not react, and the
+    assay of each stream adds up to one. Because the compound masses of a
+    stream are the product of its mass and assay, the balances are
+    bilinear. They are linearised around the current estimate and the
+    resulting KKT system is solved repeatedly until the estimate
+    converges. Each stream only appears in the balances of its
+    producing and consuming units, so the KKT system is reduced to a block
+    sparse matrix of the balance multipliers with a block per pair of
+    connected units. It is solved by block elimination in a minimum degree
+    order that is determined once for the flowsheet.
+
+    :param flowsheet: Flowsheet object whose units and streams describe the
+      topology. The unit models are not run.
+    :param material: chem.Material or thermo.Material object of all the
+      streams.
+    :param compound_balances: The names of the units that conserve
+      compounds. The other units conserve elements.
+    :param tolerance: Convergence criterion for the change in the masses,
+      relative to the largest measured mass, and the assays.
+    :param max_iterations: The maximum number of linearisations.
+    """
+
+    def __init__(self, flowsheet, material, compound_balances=None,
+                 tolerance=1.0E-9, max_iterations=50):
+        if not (type(material) is chem.Material or
+                type(material) is thermo.Material):
+            raise TypeError("Invalid material type. Must be chem.Material or "
+                            "thermo.Material")
+
+        self.flowsheet = flowsheet
+        """The flowsheet that describes the topology."""
+        self.material = material
+        """The material of all the streams."""
+        self.compound_balances = [] if compound_balances is None \
+            else list(compound_balances)
+        """The names of the units that conserve compounds."""
+        self.tolerance = tolerance
+        """Convergence criterion of the masses and assays."""
+        self.max_iterations = max_iterations
+        """The maximum number of linearisations."""
+        self.streams = []
+        """The names of the streams in the sequence of the solve arrays."""
+        self.iterations = 0
+        """The number of linearisations of the most recent solve."""
+        self.objective = None
+        """
+        The weighted sum of squared adjustments of each period of the most
+        recent solve. It follows a chi-square distribution with
+        constraint_count degrees of freedom if the measurement errors are
+        random, and is used to detect gross errors.
+        """
+        self.constraint_count = 0
+        """
+        The number of independent balance equations and assay closures.
+        """
+
+        self._solution = None
+        self._create_structure()
+
+    def _create_structure(self):
+        """
+        Determine the streams and balance equations of the flowsheet.
+        """
+
+        units = self.flowsheet.units
+        names = [unit.name for unit in units]
+        for name in self.compound_balances:
+            if name not in names:
+                raise ValueError("Unit '{}' is not on the flowsheet."
+                                 .format(name))
+
+        # Find the producer and consumer of each stream. The index of a
+        # missing unit points to a dummy unit without balances.
+        dummy = len(units)
+        ends = {}
+        for i, unit in enumerate(units):
+            for s in unit.inlets:
+                if s not in ends:
+                    ends[s] = [dummy, dummy]
+                    self.streams.append(s)
+                if ends[s][1] != dummy:
+                    raise Exception("Stream '{}' is consumed by more than one "
+                                    "unit.".format(s))
+                ends[s][1] = i
+            for s in unit.outlets:
+                if s not in ends:
+                    ends[s] = [dummy, dummy]
+                    self.streams.append(s)
+                ends[s][0] = i
+
+        # The element balances are expressed in an orthonormal basis of the
+        # element rows, which removes the dependent rows of compounds such as
+        # SiO2 that always contain their elements in the same ratio.
+        C = self.material.compound_count
+        E = numpy.asarray(self.material.element_mass_fractions, dtype=float)
+        _, values, vectors = numpy.linalg.svd(E.T)
+        rank = int((values > 1.0E-12 * values.max()).sum()) \
+            if len(values) > 0 else 0
+        element_basis = vectors[:rank]
+        bases = [numpy.identity(C) if name in self.compound_balances
+                 else element_basis for name in names]
+
+        R = max([len(basis) for basis in bases] + [1])
+        padded_bases = numpy.zeros((dummy + 1, R, C))
+        for i, basis in enumerate(bases):
+            padded_bases[i, :len(basis)] = basis
+        self.constraint_count = sum(len(basis) for basis in bases) + \
+            len(self.streams)
+
+        # Outlets leave the producing unit and inlets enter the consuming
+        # unit. The balance rows of unit u are u R to u R + R - 1.
+        ends = numpy.array([ends[s] for s in self.streams],
+                           dtype=int).reshape(-1, 2)
+        S = len(self.streams)
+        self._signed_bases = (padded_bases[ends] *
+                              numpy.array([-1.0, 1.0])[:, None, None]
+                              ).reshape(S, 2 * R, C)
+        self._rows = (ends[:, :, None] * R +
+                      numpy.arange(R)).reshape(S, 2 * R)
+        self._padding = numpy.nonzero(
+            numpy.arange(R) >= numpy.array([[len(b)] for b in bases]))
+
+        # Order the block elimination of the reduced KKT matrix by minimum
+        # degree, and record the blocks that fill in.
+        graph = [set() for _ in range(dummy)]
+        for p, c in ends:
+            if p != dummy and c != dummy and p != c:
+                graph[p].add(c)
+                graph[c].add(p)
+        blocks = {}
+
+        def get_block(i, j):
+            return blocks.setdefault((i, j), len(blocks))
+
+        self._eliminations = []
+        remaining = set(range(dummy))
+        while len(remaining) > 0:
+            k = min(remaining, key=lambda u: (len(graph[u]), u))
+            remaining.remove(k)
+            later = sorted(graph[k])
+            for i in later:
+                graph[i].update(graph[k])
+                graph[i].discard(i)
+                graph[i].discard(k)
+            self._eliminations.append(
+                (k, get_block(k, k), [(i, get_block(i, k), get_block(k, i))
+                                      for i in later],
+                 [[get_block(i, j) for j in later] for i in later]))
+        self._diagonal_blocks = numpy.array(
+            [get_block(u, u) for u in range(dummy)], dtype=int)
+
+        # The blocks of the stream ends. Blocks of streams that enter or
+        # leave the flowsheet are discarded in a scratch block.
+        scratch = len(blocks)
+        self._stream_blocks = numpy.array(
+            [[[scratch if dummy in (i, j) else blocks[(i, j)]
+               for j in (p, c)] for i in (p, c)] for p, c in ends],
+            dtype=int).reshape(S, 2, 2)
+        self._block_count = scratch + 1
+
+    def _solve_blocks(self, blocks, rhs):
+        """
+        Solve the reduced KKT system by block Gaussian elimination.
+
+        :param blocks: [periods x blocks x rows x rows] array of the nonzero
+          blocks of the symmetric positive definite matrix. It is
+          overwritten.
+        :param rhs: [periods x units x rows] array of the right hand side.
+          It is overwritten.
+
+        :returns: [periods x units x rows] array of the solution.
+        """
+
+        inverses = []
+        for k, kk, neighbours, updates in self._eliminations:
+            inverse = numpy.linalg.inv(blocks[:, kk])
+            inverses.append(inverse)
+            for (i, ik, _), row in zip(neighbours, updates):
+                factor = numpy.matmul(blocks[:, ik], inverse)
+                rhs[:, i] -= numpy.einsum('pij,pj->pi', factor, rhs[:, k])
+                for (_, _, kj), ij in zip(neighbours, row):
+                    blocks[:, ij] -= numpy.matmul(factor, blocks[:, kj])
+
+        result = numpy.zeros(rhs.shape)
+        for (k, _, neighbours, _), inverse in zip(
+                reversed(self._eliminations), reversed(inverses)):
+            residual = rhs[:, k].copy()
+            for i, _, ki in neighbours:
+                residual -= numpy.einsum('pij,pj->pi', blocks[:, ki],
+                                         result[:, i])
+            result[:, k] = numpy.einsum('pij,pj->pi', inverse, residual)
+        return result
+
+    def solve(self, masses, assays, mass_deviations, assay_deviations,
+              warm_start=False):
+        """
+        Reconcile measured stream masses and assays.
+
+        :param masses: [kg] Array of the measured mass of each stream, or a
+          [periods x streams] array to reconcile many periods at once. The
+          sequence of the streams is that of the streams attribute.
+        :param assays: [mass fractions] [streams x compounds] array of the
+          measured assays, or a [periods x streams x compounds] array.
+        :param mass_deviations: [kg] Standard deviations of the mass
+          measurements. The value is broadcast against masses.
+        :param assay_deviations: [mass fractions] Standard deviations of the
+          assay measurements. The value is broadcast against assays.
+        :param warm_start: Indicates whether the linearisation starts at the
+          final period of the previous solution instead of at the
+          measurements, e.g. when reconciling consecutive days.
+
+        :returns: Tuple of the reconciled masses [kg] and assays [mass
+          fractions] with the same shapes as masses and assays. The
+          reconciled assays add up to one.
+
+        Streams that are not measured must be given estimates with large
+        standard deviations.
+        """
+
+        S = len(self.streams)
+        C = self.material.compound_count
+        m_hat = numpy.asarray(masses, dtype=float)
+        a_hat = numpy.asarray(assays, dtype=float)
+        single = m_hat.ndim == 1
+        if single:
+            m_hat = m_hat[numpy.newaxis]
+            a_hat = a_hat[numpy.newaxis]
+        P = len(m_hat)
+        if m_hat.shape != (P, S):
+            raise ValueError("The masses do not match the flowsheet's {} "
+                             "streams.".format(S))
+        if a_hat.shape != (P, S, C):
+            raise ValueError("The assays do not match the streams and the "
+                             "material's compounds.")
+
+        if numpy.any(numpy.asarray(mass_deviations) <= 0.0) or \
+           numpy.any(numpy.asarray(assay_deviations) <= 0.0):
+            raise ValueError("The standard deviations must be positive.")
+        var_m = numpy.broadcast_to(
+            numpy.asarray(mass_deviations, dtype=float) ** 2, (P, S))
+        var_a = numpy.broadcast_to(
+            numpy.asarray(assay_deviations, dtype=float) ** 2, (P, S, C))
+
+        # The assay closures are linear, so the measured assays are first
+        # adjusted to add up to one. The covariance of the adjusted assays,
+        # V - V 1 1' V / 1' V 1, keeps every later adjustment closed.
+        var_a_total = var_a.sum(axis=-1)
+        a_closed = a_hat - var_a * (
+            (a_hat.sum(axis=-1) - 1.0) / var_a_total)[..., None]
+
+        if warm_start and self._solution is not None:
+            m = numpy.repeat(self._solution[0][numpy.newaxis], P, axis=0)
+            a = numpy.repeat(self._solution[1][numpy.newaxis], P, axis=0)
+        else:
+            m = m_hat.copy()
+            a = a_closed.copy()
+
+        B = self._signed_bases
+        BT = B.transpose(0, 2, 1)
+        R = B.shape[1] // 2
+        n = len(self.flowsheet.units) + 1
+        periods = numpy.arange(P)
+        rows = self._rows
+        row_indices = (periods[:, None, None] * n * R + rows).ravel()
+        block_indices = (
+            (periods[:, None, None, None] * self._block_count +
+             self._stream_blocks)[..., None, None] * R * R +
+            numpy.arange(R * R).reshape(R, R)).ravel()
+        diagonals = self._diagonal_blocks[self._padding[0]]
+        scale = max(numpy.abs(m_hat).max(), 1.0E-300)
+
+        for iteration in range(1, self.max_iterations + 1):
+            # The derivatives of the balances with respect to the mass of
+            # each stream. Those with respect to its assay are B m.
+            Ba = numpy.matmul(B, a[..., None])[..., 0]
+
+            # Reduce the KKT system to the balance multipliers, and assemble
+            # its blocks from the contribution of each stream.
+            rhs = Ba * m_hat[:, :, None] + m[:, :, None] * \
+                numpy.matmul(B, (a_closed - a)[..., None])[..., 0]
+            rhs = numpy.bincount(row_indices, rhs.ravel(), P * n * R)
+            Bv = numpy.matmul(B, var_a[..., None])[..., 0]
+            M = Ba[..., :, None] * (Ba * var_m[:, :, None])[..., None, :] + \
+                (numpy.matmul(B * var_a[:, :, None, :], BT) -
+                 Bv[..., :, None] * Bv[..., None, :] /
+                 var_a_total[:, :, None, None]) * (m ** 2)[:, :, None, None]
+            M = M.reshape(P, S, 2, R, 2, R).transpose(0, 1, 2, 4, 3, 5)
+            M = numpy.bincount(block_indices, M.ravel(),
+                               P * self._block_count * R * R).reshape(
+                P, self._block_count, R, R)
+            M[:, diagonals, self._padding[1], self._padding[1]] = 1.0
+            try:
+                multipliers = self._solve_blocks(M, rhs.reshape(P, n, R))
+            except numpy.linalg.LinAlgError:
+                raise Exception("The balances are dependent or the streams "
+                                "are not observable.")
+
+            multipliers = multipliers.reshape(P, n * R)
+            multipliers = multipliers[periods[:, None, None], rows]
+            m_new = m_hat - var_m * (Ba * multipliers).sum(axis=-1)
+            adjustments = var_a * m[:, :, None] * numpy.matmul(
+                multipliers[..., None, :], B)[..., 0, :]
+            a_new = a_closed - adjustments + var_a * (
+                adjustments.sum(axis=-1) / var_a_total)[..., None]
+            step = max(numpy.abs(m_new - m).max() / scale,
+                       numpy.abs(a_new - a).max())
+            m, a = m_new, a_new
+            self.iterations = iteration
+            if step <= self.tolerance:
+                break
+        else:
+            raise Exception("The reconciliation did not converge in {} "
+                            "iterations.".format(self.max_iterations))
+
+        self._solution = (m[-1].copy(), a[-1].copy())
+        self.objective = ((m - m_hat) ** 2 / var_m).sum(axis=-1) + \
+            ((a - a_hat) ** 2 / var_a).sum(axis=(-2, -1))
+        if single:
+            self.objective = self.objective[0]
+            return m[0], a[0]
+        return m, a
+
+    def reconcile(self, packages, mass_deviation=0.05, assay_deviation=0.005,
+                  warm_start=False):
+        """
+        Reconcile measured packages.
+
+        :param packages: Dictionary of stream names and measured
+          chem.MaterialPackage or thermo.MaterialPackage objects, or a list
+          of dictionaries to reconcile many periods at once.
+        :param mass_deviation: The standard deviation of the mass
+          measurements relative to the measured masses, or a dictionary of
+          stream names and relative standard deviations. Streams with a
+          measured mass of zero are given the deviation of the largest
+          measured mass of the period.
+        :param assay_deviation: [mass fractions] The standard deviation of
+          the assay measurements, or a dictionary of stream names and
+          standard deviations.
+        :param warm_start: Indicates whether the linearisation starts at the
+          previous solution. See solve.
+
+        :returns: Dictionary of stream names and reconciled packages, or a
+          list of dictionaries.
+        """
+
+        single = type(packages) is dict
+        periods = [packages] if single else list(packages)
+        compound_masses = numpy.zeros((len(periods), len(self.streams),
+                                       self.material.compound_count))
+        for p, period in enumerate(periods):
+            for s, name in enumerate(self.streams):
+                if name not in period:
+                    raise ValueError("Stream '{}' is not measured."
+                                     .format(name))
+                if period[name].material is not self.material:
+                    raise ValueError("The material of stream '{}' is not the "
+                                     "reconciler's material.".format(name))
+                compound_masses[p, s] = _get_compound_masses(period[name])
+
+        masses = compound_masses.sum(axis=-1)
+        with numpy.errstate(divide='ignore', invalid='ignore'):
+            assays = numpy.nan_to_num(compound_masses / masses[..., None])
+
+        def get_values(value):
+            if type(value) is dict:
+                return numpy.array([value[s] for s in self.streams],
+                                   dtype=float)
+            return value
+
+        relative = get_values(mass_deviation)
+        mass_deviations = masses * relative
+        mass_deviations = numpy.where(
+            masses > 0.0, mass_deviations,
+            masses.max(axis=-1)[:, None] * relative)
+        assay_deviations = get_values(assay_deviation)
+        if numpy.ndim(assay_deviations) == 1:
+            assay_deviations = assay_deviations[:, None]
+        masses, assays = self.solve(masses, assays, mass_deviations,
+                                    assay_deviations, warm_start)
+        if single:
+            self.objective = self.objective[0]
+
+        result = [{name: _create_package(period[name],
+                                         masses[p, s] * assays[p, s])
+                   for s, name in enumerate(self.streams)}
+                  for p, period in enumerate(periods)]
+        return result[0] if single else result
+
+
+if __name__ == '__main__':
+    import unittest
+    from auxi.modelling.process.reconciliation_test import ReconcilerTester
+    unittest.main()
@@ -0,0 +1,277 @@
+#!/usr/bin/env python3
+"""
+This module provides testing code for the reconciliation module.
+"""
+
+import os
+import unittest
+
+import numpy
+
+from auxi.tools.chemistry import stoichiometry as stoich
+from auxi.modelling.process.core import SteadyStateModel
+from auxi.modelling.process.flowsheet import Flowsheet
+from auxi.modelling.process.materials import chem
+from auxi.modelling.process.reconciliation import Reconciler
+
+
+__version__ = '0.3.6'
+__license__ = 'LGPL v3'
+__copyright__ = 'Copyright 2016, Ex Mente Technologies (Pty) Ltd'
+__author__ = 'Christoff Kok, Johan Zietsman'
+__credits__ = ['Christoff Kok', 'Johan Zietsman']
+__maintainer__ = 'Christoff Kok'
+__email__ = 'christoff.kok@ex-mente.co.za'
+__status__ = 'Planning'
+
+
+def reconcile(reconciler, masses, assays, mass_deviations, assay_deviations):
+    """
+    Reconcile with dense matrices, numerical derivatives, the raw element
+    and compound balances and the assay closures.
+    """
+
+    material = reconciler.material
+    flowsheet = reconciler.flowsheet
+    streams = reconciler.streams
+    S, C = assays.shape
+    z_hat = numpy.append(masses, assays.ravel())
+    D = numpy.append(numpy.broadcast_to(mass_deviations, (S,)) ** 2,
+                     numpy.broadcast_to(assay_deviations, (S, C)).ravel() ** 2)
+
+    def g(z):
+        compound_masses = z[:S, None] * z[S:].reshape(S, C)
+        result = []
+        for unit in flowsheet.units:
+            total = sum(compound_masses[streams.index(s)]
+                        for s in unit.inlets) - \
+                sum(compound_masses[streams.index(s)] for s in unit.outlets)
+            if unit.name in reconciler.compound_balances:
+                result.extend(total)
+            else:
+                result.extend(material.get_element_masses(total))
+        result.extend(z[S:].reshape(S, C).sum(axis=1) - 1.0)
+        return numpy.array(result)
+
+    z = z_hat.copy()
+    for _ in range(50):
+        J = numpy.array([(g(z + h) - g(z - h)) / 2.0E-6
+                         for h in numpy.identity(len(z)) * 1.0E-6]).T
+        M = (J * D).dot(J.T)
+        multipliers = numpy.linalg.pinv(M).dot(g(z) + J.dot(z_hat - z))
+        z_new = z_hat - D * J.T.dot(multipliers)
+        if numpy.abs(z_new - z).max() < 1.0E-12 * numpy.abs(z_hat).max():
+            break
+        z = z_new
+    return z_new[:S], z_new[S:].reshape(S, C)
+
+
+class ReconcilerTester(unittest.TestCase):
+    """
+    Tester for the auxi.modelling.process.reconciliation.Reconciler class.
+    """
+
+    def setUp(self):
+        self.material = chem.Material(
+            'mix', os.path.join(os.path.dirname(chem.__file__), 'data',
+                                'chemmaterial.test.mix.txt'))
+        self.flowsheet = Flowsheet('plant')
+        self.flowsheet.add_model(SteadyStateModel('reactor'),
+                                 ['ore', 'coal'], ['reduced', 'gas'])
+        self.flowsheet.add_model(SteadyStateModel('separator'),
+                                 ['reduced'], ['concentrate', 'tailings'])
+        self.reconciler = Reconciler(self.flowsheet, self.material,
+                                     ['separator'])
+
+        # Consistent data. Fe2O3 is reduced to FeO in the reactor.
+        FeO = 700.0 * 2.0 * stoich.molar_mass('FeO') / \
+            stoich.molar_mass('Fe2O3')
+        masses = {'ore': {'Fe2O3': 700.0, 'SiO2': 50.0, 'TiO2': 250.0},
+                  'coal': {'C': 60.0, 'SiO2': 5.0},
+                  'reduced': {'FeO': FeO, 'SiO2': 55.0, 'TiO2': 250.0},
+                  'gas': {'O2': 700.0 - FeO, 'C': 60.0},
+                  'concentrate': {'FeO': 0.95 * FeO, 'SiO2': 11.0,
+                                  'TiO2': 225.0},
+                  'tailings': {'FeO': 0.05 * FeO, 'SiO2': 44.0,
+                               'TiO2': 25.0}}
+        self.compound_masses = numpy.zeros((6, self.material.compound_count))
+        for s, name in enumerate(self.reconciler.streams):
+            for compound, mass in masses[name].items():
+                self.compound_masses[
+                    s, self.material.get_compound_index(compound)] = mass
+        self.masses = self.compound_masses.sum(axis=1)
+        self.assays = self.compound_masses / self.masses[:, None]
+
+        # Measurements with errors.
+        random = numpy.random.RandomState(1)
+        self.measured_masses = self.masses * (1.0 + random.normal(0.0, 0.03,
+                                                                  6))
+        self.measured_assays = numpy.where(
+            self.assays > 0.0,
+            self.assays * (1.0 + random.normal(0.0, 0.02, self.assays.shape)),
+            0.0)
+
+    def get_imbalances(self, masses, assays):
+        compound_masses = masses[..., None] * assays
+        reactor = self.material.get_element_masses(
+            compound_masses[..., 0, :] + compound_masses[..., 1, :] -
+            compound_masses[..., 2, :] - compound_masses[..., 3, :])
+        separator = compound_masses[..., 2, :] - \
+            compound_masses[..., 4, :] - compound_masses[..., 5, :]
+        return numpy.abs(reactor).max(), numpy.abs(separator).max()
+
+    def test_constructor(self):
+        self.assertEqual(self.reconciler.streams,
+                         ['ore', 'coal', 'reduced', 'gas', 'concentrate',
+                          'tailings'])
+
+        # The element balance contains only the independent rows, the
+        # compound balance one row per compound, and each stream an assay
+        # closure.
+        elements = numpy.linalg.matrix_rank(
+            self.material.element_mass_fractions)
+        self.assertEqual(self.reconciler.constraint_count,
+                         elements + self.material.compound_count + 6)
+
+        self.assertRaises(TypeError, Reconciler, self.flowsheet, 'mix')
+        self.assertRaises(ValueError, Reconciler, self.flowsheet,
+                          self.material, ['mill'])
+        self.flowsheet.add_model(SteadyStateModel('mill'), ['ore'], ['feed'])
+        self.assertRaises(Exception, Reconciler, self.flowsheet,
+                          self.material)
+
+    def test_solve_consistent(self):
+        masses, assays = self.reconciler.solve(self.masses, self.assays,
+                                               self.masses * 0.03, 0.005)
+        numpy.testing.assert_allclose(masses, self.masses)
+        numpy.testing.assert_allclose(assays, self.assays, atol=1.0E-12)
+        self.assertAlmostEqual(self.reconciler.objective, 0.0)
+
+    def test_solve(self):
+        mass_deviations = self.measured_masses * 0.03
+        masses, assays = self.reconciler.solve(
+            self.measured_masses, self.measured_assays, mass_deviations,
+            0.005)
+        self.assertGreater(self.get_imbalances(self.measured_masses,
+                                               self.measured_assays)[0], 1.0)
+        for imbalance in self.get_imbalances(masses, assays):
+            self.assertLess(imbalance, 1.0E-8)
+        self.assertLess(numpy.abs(masses - self.masses).sum(),
+                        numpy.abs(self.measured_masses - self.masses).sum())
+        self.assertGreater(numpy.abs(self.measured_assays.sum(axis=1) -
+                                     1.0).max(), 0.001)
+        numpy.testing.assert_allclose(assays.sum(axis=1), 1.0)
+
+        expected = reconcile(self.reconciler, self.measured_masses,
+                             self.measured_assays, mass_deviations, 0.005)
+        numpy.testing.assert_allclose(masses, expected[0], rtol=1.0E-6)
+        numpy.testing.assert_allclose(assays, expected[1], atol=1.0E-8)
+        self.assertAlmostEqual(
+            self.reconciler.objective,
+            ((masses - self.measured_masses) ** 2 / mass_deviations ** 2
+             ).sum() + ((assays - self.measured_assays) ** 2 / 0.005 ** 2
+                        ).sum())
+
+    def test_solve_periods(self):
+        masses = numpy.array([self.measured_masses, self.masses,
+                              self.measured_masses * 1.1])
+        assays = numpy.array([self.measured_assays, self.assays,
+                              self.measured_assays])
+        result = self.reconciler.solve(masses, assays, masses * 0.03, 0.005)
+        self.assertEqual(result[0].shape, masses.shape)
+        self.assertEqual(result[1].shape, assays.shape)
+        objective = self.reconciler.objective
+        self.assertEqual(objective.shape, (3,))
+        for p in range(3):
+            expected = self.reconciler.solve(masses[p], assays[p],
+                                             masses[p] * 0.03, 0.005)
+            numpy.testing.assert_allclose(result[0][p], expected[0])
+            numpy.testing.assert_allclose(result[1][p], expected[1],
+                                          atol=1.0E-12)
+            self.assertAlmostEqual(objective[p], self.reconciler.objective)
+
+    def test_solve_warm_start(self):
+        self.reconciler.solve(self.measured_masses, self.measured_assays,
+                              self.measured_masses * 0.03, 0.005)
+        masses = self.measured_masses * 1.01
+        cold = self.reconciler.solve(masses, self.measured_assays,
+                                     masses * 0.03, 0.005)
+        iterations = self.reconciler.iterations
+        warm = self.reconciler.solve(masses, self.measured_assays,
+                                     masses * 0.03, 0.005, True)
+        self.assertLessEqual(self.reconciler.iterations, iterations)
+        numpy.testing.assert_allclose(warm[0], cold[0])
+        numpy.testing.assert_allclose(warm[1], cold[1], atol=1.0E-12)
+
+    def test_solve_recycle(self):
+        # Eliminating a unit of a loop of four units fills in the block
+        # between its neighbours.
+        flowsheet = Flowsheet('loop')
+        for i in range(4):
+            flowsheet.add_model(SteadyStateModel('unit' + str(i)),
+                                ['feed' + str(i), 'loop' + str(i)],
+                                ['loop' + str((i + 1) % 4),
+                                 'product' + str(i)])
+        reconciler = Reconciler(flowsheet, self.material,
+                                ['unit0', 'unit2'])
+        S = len(reconciler.streams)
+        random = numpy.random.RandomState(2)
+        masses = random.uniform(50.0, 150.0, S)
+        assays = numpy.abs(self.assays[random.randint(0, 6, S)] +
+                           random.normal(0.0, 0.01, (S, 19)))
+        result = reconciler.solve(masses, assays, masses * 0.05, 0.01)
+        expected = reconcile(reconciler, masses, assays, masses * 0.05, 0.01)
+        numpy.testing.assert_allclose(result[0], expected[0], rtol=1.0E-6)
+        numpy.testing.assert_allclose(result[1], expected[1], atol=1.0E-8)
+
+    def test_solve_invalid(self):
+        self.assertRaises(ValueError, self.reconciler.solve, self.masses[:5],
+                          self.assays[:5], 1.0, 0.005)
+        self.assertRaises(ValueError, self.reconciler.solve, self.masses,
+                          self.assays[:, :5], 1.0, 0.005)
+        self.assertRaises(ValueError, self.reconciler.solve, self.masses,
+                          self.assays, 0.0, 0.005)
+
+    def test_reconcile(self):
+        packages = {name: chem.MaterialPackage(
+            self.material, self.measured_masses[s] * self.measured_assays[s])
+            for s, name in enumerate(self.reconciler.streams)}
+        result = self.reconciler.reconcile(packages, 0.03)
+        self.assertEqual(sorted(result), sorted(packages))
+        reactor = result['ore'].get_element_masses() + \
+            result['coal'].get_element_masses() - \
+            result['reduced'].get_element_masses() - \
+            result['gas'].get_element_masses()
+        self.assertLess(numpy.abs(reactor).max(), 1.0E-8)
+        separator = result['reduced'].compound_masses - \
+            result['concentrate'].compound_masses - \
+            result['tailings'].compound_masses
+        self.assertLess(numpy.abs(separator).max(), 1.0E-8)
+
+        # The reconciled packages have the reconciled stream masses.
+        compound_masses = self.measured_masses[:, None] * self.measured_assays
+        measured = compound_masses.sum(axis=1)
+        masses, _ = self.reconciler.solve(
+            measured, compound_masses / measured[:, None], measured * 0.03,
+            0.005)
+        for s, name in enumerate(self.reconciler.streams):
+            self.assertAlmostEqual(result[name].get_mass(), masses[s])
+
+        # A period list gives a list of results.
+        periods = self.reconciler.reconcile([packages, packages], 0.03)
+        self.assertEqual(len(periods), 2)
+        numpy.testing.assert_allclose(periods[1]['gas'].compound_masses,
+                                      result['gas'].compound_masses)
+
+        # Streams with a measured mass of zero can be reconciled.
+        packages['gas'] = chem.MaterialPackage(
+            self.material, numpy.zeros(self.material.compound_count))
+        result = self.reconciler.reconcile(packages, 0.03)
+        self.assertGreater(result['gas'].get_mass(), 1.0)
+
+        del packages['gas']
+        self.assertRaises(ValueError, self.reconciler.reconcile, packages)
+
+
+if __name__ == '__main__':
+    unittest.main()
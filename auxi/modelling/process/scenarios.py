@@ -0,0 +1,272 @@
+#!/usr/bin/env python3
+"""
+This module provides a runner that executes many independent scenarios of a
+process model or flowsheet in parallel processes.
+"""
+
+import itertools
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy
+
+from auxi.core.objects import Object
+
+
+__version__ = '0.3.6'
+__license__ = 'LGPL v3'
+__copyright__ = 'Copyright 2016, Ex Mente Technologies (Pty) Ltd'
+__author__ = 'Christoff Kok, Johan Zietsman'
+__credits__ = ['Christoff Kok', 'Johan Zietsman']
+__maintainer__ = 'Christoff Kok'
+__email__ = 'christoff.kok@ex-mente.co.za'
+__status__ = 'Planning'
+
+
+def create_grid(values):
+    """
+    Create the parameter sets of a full factorial grid.
+
+    :param values: Dictionary of value paths, e.g. 'parameters.fraction', and
+      lists of the values to use.
+
+    :returns: List of parameter set dictionaries.
+    """
+
+    paths = list(values.keys())
+    return [dict(zip(paths, combination))
+            for combination in itertools.product(*values.values())]
+
+
+def set_value(model, path, value):
+    """
+    Set a value on a model.
+
+    :param model: The model.
+    :param path: Dotted attribute path relative to the model, e.g.
+      'parameters.fraction' or 'input_variables.feed_rate'.
+    :param value: The value.
+    """
+
+    names = path.split('.')
+    obj = model
+    for name in names[:-1]:
+        obj = getattr(obj, name)
+    if not hasattr(obj, names[-1]):
+        raise AttributeError("'{}' is not a valid value path for model "
+                             "'{}'.".format(path, model.name))
+    setattr(obj, names[-1], value)
+
+
+def get_output_variables(model, streams):
+    """
+    Get the output variables of a model that has been run.
+
+    :param model: The model.
+    :param streams: The streams dictionary returned by the model.
+
+    :returns: Dictionary of output variable names and values.
+    """
+
+    variables = model.output_variables
+    names = [n for n in dir(variables) if not n.startswith('_')]
+    return {n: getattr(variables, n) for n in names
+            if not callable(getattr(variables, n))}
+
+
+def run_scenario(factory, parameters, streams=None,
+                 collect=get_output_variables):
+    """
+    Create a model, apply a parameter set to it and run it.
+
+    :param factory: Callable without arguments that creates the model.
+    :param parameters: Dictionary of value paths and values.
+    :param streams: The streams dictionary passed to the model's run method.
+    :param collect: Callable that receives the model and resulting streams
+      dictionary and returns a dictionary of result values.
+
+    :returns: Dictionary of result values.
+    """
+
+    model = factory()
+    for path, value in parameters.items():
+        set_value(model, path, value)
+    streams = {} if streams is None else dict(streams)
+    result = model.run(streams)
+    return collect(model, streams if result is None else result)
+
+
+def _run_chunk(factory, chunk, streams, collect):
+    return [(index, run_scenario(factory, parameters, streams, collect))
+            for index, parameters in chunk]
+
+
+class ResultTable(Object):
+    """
+    Columnar table of scenario results.
+
+    :param parameter_sets: The parameter sets of the scenarios, in scenario
+      order.
+    :param results: The result dictionaries of the scenarios, in scenario
+      order.
+    """
+
+    def __init__(self, parameter_sets, results):
+        self.parameter_names = []
+        """The names of the parameter columns."""
+        self.result_names = []
+        """The names of the result columns."""
+        self.columns = {}
+        """Dictionary of column names and value arrays."""
+
+        for names, rows in [(self.parameter_names, parameter_sets),
+                            (self.result_names, results)]:
+            for row in rows:
+                for name in row:
+                    if name not in names:
+                        names.append(name)
+            for name in names:
+                self.columns[name] = self._create_column(
+                    [row.get(name, None) for row in rows])
+
+    def __len__(self):
+        if len(self.columns) == 0:
+            return 0
+        return len(next(iter(self.columns.values())))
+
+    def __getitem__(self, name):
+        return self.columns[name]
+
+    def _create_column(self, values):
+        if all(isinstance(v, (int, float, numpy.number)) and
+               not isinstance(v, bool) for v in values):
+            return numpy.array(values, dtype=float)
+        result = numpy.empty(len(values), dtype=object)
+        result[:] = values
+        return result
+
+    def get_row(self, index):
+        """
+        Get the values of a scenario.
+
+        :param index: The scenario index.
+
+        :returns: Dictionary of column names and values.
+        """
+
+        return {name: column[index] for name, column in self.columns.items()}
+
+
+class ScenarioRunner(Object):
+    """
+    Runs scenarios of a process model in a pool of worker processes.
+
+    :param factory: Callable without arguments that creates the model to
+      run. It must be picklable, e.g. a module level function or class.
+    :param streams: The streams dictionary passed to every scenario's run.
+    :param collect: Callable that receives the model and resulting streams
+      dictionary and returns a dictionary of result values. It defaults to
+      collecting the model's output variables and must be picklable.
+    :param max_workers: The number of worker processes. All the processor
+      cores are used if this is None. Scenarios run in the current process
+      if this is 1.
+    :param chunk_size: The number of scenarios sent to a worker at a time.
+      It is selected automatically if this is None.
+    :param initializer: Callable that is run once in each worker process
+      before any scenarios, e.g. sharedmemory.initialise_worker.
+    :param initargs: The arguments passed to the initializer.
+    """
+
+    def __init__(self, factory, streams=None, collect=get_output_variables,
+                 max_workers=None, chunk_size=None, initializer=None,
+                 initargs=()):
+        self.factory = factory
+        """Callable that creates the model."""
+        self.streams = streams
+        """The streams dictionary passed to every scenario's run."""
+        self.collect = collect
+        """Callable that collects the results of a scenario."""
+        self.max_workers = max_workers
+        """The number of worker processes."""
+        self.chunk_size = chunk_size
+        """The number of scenarios sent to a worker at a time."""
+        self.initializer = initializer
+        """Callable that is run once in each worker process."""
+        self.initargs = initargs
+        """The arguments passed to the initializer."""
+
+    def _get_chunks(self, parameter_sets, workers):
+        chunk_size = self.chunk_size
+        if chunk_size is None:
+            # About four chunks per worker balances process communication
+            # overhead against an uneven spread of work at the end.
+            chunk_size = max(1, math.ceil(len(parameter_sets) / workers / 4))
+        items = list(enumerate(parameter_sets))
+        return [items[i:i + chunk_size]
+                for i in range(0, len(items), chunk_size)]
+
+    def iterate(self, parameter_sets):
+        """
+        Run the scenarios and yield their results as they finish.
+
+        :param parameter_sets: List of dictionaries of value paths and
+          values, e.g. created with create_grid.
+
+        :returns: Generator of (scenario index, result dictionary) tuples,
+          in order of completion.
+        """
+
+        parameter_sets = list(parameter_sets)
+        if len(parameter_sets) == 0:
+            return
+
+        workers = self.max_workers
+        if workers is None:
+            workers = os.cpu_count() or 1
+
+        if workers == 1:
+            if self.initializer is not None:
+                self.initializer(*self.initargs)
+            for index, parameters in enumerate(parameter_sets):
+                yield index, run_scenario(self.factory, parameters,
+                                          self.streams, self.collect)
+            return
+
+        chunks = self._get_chunks(parameter_sets, workers)
+        with ProcessPoolExecutor(min(workers, len(chunks)),
+                                 initializer=self.initializer,
+                                 initargs=self.initargs) as executor:
+            futures = [executor.submit(_run_chunk, self.factory, chunk,
+                                       self.streams, self.collect)
+                       for chunk in chunks]
+            try:
+                for future in as_completed(futures):
+                    for item in future.result():
+                        yield item
+            finally:
+                for future in futures:
+                    future.cancel()
+
+    def run(self, parameter_sets):
+        """
+        Run the scenarios and collect their results.
+
+        :param parameter_sets: List of dictionaries of value paths and
+          values, e.g. created with create_grid.
+
+        :returns: ResultTable with the parameter and result values of the
+          scenarios, in scenario order.
+        """
+
+        parameter_sets = list(parameter_sets)
+        results = [None] * len(parameter_sets)
+        for index, result in self.iterate(parameter_sets):
+            results[index] = result
+        return ResultTable(parameter_sets, results)
+
+
+if __name__ == '__main__':
+    import unittest
+    from auxi.modelling.process.scenarios_test import ScenarioRunnerUnitTester
+    unittest.main()
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+This module provides testing code for classes in the scenarios module.
+"""
+
+import unittest
+
+from auxi.modelling.process.core import SteadyStateModel
+from auxi.modelling.process.scenarios import create_grid, ScenarioRunner
+
+
+__version__ = '0.3.6'
+__license__ = 'LGPL v3'
+__copyright__ = 'Copyright 2016, Ex Mente Technologies (Pty) Ltd'
+__author__ = 'Christoff Kok, Johan Zietsman'
+__credits__ = ['Christoff Kok', 'Johan Zietsman']
+__maintainer__ = 'Christoff Kok'
+__email__ = 'christoff.kok@ex-mente.co.za'
+__status__ = 'Planning'
+
+
+class Heater(SteadyStateModel):
+    def __init__(self):
+        super().__init__('heater')
+
+    def run(self, streams):
+        self.output_variables.duty = self.parameters.cp * \
+            self.input_variables.mfr * self.parameters.dT
+        self.output_variables.label = 'dT={}'.format(self.parameters.dT)
+        return streams
+
+    class Parameters(object):
+        def __init__(self):
+            self.cp = 1.0
+            self.dT = 0.0
+
+    class InputVariables(object):
+        def __init__(self):
+            self.mfr = 0.0
+
+
+def collect_duty(model, streams):
+    return {'duty': model.output_variables.duty}
+
+
+class ScenarioRunnerUnitTester(unittest.TestCase):
+    """
+    Tester for the auxi.modelling.process.scenarios module.
+    """
+
+    def setUp(self):
+        self.parameter_sets = create_grid({
+            'parameters.dT': [10.0, 20.0, 30.0],
+            'input_variables.mfr': [1.0, 2.0]})
+
+    def test_create_grid(self):
+        self.assertEqual(len(self.parameter_sets), 6)
+        self.assertEqual(self.parameter_sets[1],
+                         {'parameters.dT': 10.0, 'input_variables.mfr': 2.0})
+
+    def _check(self, table):
+        self.assertEqual(len(table), 6)
+        self.assertEqual(table.parameter_names,
+                         ['parameters.dT', 'input_variables.mfr'])
+        for i, parameters in enumerate(self.parameter_sets):
+            self.assertEqual(
+                table['duty'][i],
+                parameters['parameters.dT'] *
+                parameters['input_variables.mfr'])
+
+    def test_run_serial(self):
+        table = ScenarioRunner(Heater, max_workers=1).run(self.parameter_sets)
+        self._check(table)
+        self.assertEqual(table['label'][5], 'dT=30.0')
+        self.assertEqual(table.get_row(2)['parameters.dT'], 20.0)
+
+    def test_run_parallel(self):
+        runner = ScenarioRunner(Heater, collect=collect_duty, max_workers=2,
+                                chunk_size=2)
+        self._check(runner.run(self.parameter_sets))
+
+    def test_iterate(self):
+        runner = ScenarioRunner(Heater, max_workers=2)
+        indices = sorted(i for i, _ in runner.iterate(self.parameter_sets))
+        self.assertEqual(indices, list(range(6)))
+
+    def test_run_empty(self):
+        for max_workers in [None, 1, 2]:
+            runner = ScenarioRunner(Heater, max_workers=max_workers)
+            self.assertEqual(list(runner.iterate([])), [])
+            self.assertEqual(len(runner.run([])), 0)
+
+    def test_invalid_path(self):
+        runner = ScenarioRunner(Heater, max_workers=1)
+        self.assertRaises(AttributeError, runner.run,
+                          [{'parameters.dt': 1.0}])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+This module provides simple steady state process units that mix, split and
+separate thermo material streams.
+"""
+
+import numpy
+
+from auxi.modelling.process.core import SteadyStateModel
+from auxi.modelling.process.materials.thermo import mix
+
+
+__version__ = '0.3.6'
+__license__ = 'LGPL v3'
+__copyright__ = 'Copyright 2016, Ex Mente Technologies (Pty) Ltd'
+__author__ = 'Christoff Kok, Johan Zietsman'
+__credits__ = ['Christoff Kok', 'Johan Zietsman']
+__maintainer__ = 'Christoff Kok'
+__email__ = 'christoff.kok@ex-mente.co.za'
+__status__ = 'Planning'
+
+
+class Mixer(SteadyStateModel):
+    """
+    Mixes a number of streams into one stream.
+
+    :param name: A name for the unit.
+    :param inlets: The names of the inlet streams.
+    :param outlet: The name of the outlet stream.
+    :param description: The unit's description.
+    """
+
+    def __init__(self, name, inlets, outlet, description=None):
+        super().__init__(name, description)
+        self.inlets = list(inlets)
+        """The names of the inlet streams."""
+        self.outlet = outlet
+        """The name of the outlet stream."""
+
+    def run(self, streams):
+        """
+        Run the unit.
+
+        :param streams: A dictionary of streams containing the inlet streams.
+
+        :returns: The streams dictionary with the outlet stream.
+        """
+
+        streams[self.outlet] = mix([streams[s] for s in self.inlets])
+        return streams
+
+
+class Splitter(SteadyStateModel):
+    """
+    Splits a stream into a number of streams with the same composition and
+    temperature.
+
+    :param name: A name for the unit.
+    :param inlet: The name of the inlet stream.
+    :param outlets: The names of the outlet streams.
+    :param fractions: The fraction of the inlet that reports to each outlet.
+      The fractions must add up to one.
+    :param description: The unit's description.
+    """
+
+    def __init__(self, name, inlet, outlets, fractions, description=None):
+        super().__init__(name, description)
+        self.inlet = inlet
+        """The name of the inlet stream."""
+        self.outlets = list(outlets)
+        """The names of the outlet streams."""
+        self.parameters.fractions = numpy.asarray(fractions, dtype=float)
+
+        if len(self.parameters.fractions) != len(self.outlets):
+            raise Exception("A split fraction is required for each outlet.")
+        if abs(self.parameters.fractions.sum() - 1.0) > 1.0e-9:
+            raise ValueError("Invalid split fractions. Must add up to one.")
+
+    def run(self, streams):
+        """
+        Run the unit.
+
+        :param streams: A dictionary of streams containing the inlet stream.
+
+        :returns: The streams dictionary with the outlet streams.
+        """
+
+        outlets = streams[self.inlet].split(self.parameters.fractions)
+        streams.update(zip(self.outlets, outlets))
+        return streams
+
+    class Parameters(object):
+        def __init__(self):
+            self.fractions = None
+            """The fraction of the inlet that reports to each outlet."""
+
+
+class Separator(SteadyStateModel):
+    """
+    Separates the compounds in a stream into a number of streams with the
+    same temperature.
+
+    :param name: A name for the unit.
+    :param inlet: The name of the inlet stream.
+    :param outlets: The names of the outlet streams.
+    :param split_fractions: [outlets x compounds] matrix of the fractions of
+      each compound that report to each outlet. For two outlets, this can be
+      a [compounds] array of the fractions that report to the first outlet.
+    :param description: The unit's description.
+    """
+
+    def __init__(self, name, inlet, outlets, split_fractions,
+                 description=None):
+        super().__init__(name, description)
+        self.inlet = inlet
+        """The name of the inlet stream."""
+        self.outlets = list(outlets)
+        """The names of the outlet streams."""
+        self.parameters.split_fractions = numpy.asarray(split_fractions,
+                                                        dtype=float)
+
+        split = self.parameters.split_fractions
+        if (split.ndim == 1 and len(self.outlets) != 2) or \
+           (split.ndim == 2 and split.shape[0] != len(self.outlets)):
+            raise Exception("The split fractions do not match the number of "
+                            "outlets.")
+
+    def run(self, streams):
+        """
+        Run the unit.
+
+        :param streams: A dictionary of streams containing the inlet stream.
+
+        :returns: The streams dictionary with the outlet streams.
+        """
+
+        outlets = streams[self.inlet].separate(
+            self.parameters.split_fractions)
+        streams.update(zip(self.outlets, outlets))
+        return streams
+
+    class Parameters(object):
+        def __init__(self):
+            self.split_fractions = None
+            """
+            [outlets x compounds] The fractions of each compound that report
+            to each outlet.
+            """
+
+
+if __name__ == '__main__':
+    import unittest
+    from auxi.modelling.process.units_test import MixerUnitTester
+    from auxi.modelling.process.units_test import SplitterUnitTester
+    from auxi.modelling.process.units_test import SeparatorUnitTester
+    unittest.main()
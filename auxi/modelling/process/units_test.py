@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+This module provides testing code for classes in the units module.
+"""
+
+import unittest
+
+import numpy
+
+from auxi.core.helpers import get_path_relative_to_module as get_path
+from auxi.modelling.process.flowsheet import Flowsheet
+from auxi.modelling.process.materials.thermo import Material
+from auxi.modelling.process.units import Mixer, Splitter, Separator
+
+
+__version__ = '0.3.6'
+__license__ = 'LGPL v3'
+__copyright__ = 'Copyright 2016, Ex Mente Technologies (Pty) Ltd'
+__author__ = 'Christoff Kok, Johan Zietsman'
+__credits__ = ['Christoff Kok', 'Johan Zietsman']
+__maintainer__ = 'Christoff Kok'
+__email__ = 'christoff.kok@ex-mente.co.za'
+__status__ = 'Planning'
+
+
+def create_material():
+    return Material(
+        'ilmenite',
+        get_path(__file__, 'materials/data/thermomaterial.test.ilmenite.txt'))
+
+
+class MixerUnitTester(unittest.TestCase):
+    """
+    Tester for the auxi.modelling.process.units.Mixer class.
+    """
+
+    def test_run(self):
+        material = create_material()
+        streams = {'a': material.create_stream('IlmeniteA', 10.0, T=100.0),
+                   'b': material.create_stream('IlmeniteB', 20.0, T=200.0)}
+        Mixer('mixer', ['a', 'b'], 'c').run(streams)
+        self.assertAlmostEqual(streams['c'].mfr, 30.0)
+        self.assertAlmostEqual(streams['c'].Hfr,
+                               streams['a'].Hfr + streams['b'].Hfr)
+
+
+class SplitterUnitTester(unittest.TestCase):
+    """
+    Tester for the auxi.modelling.process.units.Splitter class.
+    """
+
+    def test_constructor(self):
+        self.assertRaises(Exception, Splitter, 'splitter', 'a', ['b', 'c'],
+                          [1.0])
+        self.assertRaises(ValueError, Splitter, 'splitter', 'a', ['b', 'c'],
+                          [0.3, 0.4])
+        self.assertRaises(ValueError, Splitter, 'splitter', 'a', ['b', 'c'],
+                          [0.6, 0.7])
+
+    def test_run(self):
+        material = create_material()
+        streams = {'a': material.create_stream('IlmeniteA', 10.0, T=300.0)}
+        Splitter('splitter', 'a', ['b', 'c'], [0.3, 0.7]).run(streams)
+        self.assertAlmostEqual(streams['b'].mfr, 3.0)
+        self.assertAlmostEqual(streams['c'].Hfr, streams['a'].Hfr * 0.7)
+        self.assertEqual(streams['c'].T, 300.0)
+
+    def test_recycle(self):
+        material = create_material()
+        flowsheet = Flowsheet('flowsheet')
+        flowsheet.add_model(Mixer('mixer', ['feed', 'recycle'], 'mixed'),
+                            ['feed', 'recycle'], ['mixed'])
+        flowsheet.add_model(
+            Splitter('splitter', 'mixed', ['recycle', 'product'], [0.5, 0.5]),
+            ['mixed'], ['recycle', 'product'])
+        streams = flowsheet.run({
+            'feed': material.create_stream('IlmeniteA', 10.0, T=300.0),
+            'recycle': material.create_stream('IlmeniteA', 0.0)})
+        self.assertAlmostEqual(streams['mixed'].mfr, 20.0, places=3)
+        self.assertAlmostEqual(streams['product'].T, 300.0, places=3)
+
+
+class SeparatorUnitTester(unittest.TestCase):
+    """
+    Tester for the auxi.modelling.process.units.Separator class.
+    """
+
+    def test_constructor(self):
+        self.assertRaises(Exception, Separator, 'separator', 'a',
+                          ['b', 'c', 'd'], [0.5, 0.5])
+
+    def test_run(self):
+        material = create_material()
+        split = numpy.zeros(material.compound_count)
+        split[material.get_compound_index('TiO2[Srutile]')] = 1.0
+        streams = {'a': material.create_stream('IlmeniteA', 10.0, T=300.0)}
+        Separator('separator', 'a', ['b', 'c'], split).run(streams)
+        self.assertAlmostEqual(streams['b'].mfr,
+                               streams['a'].get_compound_mfr('TiO2[Srutile]'))
+        self.assertAlmostEqual(streams['b'].Hfr + streams['c'].Hfr,
+                               streams['a'].Hfr)
+        self.assertEqual(streams['b'].T, 300.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -7,6 +7,8 @@ import unittest
 
 from auxi.core.objects_test import ObjectUnitTester
 from auxi.core.objects_test import NamedObjectUnitTester
+from auxi.core.objects_test import SlottedNamedObjectUnitTester
+from auxi.core.instrumentation_test import InstrumentationUnitTester
 from auxi.core.time_test import ClockUnitTester
 
 from auxi.tools.chemistry.stoichiometry_test import StoichFunctionTester
@@ -27,10 +29,34 @@ from auxi.modelling.process.materials.thermo_test \
     import ThermoMaterialUnitTester
 from auxi.modelling.process.materials.thermo_test \
   import ThermoMaterialPackageUnitTester
+from auxi.modelling.process.materials.thermo_test \
+    import ThermoMaterialStreamUnitTester
+from auxi.modelling.process.materials.thermo_test \
+    import ThermoMixUnitTester
+from auxi.modelling.process.materials.thermo_test \
+    import ThermoMaterialStreamSeriesUnitTester
 from auxi.modelling.process.materials.psd_test \
     import PsdMaterialUnitTester, PsdMaterialPackageUnitTester
+from auxi.modelling.process.materials.psd_test import PsdRebinningTester
 from auxi.modelling.process.materials.slurry_test \
     import SlurryMaterialUnitTester, SlurryMaterialPackageUnitTester
+from auxi.modelling.process.materials.slurry_test \
+    import SlurryMaterialPackageBatchUnitTester
+from auxi.modelling.process.materials.datafile_test \
+    import DataFileUnitTester
+from auxi.modelling.process.materials.sharedmemory_test \
+    import SharedMaterialArrayUnitTester
+from auxi.modelling.process.flowsheet_test import FlowsheetUnitTester
+from auxi.modelling.process.scenarios_test import ScenarioRunnerUnitTester
+from auxi.modelling.process.units_test \
+    import MixerUnitTester, SplitterUnitTester, SeparatorUnitTester
+from auxi.modelling.process.comminution_test import BallMillUnitTester
+from auxi.modelling.process.classification_test \
+    import PartitionFunctionTester, ClassifierUnitTester
+from auxi.modelling.process.circuits_test import ClosedCircuitUnitTester
+from auxi.modelling.process.hydraulics_test import HydraulicsTester
+from auxi.modelling.process.reconciliation_test import ReconcilerTester
+from auxi.modelling.process.blending_test import BlendOptimiserTester
 
 
 # MODELLING.FINANCIAL
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Measure the memory used per object by material packages, material streams
+and general ledger objects.
+
+Run from the repository root:
+
+    python3 scripts/benchmark_memory.py [count]
+"""
+
+import os
+import sys
+import tracemalloc
+from datetime import date
+
+import numpy
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from auxi.modelling.process.materials import thermo, psd, slurry  # noqa
+from auxi.modelling.financial.des import GeneralLedgerAccount  # noqa
+from auxi.modelling.financial.des import Transaction  # noqa
+
+
+data_path = os.path.join(os.path.dirname(__file__), '..', 'auxi',
+                         'modelling', 'process', 'materials', 'data')
+
+
+def measure(create, count):
+    """
+    Determine the memory allocated per object.
+
+    :param create: Callable that creates an object.
+    :param count: The number of objects to create.
+
+    :returns: [bytes] Memory per object.
+    """
+
+    create()
+    tracemalloc.start()
+    start = tracemalloc.get_traced_memory()[0]
+    objects = [create() for i in range(count)]
+    end = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del objects
+    return (end - start) / count
+
+
+def main(count):
+    thermo_material = thermo.Material(
+        'ilmenite',
+        os.path.join(data_path, 'thermomaterial.test.ilmenite.txt'))
+    psd_material = psd.Material(
+        'psd', os.path.join(data_path, 'psdmaterial.test.materiala.txt'))
+    slurry_material = slurry.Material(
+        'slurry',
+        os.path.join(data_path, 'psdslurrymaterial.test.materiala.txt'))
+
+    # Empty packages and streams are created so that the enthalpy
+    # calculation does not dominate the run time.
+    compound_count = thermo_material.compound_count
+    size_class_count = psd_material.size_class_count
+
+    cases = [
+        ('thermo.MaterialPackage', lambda: thermo.MaterialPackage(
+            thermo_material, numpy.zeros(compound_count))),
+        ('thermo.MaterialStream', lambda: thermo.MaterialStream(
+            thermo_material, numpy.zeros(compound_count))),
+        ('psd.MaterialPackage', lambda: psd.MaterialPackage(
+            psd_material, numpy.zeros(size_class_count))),
+        ('slurry.MaterialPackage', lambda: slurry.MaterialPackage(
+            slurry_material, 3.0, 0.0, numpy.zeros(size_class_count))),
+        ('des.Transaction', lambda: Transaction(
+            'tx', tx_date=date(2016, 1, 1), amount=10.0)),
+        ('des.GeneralLedgerAccount', lambda: GeneralLedgerAccount(
+            'account', number='1000'))]
+
+    print('{:<28}{:>16}'.format('Object', 'Bytes/object'))
+    print('-' * 44)
+    for name, create in cases:
+        print('{:<28}{:>16.0f}'.format(name, measure(create, count)))
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)